@@ -0,0 +1,326 @@
+import argparse
+import contextlib
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import charts
+import combined
+import compile_pdf
+import fragments
+import peers
+import sections
+import tracing
+from ingest import expand_inputs, file_stem, load_document, parse_document
+from validation import SchemaError, check_document, validate_document
+
+# Bundled sample documents, one per producer layout, that warm_worker renders
+WARM_UP_DOCUMENTS = ('ultimate.json', 'orig.json')
+
+# Per-worker state, filled in once by init_worker and reused for every report
+_template = None
+_fragment_cache = None
+_chart_cache = None
+_benchmarks = {}
+_profile = False
+_records = False
+
+
+def init_worker(template_path, search_path, peers_path=None, profile=False, records=False):
+    """
+    Runs once in each pool process: loads the compiled template and the
+    portfolio benchmarks, and opens the shared section fragment and chart
+    caches. Charts are drawn in the worker itself, since the batch already
+    keeps every core busy. With profile, render_one traces every report; with
+    records, every document's lists are held as records (see records.py).
+    """
+    global _template, _fragment_cache, _chart_cache, _benchmarks, _profile, _records
+    _template = combined.load_template(template_path, search_path)
+    _fragment_cache = fragments.open_cache(search_path)
+    _chart_cache = charts.open_cache(search_path)
+    _benchmarks = peers.load_benchmarks(peers_path) if peers_path else {}
+    _profile = profile
+    _records = records
+
+
+def warm_up_paths():
+    # The WARM_UP_DOCUMENTS shipped alongside this module
+    here = os.path.dirname(os.path.abspath(__file__))
+    paths = [os.path.join(here, name) for name in WARM_UP_DOCUMENTS]
+    return [path for path in paths if os.path.exists(path)]
+
+
+def warm_worker():
+    """
+    Pays a worker's first-render costs up front, for long-running pools
+    (server.py): loads every section template the report includes, runs the
+    fragment cache's block analysis and renders the bundled samples, with the
+    caches off and the output thrown away. Runs in a worker set up by
+    init_worker.
+    """
+    env = _template.environment
+    for name in fragments.template_sources(env, _template.name):
+        env.get_template(name)
+    if _fragment_cache is not None:
+        fragments.block_dependencies(_template)
+    for path in warm_up_paths():
+        data = load_document(path)
+        validate_document(data)
+        for _ in combined.report_chunks(combined.build_context(data, records=_records), _template):
+            pass
+
+
+def output_path_for(json_path, out_dir):
+    # Inputs are checked to have distinct names (see ingest.check_unique_stems)
+    return os.path.join(out_dir, file_stem(json_path) + '.tex')
+
+
+def render_one(json_path, out_dir, streaming=None, section_names=None):
+    """
+    Renders a single company. Errors are returned rather than raised so one bad
+    input does not take down the rest of the batch; a document that fails
+    validation is skipped before any rendering, with every problem listed
+    under "problems". section_names limits the report to some sections (see
+    sections.py). When profiling, the report's stage times are returned under
+    "trace" (see tracing.py).
+    """
+    start = time.perf_counter()
+    company = peers.company_id(json_path)
+    with (tracing.trace(company) if _profile else contextlib.nullcontext()) as report_trace:
+        try:
+            data = load_document(json_path, streaming)
+            with tracing.span("validate"):
+                validate_document(data)
+            output_path = output_path_for(json_path, out_dir)
+            written = combined.write_report(data, _template, output_path, fragment_cache=_fragment_cache,
+                                            chart_cache=_chart_cache, peer_benchmark=_benchmarks.get(company),
+                                            section_names=section_names, records=_records)
+        except Exception as exc:
+            result = {
+                "input": json_path,
+                "ok": False,
+                "error": "%s: %s" % (type(exc).__name__, exc),
+                "seconds": time.perf_counter() - start,
+            }
+            if isinstance(exc, SchemaError):
+                result["problems"] = exc.problems
+            return result
+    result = {
+        "input": json_path,
+        "ok": True,
+        "output": output_path,
+        "chars": written,
+        "seconds": time.perf_counter() - start,
+    }
+    if report_trace is not None:
+        result["trace"] = report_trace.as_dict()
+    return result
+
+
+def render_data(data, company=None, section_names=None):
+    """
+    Renders one report from a parsed document and returns the LaTeX, for
+    callers that do their own file I/O (server.py). Runs in a
+    worker set up by init_worker. Raises validation.SchemaError, before any
+    rendering, for a document that does not match its schema, and ValueError
+    for an unknown name in section_names.
+    """
+    with tracing.span("validate"):
+        validate_document(data)
+    context = combined.build_context(data, _chart_cache, peer_benchmark=_benchmarks.get(company),
+                                     records=_records)
+    with tracing.span("render"):
+        return ''.join(combined.report_chunks(context, _template, _fragment_cache, section_names))
+
+
+def render_to_temp(json_path, out_dir, streaming=None, section_names=None):
+    """
+    Renders a document on disk, as render_one does, into a temporary file in
+    out_dir, streaming it there (see combined.stream_context) instead of
+    returning the LaTeX, so the report is never sent back to the parent
+    process (pipeline.py). Returns (temporary path, characters written); the
+    caller renames the file into place. Raises like render_data.
+    """
+    data = load_document(json_path, streaming)
+    with tracing.span("validate"):
+        validate_document(data)
+    fd, temp_path = tempfile.mkstemp(dir=out_dir, prefix=file_stem(json_path) + '.', suffix='.tmp')
+    os.close(fd)
+    try:
+        written = combined.write_report(data, _template, temp_path, fragment_cache=_fragment_cache,
+                                        chart_cache=_chart_cache,
+                                        peer_benchmark=_benchmarks.get(peers.company_id(json_path)),
+                                        section_names=section_names, records=_records)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return temp_path, written
+
+
+def render_document(raw, company=None, streaming=None, section_names=None):
+    # render_data for a document still in bytes, e.g. a request body
+    try:
+        data = parse_document(raw, streaming)
+    except Exception as exc:
+        raise ValueError("invalid company document: %s" % exc) from None
+    return render_data(data, company, section_names)
+
+
+def run_batch(json_paths, out_dir, workers=None, template_path='combined.tex', search_path='.',
+              streaming=None, peers_path=None, profile=False, section_names=None, records=False):
+    """
+    Renders every document in json_paths (either producer layout) across a
+    process pool and returns the per-report results in completion order.
+    section_names limits the reports to some sections (see sections.py).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(template_path, search_path, peers_path, profile, records)) as pool:
+        futures = [pool.submit(render_one, path, out_dir, streaming, section_names) for path in json_paths]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if result["ok"]:
+                print("[ok]   %s -> %s (%.3fs)" % (result["input"], result["output"], result["seconds"]))
+            else:
+                print("[fail] %s: %s (%.3fs)" % (result["input"], result["error"], result["seconds"]))
+    return results
+
+
+def check_inputs(json_paths, streaming=None):
+    """
+    Validates every document without rendering anything, printing each
+    problem found. Returns the number of invalid documents.
+    """
+    invalid = 0
+    for json_path in json_paths:
+        try:
+            problems = check_document(load_document(json_path, streaming))
+        except Exception as exc:
+            problems = ["%s: %s" % (type(exc).__name__, exc)]
+        if problems:
+            invalid += 1
+            print("[invalid] %s: %d problem%s" % (json_path, len(problems), '' if len(problems) == 1 else 's'))
+            for problem in problems:
+                print("    %s" % problem)
+        else:
+            print("[valid]   %s" % json_path)
+    print()
+    print("Documents: %d valid, %d invalid, %d total" % (len(json_paths) - invalid, invalid, len(json_paths)))
+    return invalid
+
+
+def print_summary(results, elapsed, label="Reports"):
+    succeeded = [r for r in results if r["ok"]]
+    failed = [r for r in results if not r["ok"]]
+    invalid = [r for r in failed if "problems" in r]
+    print()
+    print("%s: %d ok, %d failed, %d total" % (label, len(succeeded), len(failed), len(results)))
+    if invalid:
+        print("Skipped as invalid: %d (run with --check to list every problem)" % len(invalid))
+    print("Wall time: %.3fs" % elapsed)
+    if results and elapsed > 0:
+        print("Throughput: %.2f reports/s" % (len(results) / elapsed))
+    if succeeded:
+        times = sorted(r["seconds"] for r in succeeded)
+        print("Per report: mean %.3fs, min %.3fs, max %.3fs" % (
+            sum(times) / len(times), times[0], times[-1]))
+
+
+def report_traces(results, pdf_results=()):
+    """
+    The traces of the rendered reports, with each report's PDF compile time
+    added as its "compile" stage.
+    """
+    compile_seconds = {r["input"]: r["seconds"] for r in pdf_results}
+    traces = []
+    for result in results:
+        if "trace" in result:
+            trace = result["trace"]
+            if result["output"] in compile_seconds:
+                trace["stages"]["compile"] = compile_seconds[result["output"]]
+                trace["calls"]["compile"] = 1
+            traces.append(trace)
+    return traces
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render credit reports for many company JSON files.")
+    parser.add_argument("inputs", nargs="+", help="JSON files, directories or glob patterns")
+    parser.add_argument("-o", "--out-dir", default="reports", help="directory for the generated .tex files")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--template", default="combined.tex", help="LaTeX template to render")
+    parser.add_argument("--no-stream", dest="streaming", action="store_false", default=None,
+                        help="load inputs with json.load instead of the streaming parser")
+    parser.add_argument("--peers", default=None, help="portfolio benchmark file written by peers.py")
+    parser.add_argument("--pdf", action="store_true", help="compile each generated report to PDF")
+    parser.add_argument("--build-dir", default=compile_pdf.DEFAULT_BUILD_DIR,
+                        help="root of the per-report TeX build directories (with --pdf)")
+    parser.add_argument("--engine", default=None, help="TeX engine for --pdf (default: pdflatex)")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="overlap reading, rendering, writing and compiling (see pipeline.py)")
+    parser.add_argument("--queue", type=int, default=None,
+                        help="reports allowed to wait between pipeline stages (with --pipeline)")
+    parser.add_argument("--check", action="store_true",
+                        help="only validate the inputs, listing every problem, and render nothing")
+    combined.add_sections_arg(parser)
+    combined.add_profile_args(parser)
+    combined.add_records_arg(parser)
+    args = parser.parse_args(argv)
+    profile = args.profile or bool(args.profile_json or args.profile_prom)
+
+    try:
+        json_paths = expand_inputs(args.inputs)
+    except ValueError as exc:
+        parser.error(str(exc))
+    if not json_paths:
+        parser.error("no JSON inputs matched")
+    if args.sections:
+        try:
+            sections.select_sections(combined.load_template(args.template), args.sections)
+        except ValueError as exc:
+            parser.error(str(exc))
+
+    if args.check:
+        return 1 if check_inputs(json_paths, args.streaming) else 0
+
+    if args.pipeline:
+        # pipeline.py builds on this module, so it is only imported when used
+        import pipeline
+        start = time.perf_counter()
+        results, pdf_results, busy = pipeline.run_pipeline(
+            json_paths, args.out_dir, args.workers, args.template, streaming=args.streaming,
+            peers_path=args.peers, pdf=args.pdf, build_root=args.build_dir, engine=args.engine,
+            queue_size=args.queue or pipeline.DEFAULT_QUEUE_SIZE, profile=profile, section_names=args.sections,
+            records=args.records)
+        elapsed = time.perf_counter() - start
+        print_summary(results, elapsed)
+        if args.pdf:
+            print_summary(pdf_results, elapsed, label="PDFs")
+        print("Stage busy time: %s" % ", ".join("%s %.3fs" % item for item in busy.items()))
+    else:
+        start = time.perf_counter()
+        results = run_batch(json_paths, args.out_dir, args.workers, args.template, streaming=args.streaming,
+                            peers_path=args.peers, profile=profile, section_names=args.sections,
+                            records=args.records)
+        print_summary(results, time.perf_counter() - start)
+        pdf_results = []
+        if args.pdf:
+            print()
+            start = time.perf_counter()
+            tex_paths = [r["output"] for r in results if r["ok"]]
+            pdf_results = compile_pdf.compile_many(tex_paths, args.workers, args.build_dir, args.engine)
+            print_summary(pdf_results, time.perf_counter() - start, label="PDFs")
+
+    if profile:
+        traces = report_traces(results, pdf_results)
+        tracing.print_breakdown(traces)
+        tracing.export(traces, args.profile_json, args.profile_prom)
+    ok = all(r["ok"] for r in results) and all(r["ok"] for r in pdf_results)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,383 @@
+import argparse
+import copy
+import glob
+import json
+import os
+import platform
+import re
+import subprocess
+import tempfile
+import time
+import timeit
+import tracemalloc
+
+import combined
+from ingest import load_document
+from latex_escape import escape_latex
+from providers import generate
+from profile_text import parse_profile
+from records import IndustryRisk, KeyPoint, PeerRating, Promoter, Subsidiary
+from schema import canonical_key, normalize_document
+
+# Sample documents every case runs against, one per producer
+BASE_DOCUMENTS = ('orig.json', 'ultimate.json')
+
+# Scaled-up variants of each sample: name -> (scaling function name, size)
+VARIANTS = {
+    "quarters40": ("scale_quarters", 40),
+    "bullets500": ("scale_bullets", 500),
+    "subsidiaries200": ("scale_subsidiaries", 200),
+    "transcripts4mb": ("scale_transcripts", 4 * 1024 * 1024),
+}
+
+# Stored results, one file per commit
+DEFAULT_RESULTS_DIR = 'bench_results'
+
+# Timing runs per case; the fastest is the one compared
+DEFAULT_REPEAT = 5
+
+# A case this much slower than the baseline is reported as a regression
+DEFAULT_THRESHOLD = 0.10
+
+
+def _cycle(items, count):
+    return [copy.deepcopy(items[i % len(items)]) for i in range(count)] if items else []
+
+
+def _section(doc, *names):
+    for name in names:
+        if name in doc:
+            return doc[name]
+    return None
+
+
+def scale_quarters(doc, count):
+    """
+    Extends every quarterly series in financial_data to count quarters,
+    ending at the sample's last quarter and cycling its values.
+    """
+    table = (_section(doc, 'financial_data') or {}).get('table') or {}
+    for metric, entries in table.items():
+        if not entries:
+            continue
+        period_key = next(k for k in entries[0] if k.lower() == 'quarter')
+        value_key = next(k for k in entries[0] if k.lower() == 'value')
+        separator = '-' if re.match(r'Q\d-', str(entries[0][period_key])) else ' '
+        values = [entry[value_key] for entry in entries]
+        series = []
+        for i in range(count):
+            quarter = count - 1 - i
+            year = 24 - quarter // 4
+            series.append({period_key: "Q%d%sFY-%02d" % (4 - quarter % 4, separator, year % 100),
+                           value_key: values[i % len(values)]})
+        table[metric] = series
+    return doc
+
+
+def scale_bullets(doc, count):
+    """
+    Grows every commentary list, and every company profile field, to count
+    bullets.
+    """
+    def visit(node):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key.lower() == 'commentary' and isinstance(value, list):
+                    node[key] = _cycle(value, count)
+                else:
+                    visit(value)
+        elif isinstance(node, list):
+            for item in node:
+                visit(item)
+
+    visit(doc)
+    profile = doc.get('company_profile') or {}
+    for key, text in profile.items():
+        bullets = text.split('\n- ')
+        profile[key] = '\n- '.join(_cycle(bullets, count))
+    return doc
+
+
+def scale_subsidiaries(doc, count):
+    info = _section(doc, 'subsidiary_jv_info', 'subsidiary_info') or {}
+    for key in ('subsidiary', 'subsidiaries'):
+        if key in info:
+            subsidiaries = _cycle(info[key], count)
+            for i, subsidiary in enumerate(subsidiaries):
+                subsidiary['subsidiary_name'] = "%s %d" % (subsidiary.get('subsidiary_name'), i + 1)
+            info[key] = subsidiaries
+    return doc
+
+
+def scale_transcripts(doc, size):
+    """
+    Pads every text field of the concall transcript so the section comes to
+    about size bytes.
+    """
+    concalls = _section(doc, 'concalls', 'Concalls') or {}
+    leaves = []
+
+    def visit(node):
+        for key, value in node.items():
+            if isinstance(value, dict):
+                visit(value)
+            elif isinstance(value, str) and value:
+                leaves.append((node, key))
+
+    visit(concalls)
+    if leaves:
+        per_leaf = size // len(leaves)
+        for node, key in leaves:
+            text = node[key] + ' '
+            node[key] = (text * (per_leaf // len(text) + 1))[:per_leaf]
+    return doc
+
+
+def make_documents(directory):
+    """
+    Writes the samples and their scaled variants to directory and returns
+    {document name: path}.
+    """
+    paths = {}
+    for base in BASE_DOCUMENTS:
+        stem = os.path.splitext(base)[0]
+        with open(base, 'r') as f:
+            doc = json.load(f)
+        variants = {stem: doc}
+        for variant, (scale, size) in VARIANTS.items():
+            variants["%s.%s" % (stem, variant)] = globals()[scale](copy.deepcopy(doc), size)
+        for name, variant_doc in variants.items():
+            path = os.path.join(directory, name + '.json')
+            with open(path, 'w') as f:
+                json.dump(variant_doc, f)
+            paths[name] = path
+    return paths
+
+
+def _strings(node):
+    # Every string in a document, as escape_latex sees them during a render
+    if isinstance(node, str):
+        yield node
+    elif isinstance(node, dict):
+        for value in node.values():
+            yield from _strings(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _strings(value)
+
+
+def record_lists(doc):
+    """
+    The lists of a document the model keeps as records (see records.py), as
+    ((record type, key function), list) pairs.
+    """
+    def items(*path):
+        node = doc
+        for names in path:
+            node = _section(node, *names) if isinstance(node, dict) else None
+        return node or []
+
+    return [
+        ((Promoter, None), items(('promoters', 'promoter_list'), ('promoters',))),
+        ((KeyPoint, None), items(('key_issues',), ('issues',))),
+        ((KeyPoint, None), items(('key_strengths',), ('strengths',))),
+        ((IndustryRisk, None), items(('industry_risks',), ('risks',))),
+        ((PeerRating, None), items(('peer_ratings',), ('ratings',))),
+        ((Subsidiary, canonical_key), items(('subsidiary_jv_info', 'subsidiary_info'),
+                                            ('subsidiary', 'subsidiaries'))),
+    ]
+
+
+def cases(paths, template):
+    """
+    {case name: zero-argument function} for every document: the full render
+    path from the file, and the hot helpers on their own.
+    """
+    result = {}
+    for name, path in paths.items():
+        data = load_document(path)
+        model = normalize_document(data)
+        context = combined.build_context(data)
+        variables = {key: context[key] for key in context}
+        strings = list(_strings(data))
+        profile = model["company_profile"]
+        lists = record_lists(data)
+        types = [record_type for record_type, _ in lists]
+        lists_json = json.dumps([items for _, items in lists])
+
+        def full(path=path):
+            return ''.join(generate(template, combined.build_context(load_document(path))))
+
+        def escape(strings=strings):
+            for text in strings:
+                escape_latex(text)
+
+        result["full/" + name] = full
+        result["normalize/" + name] = lambda data=data: normalize_document(data)
+        result["profile_lists/" + name] = lambda profile=profile: parse_profile(profile)
+        result["escape/" + name] = escape
+        result["template_render/" + name] = lambda variables=variables: template.render(variables)
+        # The list sections decoded as plain dicts, and as the model's records
+        result["decode_dicts/" + name] = lambda text=lists_json: json.loads(text)
+        result["decode_records/" + name] = lambda text=lists_json, types=types: [
+            record_type.from_list(items, key) for (record_type, key), items in zip(types, json.loads(text))]
+    return result
+
+
+def measure(func, repeat=DEFAULT_REPEAT):
+    """
+    Seconds per call of func: the best and median of repeat runs, each long
+    enough (at least 0.2s) to swamp timer resolution.
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    runs = sorted(total / number for total in timer.repeat(repeat, number))
+    return {"best": runs[0], "median": runs[len(runs) // 2], "number": number, "repeat": repeat}
+
+
+def measure_memory(func):
+    """
+    Bytes allocated by one call of func: the peak while it runs and what is
+    still held, mostly by its result, once it returns.
+    """
+    tracemalloc.start()
+    try:
+        result = func()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return {"retained_bytes": retained, "peak_bytes": peak}
+
+
+def _git(*args):
+    try:
+        return subprocess.run(('git',) + args, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def revision():
+    # Commit the results belong to; uncommitted changes to tracked files are marked
+    commit = _git('rev-parse', '--short', 'HEAD') or 'unknown'
+    if _git('status', '--porcelain', '--untracked-files=no'):
+        commit += '-dirty'
+    return commit
+
+
+def save_results(results, results_dir=DEFAULT_RESULTS_DIR):
+    os.makedirs(results_dir, exist_ok=True)
+    path = os.path.join(results_dir, results["revision"] + '.json')
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=1)
+    return path
+
+
+def find_baseline(ref, results_dir=DEFAULT_RESULTS_DIR, exclude=None):
+    """
+    Stored results to compare against: a results file path, a commit (or
+    prefix) with stored results, or, with no ref, the most recent results
+    other than exclude.
+    """
+    if ref and os.path.isfile(ref):
+        return ref
+    candidates = [path for path in glob.glob(os.path.join(results_dir, '*.json'))
+                  if os.path.abspath(path) != os.path.abspath(exclude or '')]
+    if ref:
+        candidates = [path for path in candidates if os.path.basename(path).startswith(ref)]
+    if not candidates:
+        return None
+    return max(candidates, key=os.path.getmtime)
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Prints each case's best time against the baseline's and returns the
+    cases that got slower by more than threshold.
+    """
+    regressions = []
+    print()
+    print("Compared with %s (%s)" % (baseline["revision"], time.ctime(baseline["started"])))
+    width = max(len(name) for name in current["cases"])
+    print("%-*s %12s %12s %9s" % (width, "case", "baseline", "current", "change"))
+    for name, stats in current["cases"].items():
+        before = baseline["cases"].get(name)
+        if before is None:
+            print("%-*s %12s %10.3fms %9s" % (width, name, "-", stats["best"] * 1000, "new"))
+            continue
+        change = stats["best"] / before["best"] - 1
+        flag = ''
+        if change > threshold:
+            flag = '  slower'
+            regressions.append(name)
+        elif change < -threshold:
+            flag = '  faster'
+        print("%-*s %10.3fms %10.3fms %+8.1f%%%s" % (
+            width, name, before["best"] * 1000, stats["best"] * 1000, change * 100, flag))
+    return regressions
+
+
+def run(pattern=None, repeat=DEFAULT_REPEAT):
+    """
+    Runs every case whose name matches pattern (a regular expression) and
+    returns the results, ready for save_results.
+    """
+    # Benchmarks time the code, not the on-disk caches
+    for env in ('CREDIT_REPORT_FRAGMENT_CACHE', 'CREDIT_REPORT_CHART_CACHE', 'CREDIT_REPORT_TEMPLATE_CACHE'):
+        os.environ[env] = ''
+    results = {
+        "revision": revision(),
+        "started": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "repeat": repeat,
+        "cases": {},
+    }
+    template = combined.load_template()
+    with tempfile.TemporaryDirectory() as directory:
+        selected = {name: func for name, func in cases(make_documents(directory), template).items()
+                    if pattern is None or re.search(pattern, name)}
+        width = max([len(name) for name in selected] or [0])
+        for name, func in selected.items():
+            stats = measure(func, repeat)
+            stats.update(measure_memory(func))
+            results["cases"][name] = stats
+            print("%-*s %10.3fms  (median %.3fms, %d x %d)  %9.1fKB held, %9.1fKB peak" % (
+                width, name, stats["best"] * 1000, stats["median"] * 1000, stats["repeat"], stats["number"],
+                stats["retained_bytes"] / 1024, stats["peak_bytes"] / 1024))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark report generation on the samples and scaled variants.")
+    parser.add_argument("-k", "--filter", default=None, help="only run cases matching this regular expression")
+    parser.add_argument("-r", "--repeat", type=int, default=DEFAULT_REPEAT, help="timing runs per case")
+    parser.add_argument("--results-dir", default=DEFAULT_RESULTS_DIR, help="where results are stored")
+    parser.add_argument("--no-save", action="store_true", help="do not store this run's results")
+    parser.add_argument("--compare", nargs="?", const='', default=None, metavar="REF",
+                        help="compare with stored results: a commit, a results file, or the latest run")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative slowdown reported as a regression (default: 0.10)")
+    args = parser.parse_args(argv)
+
+    results = run(args.filter, args.repeat)
+    saved = None
+    if not args.no_save:
+        saved = save_results(results, args.results_dir)
+        print("Results saved to %s" % saved)
+    if args.compare is not None:
+        baseline_path = find_baseline(args.compare, args.results_dir, exclude=saved)
+        if baseline_path is None:
+            print("No stored results to compare with")
+            return 1
+        with open(baseline_path, 'r') as f:
+            regressions = compare(json.load(f), results, args.threshold)
+        if regressions:
+            print("%d cases slower than the baseline by more than %d%%" % (len(regressions), args.threshold * 100))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
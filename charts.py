@@ -0,0 +1,238 @@
+import hashlib
+import json
+import math
+import os
+import re
+import tempfile
+
+import numpy as np
+
+from ratios import RATIOS
+
+# matplotlib is optional: without it reports keep the graph paths given in the JSON
+try:
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+except ImportError:
+    plt = None
+
+# Where generated charts are kept between runs and shared between reports. Set
+# the environment variable to an empty string to turn chart generation off.
+CACHE_DIR_ENV = 'CREDIT_REPORT_CHART_CACHE'
+DEFAULT_CACHE_DIR = '.chart_cache'
+
+# Least recently used charts are evicted once the cache grows past this
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Everything about how a chart looks. It is part of the cache key, so changing
+# it redraws every chart on the next run.
+CHART_STYLE = {
+    "figsize": (4.0, 3.0),
+    "dpi": 150,
+    "color": "#1f4e79",
+    "grid_color": "#d9d9d9",
+    "font_size": 8,
+}
+
+
+# Every chart the generator can draw: name -> (report section, title, ratio
+# in ratios.RATIOS it plots, chart kind). The titles are also used for a
+# producer's own graph of the same name. Only ratio charts are drawn: the
+# documents carry no shareholding figures, just the producer's shareholding
+# images and commentary, so ownership_structure keeps the producer's graphs.
+CHARTS = {
+    "debt_equity": ("leverage_ratio", "Debt/Equity", "debt_equity", "line"),
+    "interest_coverage": ("leverage_ratio", "Interest Coverage", "interest_coverage", "line"),
+    "current_ratio": ("activity_ratio", "Current Ratio", "current_ratio", "line"),
+    "quick_ratio": ("activity_ratio", "Quick Ratio", "quick_ratio", "line"),
+    "inventory_turnover": ("activity_ratio", "Inventory Turnover", "inventory_turnover", "line"),
+    "cash_cycle_days": ("activity_ratio", "Cash Cycle Days", "cash_conversion_cycle", "bar"),
+    "working_capital_days": ("working_capital_movement", "Working Capital Days", "cash_conversion_cycle", "bar"),
+    "roce": ("performance_ratios", "ROCE", "roce", "line"),
+    "roa": ("performance_ratios", "ROA", "roa", "line"),
+    "asset_turnover": ("performance_ratios", "Asset Turnover", "asset_turnover", "line"),
+}
+
+
+def charts_available():
+    return plt is not None
+
+
+def _values(array):
+    # JSON has no NaN; missing points are stored as null
+    return [None if math.isnan(v) else float(v) for v in array]
+
+
+def chart_spec(name, periods, values, unit=''):
+    """
+    Describes one chart: its name in CHARTS (which also fixes the report
+    section it belongs to, its title and kind) and the data to plot.
+    """
+    section, title, _, kind = CHARTS[name]
+    return {
+        "section": section,
+        "name": name,
+        "title": title,
+        "periods": [str(p) for p in periods],
+        "values": _values(values),
+        "kind": kind,
+        "unit": unit,
+    }
+
+
+def chart_key(spec):
+    """
+    Content address of a chart: the hash of the plotted data and the style,
+    independent of which report or section asked for it.
+    """
+    payload = {k: spec[k] for k in ("title", "periods", "values", "kind", "unit")}
+    payload["style"] = CHART_STYLE
+    text = json.dumps(payload, sort_keys=True)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def draw_chart(spec, path):
+    """
+    Draws one chart to a PNG at path. Runs in the chart worker processes.
+    """
+    style = CHART_STYLE
+    values = [np.nan if v is None else v for v in spec["values"]]
+    fig, ax = plt.subplots(figsize=style["figsize"], dpi=style["dpi"])
+    try:
+        positions = range(len(values))
+        if spec["kind"] == 'bar':
+            ax.bar(positions, values, color=style["color"])
+        else:
+            ax.plot(positions, values, marker='o', color=style["color"])
+        ax.set_xticks(list(positions))
+        ax.set_xticklabels(spec["periods"], fontsize=style["font_size"])
+        ax.tick_params(axis='y', labelsize=style["font_size"])
+        ax.set_title(spec["title"], fontsize=style["font_size"] + 2)
+        if spec["unit"]:
+            ax.set_ylabel(spec["unit"], fontsize=style["font_size"])
+        ax.grid(axis='y', color=style["grid_color"])
+        ax.set_axisbelow(True)
+        fig.tight_layout()
+        # Write-then-rename so a concurrent reader never sees a partial PNG
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            fig.savefig(f, format='png')
+        os.replace(temp_path, path)
+    finally:
+        plt.close(fig)
+    return path
+
+
+class ChartCache:
+    """
+    Content-addressed store of chart PNGs shared by every report. A chart is
+    drawn only if no chart with the same data and style exists yet; when the
+    store grows past max_bytes the least recently used charts are removed.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path_for(self, key):
+        return os.path.join(self.directory, key + '.png')
+
+    def lookup(self, key):
+        # A hit refreshes the file's mtime, which is what eviction orders by
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def evict(self, keep=()):
+        """
+        Removes the least recently used charts until the store fits in
+        max_bytes, never touching the paths in keep.
+        """
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.png'):
+                stat = entry.stat()
+                total += stat.st_size
+                if entry.path not in keep:
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def render(self, specs, executor=None):
+        """
+        Returns {(section, name): png path} for the specs, drawing only charts
+        that are not cached. With an executor the missing charts are drawn in
+        parallel; otherwise they are drawn in this process.
+        """
+        paths = {}
+        pending = {}
+        for spec in specs:
+            key = chart_key(spec)
+            path = self.lookup(key)
+            if path is None and key not in pending:
+                self.misses += 1
+                pending[key] = spec
+            elif path is not None:
+                self.hits += 1
+            paths[(spec["section"], spec["name"])] = self.path_for(key)
+        if pending:
+            if executor is None:
+                for key, spec in pending.items():
+                    draw_chart(spec, self.path_for(key))
+            else:
+                futures = [executor.submit(draw_chart, spec, self.path_for(key))
+                           for key, spec in pending.items()]
+                for future in futures:
+                    future.result()
+            self.evict(keep=set(paths.values()))
+        return paths
+
+
+def open_cache(search_path='.', cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Returns the ChartCache to use, or None when chart generation is off or
+    matplotlib is not installed.
+    """
+    if not charts_available():
+        return None
+    if cache_dir is None:
+        cache_dir = os.environ.get(CACHE_DIR_ENV)
+        if cache_dir is None:
+            cache_dir = os.path.join(search_path, DEFAULT_CACHE_DIR)
+    return ChartCache(cache_dir, max_bytes) if cache_dir else None
+
+
+def graph_name_key(name):
+    """
+    Matches graph names across producers: 'Debt/Equity', 'debt_equity' and
+    'Cash_Cycle_Days' / 'cash_cycle_days' compare equal.
+    """
+    return re.sub(r'[^a-z0-9]', '', str(name).lower())
+
+
+def chart_specs(ratio_table):
+    """
+    Works out the charts a report needs from its ratios (a SeriesTable from
+    ratios.compute_ratios). Charts with no data points are left out.
+    """
+    specs = []
+    for name, (_, _, ratio, _) in CHARTS.items():
+        values, mask = ratio_table.column(ratio)
+        if len(values) and not mask.all():
+            specs.append(chart_spec(name, ratio_table.periods, values, RATIOS[ratio][1]))
+    return specs
@@ -1,581 +1,618 @@
-import json
-import re
-from jinja2 import Environment, FileSystemLoader
-
-# Function to escape LaTeX special characters and replace underscores with spaces
-def escape_latex(text):
-    """
-    Escapes LaTeX special characters in the given text and replaces '&' with '\&'.
-    """
-    if not isinstance(text, str):
-        return text
-    # Adding specific replacement for '&' to ensure it appears as '\&' in LaTeX
-    replacements = {
-        '%': r'\%', '$': r'\$', '#': r'\#',
-        '&': r'\&',  # Handle ampersand specifically for LaTeX
-        '_': r'\_', '{': r'\{', '}': r'\}', '~': r'\textasciitilde{}',
-        '^': r'\textasciicircum{}', '\n': ' '
-    }
-    for key, value in replacements.items():
-        text = text.replace(key, value)
-    return text
-
-
-
-# escaped_text = escape_latex("Mr. Jayanti Patel: 47 yrs of experience in Overseas corporate affairs & finance.")
-# print(escaped_text)
-# File paths
-json_file_path = '/Users/Shreyas2/Desktop/Onfinance/credit/credit_reports-main/orig.json'
-latex_template_path = 'combined.tex'
-output_file_path = 'credit_report2.tex'
-
-# Open and read the JSON file
-with open(json_file_path, 'r') as file:
-    data = json.load(file)
-
-# Extracting data from the JSON
-company_profile = data["company_profile"]
-promoter_data = data["promoters"]["promoters"]
-key_issues = data["key_issues"]
-key_strengths = data["key_strengths"]
-Justification_of_Proposal = data["justification_of_proposal"]
-industry_risks = data["industry_risks"]
-brief_financials = data["brief_financials"]
-peer_ratings = data["peer_ratings"]
-concalls = data["Concalls"]
-recent_news = data["Recent_News"]
-# Cleaning and formatting company profile data
-def clean_text(text):
-    # Remove remaining \n and ** characters
-    text = text.replace('\n', ' ')
-    text = re.sub(r'\*\*', '', text)
-    return text
-
-def convert_to_list_format(profile):
-    formatted_profile = {}
-    for key, value in profile.items():
-        items = value.split('\n- ')
-        formatted_list = [clean_text(item.replace('- **', '').replace('**:', '')) for item in items]
-        formatted_profile[key] = formatted_list
-    return formatted_profile
-
-formatted_profile = convert_to_list_format(company_profile)
-
-names = [escape_latex(promoter["name"]) for promoter in promoter_data]
-experiences = [escape_latex(promoter["experience"]) for promoter in promoter_data]
-promoters_dict = {"names": names, "experiences": experiences}
-
-
-# promoters_dict = {
-#     "names": names,
-#     "experiences": experiences
-# }
-
-# Preparing key issues data
-key_issues_list = [
-    (escape_latex(issue["point_header"]), escape_latex(issue["point_content"]))
-    for issue in key_issues["issues"]
-]
-
-# Preparing key strengths data
-key_strengths_list = [
-    (escape_latex(strength["point_header"]), escape_latex(strength["point_content"]))
-    for strength in key_strengths["strengths"]
-]
-
-# Preparing industry risks data
-industry_risks_list = [
-    (risk["sources"][0] if isinstance(risk["sources"], list) else risk["sources"], escape_latex(risk["risk"]))
-    for risk in industry_risks["risks"]
-]
-# for risk in industry_risks["risks"]:
-#     print("Source URL Type:", type(risk["sources"]))  # This should output <class 'str'>
-#     print("Source URL:", risk["sources"])
-# Preparing Justification of Proposal data
-justification_of_proposal_list = [
-    escape_latex(justification)
-    for justification in data["justification_of_proposal"]
-]
-
-Recommendation_list= [
-    escape_latex(Recommendation)
-    for Recommendation in data["recommendation"]
-]
-
-
-def parse_financial_data(financial_section):
-    result = []
-    for entry in financial_section:
-        if entry['value'] != 'NA':
-            result.append({
-                "year": escape_latex(entry['year']),
-                "value": escape_latex(entry['value'])
-            })
-        else:
-            result.append({
-                "year": escape_latex(entry['year']),
-                "value": 'NA'
-            })
-    return result
-
-# Use the function to parse 'sales'
-sales_data = parse_financial_data(data['brief_financials']['sales'])
-
-# Process detailed financial data
-financial_data = {}
-for category, entries in data['financial_data']['table'].items():
-    financial_data[category] = []
-    for entry in entries:
-        financial_data[category].append({
-            "Quarter": escape_latex(entry['Quarter']),
-            "Value": escape_latex(str(entry['Value']))
-        })
-
-# Preparing peer ratings data
-peer_ratings_list = [
-    {
-        "company_name": escape_latex(rating["company_name"]),
-        "long_term_rating": escape_latex(rating["long_term_rating"]),
-        "short_term_rating": escape_latex(rating["short_term_rating"])
-    }
-    for rating in peer_ratings["ratings"]
-]
-
-peer_ratings_commentary = [escape_latex(comment) for comment in peer_ratings["commentary"]]
-
-# Setup Jinja2 environment and load template file
-financial_data = data["financial_data"]["table"]
-
-
-years = [item["Quarter"] for item in financial_data["Sales"]]
-value_sales = [item["Value"] for item in financial_data["Sales"]]
-value_expenses = [item["Value"] for item in financial_data["Expenses"]]
-OperatingProfit = [item["Value"] for item in financial_data["OperatingProfit"]]
-OPM = [escape_latex(item["Value"]) for item in financial_data["OPM %"]]
-OtherIncome = [item["Value"] for item in financial_data["OtherIncome"]]
-Interest = [item["Value"] for item in financial_data["Interest"]]
-Depreciation = [item["Value"] for item in financial_data["Depreciation"]]
-ProfitBeforeTax = [item["Value"] for item in financial_data["ProfitBeforeTax"]]
-TaxPercentage = [escape_latex(item["Value"]) for item in financial_data["TaxPercentage"]]
-NetProfit = [item["Value"] for item in financial_data["NetProfit"]]
-EPS = [item["Value"] for item in financial_data["EPS"]]
-
-financial_dict = {
-    "years": years,
-    "value_sales": value_sales,
-    "value_expenses": value_expenses,
-    "OperatingProfit": OperatingProfit,
-    "OPM": OPM,
-    "OtherIncome": OtherIncome,
-    "Interest": Interest,
-    "Depreciation": Depreciation,
-    "ProfitBeforeTax": ProfitBeforeTax,
-    "TaxPercentage": TaxPercentage,
-    "NetProfit": NetProfit,
-    "EPS": EPS
-}
-
-financial_commentary = [escape_latex(comment) for comment in data["financial_data"]["commentary"]]
-
-company_financials = {}
-for category, entries in data['company_financials']['table'].items():
-    company_financials[category] = []
-    for entry in entries:
-        company_financials[category].append({
-            "Year": escape_latex(entry['Year']),
-            "Value": escape_latex(str(entry['Value']))
-        })
-
-years = [entry["Year"] for entry in company_financials["Sales"]]
-sales_values = [entry["Value"] for entry in company_financials["Sales"]]
-expenses_values = [entry["Value"] for entry in company_financials["Expenses"]]
-operating_profits = [entry["Value"] for entry in company_financials["OperatingProfit"]]
-other_incomes = [entry["Value"] for entry in company_financials["OtherIncome"]]
-interest_expenses = [entry["Value"] for entry in company_financials["Interest"]]
-depreciation_costs = [entry["Value"] for entry in company_financials["Depreciation"]]
-profits_before_tax = [entry["Value"] for entry in company_financials["ProfitBeforeTax"]]
-tax_rate_percentages = [entry["Value"] for entry in company_financials["TaxPercentage"]]
-net_profits = [entry["Value"] for entry in company_financials["NetProfit"]]
-earnings_per_share = [entry["Value"] for entry in company_financials["EPS"]]
-dividend_payout_rates = [entry["Value"] for entry in company_financials["DividendPayoutPercentage"]]
-
-
-# Creating a dictionary to organize all the financial data
-company_financials_dict = {
-    "years": years,
-    "sales": sales_values,
-    "expenses": expenses_values,
-    "operating_profits": operating_profits,
-    "otherIncomes": other_incomes,
-    "interestExpenses": interest_expenses,
-    "depreciationCosts": depreciation_costs,
-    "profitsbeforetax": profits_before_tax,
-    "tax_rate_percentages": tax_rate_percentages,
-    "netprofits": net_profits,
-    "earningspershare": earnings_per_share,
-    "dividendpayoutrates": dividend_payout_rates
-}
-
-debt_schedule_data = {}
-
-# Loop over each main category in the debt_schedule table (e.g., 'borrowings', 'other_liabilities')
-for main_category, subcategories in data['debt_schedule']['table'].items():
-    debt_schedule_data[main_category] = {}
-    
-    # Loop over each subcategory like 'Total', 'LongTerm', etc., within 'borrowings' or 'other_liabilities'
-    for subcategory, entries in subcategories.items():
-        debt_schedule_data[main_category][subcategory] = []
-        
-        # Process each entry in the subcategory
-        for entry in entries:
-            # Prepare the Year and Value, ensuring Value is converted to string and checking for null values
-            formatted_entry = {
-                "Year": escape_latex(entry['Year']),
-                "Value": escape_latex(str(entry['Value'])) if entry['Value'] is not None else "N/A"
-            }
-            debt_schedule_data[main_category][subcategory].append(formatted_entry)
-debt_schedule_data = data["debt_schedule"]["table"]
-
-# Extracting borrowing details
-years = [item["Year"] for item in debt_schedule_data["borrowings"]["Total"]]
-total_borrowings = [item["Value"] for item in debt_schedule_data["borrowings"]["Total"]]
-long_term_borrowings = [item["Value"] for item in debt_schedule_data["borrowings"]["LongTerm"]]
-short_term_borrowings = [item["Value"] for item in debt_schedule_data["borrowings"]["ShortTerm"]]
-lease_liabilities = [item["Value"] for item in debt_schedule_data["borrowings"]["LeaseLiabilities"]]
-other_borrowings = [item["Value"] for item in debt_schedule_data["borrowings"]["OtherBorrowings"]]
-
-# Extracting other liability details
-total_liabilities = [item["Value"] for item in debt_schedule_data["other_liabilities"]["Total"]]
-non_controlling_interest = [item["Value"] for item in debt_schedule_data["other_liabilities"]["NonControllingInterest"]]
-trade_payables = [item["Value"] for item in debt_schedule_data["other_liabilities"]["TradePayables"]]
-advances_from_customers = [item["Value"] for item in debt_schedule_data["other_liabilities"]["AdvanceFromCustomers"]]
-other_liability_items = [item["Value"] for item in debt_schedule_data["other_liabilities"]["OtherLiabilityItems"]]
-
-# Combining all data into a single dictionary
-debt_data_dict = {
-    "years": years,
-    "totalborrowings": total_borrowings,
-    "longterm_borrowings": long_term_borrowings,
-    "shorttermborrowings": short_term_borrowings,
-    "leaseliabilities": lease_liabilities,
-    "otherborrowings": other_borrowings,
-    "totalliabilities": total_liabilities,
-    "noncontrollinginterest": non_controlling_interest,
-    "tradepayables": trade_payables,
-    "advances_fromcustomers": advances_from_customers,
-    "otherliabilityitems": other_liability_items
-}
-
-debt_schedule_commentary = [escape_latex(comment) for comment in data["debt_schedule"]["commentary"]]
-
-# Setup Jinja2 environment and load template file
-balance_sheet_analysis = data["balance_sheet_analysis"]["table"]
-
-years = [item["Year"] for item in balance_sheet_analysis["EquityCapital"]]
-EquityCapital = [item["Value"] for item in balance_sheet_analysis["EquityCapital"]]
-Reserves = [item["Value"] for item in balance_sheet_analysis["Reserves"]]
-Borrowings = [item["Value"] for item in balance_sheet_analysis["Borrowings"]]
-OtherLiabilities = [item["Value"] for item in balance_sheet_analysis["OtherLiabilities"]]
-TotalLiabilities = [item["Value"] for item in balance_sheet_analysis["TotalLiabilities"]]
-FixedAssets = [item["Value"] for item in balance_sheet_analysis["FixedAssets"]]
-CWIP = [item["Value"] for item in balance_sheet_analysis["CWIP"]]
-Investments = [item["Value"] for item in balance_sheet_analysis["Investments"]]
-OtherAssets = [item["Value"] for item in balance_sheet_analysis["OtherAssets"]]
-Inventories = [item["Value"] for item in balance_sheet_analysis["Inventories"]]
-TradeReceivables = [item["Value"] for item in balance_sheet_analysis["TradeReceivables"]]
-CashEquivalents = [item["Value"] for item in balance_sheet_analysis["CashEquivalents"]]
-ShortTermLoans = [item["Value"] for item in balance_sheet_analysis["ShortTermLoans"]]
-OtherAssetItems = [item["Value"] for item in balance_sheet_analysis["OtherAssetItems"]]
-TotalAssets = [item["Value"] for item in balance_sheet_analysis["TotalAssets"]]
-
-balance_sheet_dict = {
-    "years": years,
-    "EquityCapital": EquityCapital,
-    "Reserves": Reserves,
-    "Borrowings": Borrowings,
-    "OtherLiabilities": OtherLiabilities,
-    "TotalLiabilities": TotalLiabilities,
-    "FixedAssets": FixedAssets,
-    "CWIP": CWIP,
-    "Investments": Investments,
-    "OtherAssets": OtherAssets,
-    "Inventories": Inventories,
-    "TradeReceivables": TradeReceivables,
-    "CashEquivalents": CashEquivalents,
-    "ShortTermLoans": ShortTermLoans,
-    "OtherAssetItems": OtherAssetItems,
-    "TotalAssets": TotalAssets
-}
-
-balance_sheet_commentary = [escape_latex(comment) for comment in data["balance_sheet_analysis"]["commentary"]]
-company_financials_commentary = [escape_latex(comment) for comment in data["company_financials"]["commentary"]]
-cash_flow_analysis_commentary = [escape_latex(comment) for comment in data["cash_flow_analysis"]["commentary"]]
-# Accessing the fixed assets table from the provided data structure
-fixed_assets_data = {}
-for category, entries in data['fixed_assets']['table'].items():
-    fixed_assets_data[category] = []
-    for entry in entries:
-        fixed_assets_data[category].append({
-            "Year": entry['Year'],
-            "Value": entry['Value']
-        })
-fixed_assets_data = data["fixed_assets"]["table"]
-
-# Extracting data for each asset category
-years = [item["Year"] for item in fixed_assets_data["Land"]]
-land_values = [item["Value"] for item in fixed_assets_data["Land"]]
-building_values = [item["Value"] for item in fixed_assets_data["Building"]]
-plant_machinery_values = [item["Value"] for item in fixed_assets_data["PlantMachinery"]]
-equipment_values = [item["Value"] for item in fixed_assets_data["Equipments"]]
-furniture_fittings_values = [item["Value"] for item in fixed_assets_data["FurnitureNFittings"]]
-vehicle_values = [item["Value"] for item in fixed_assets_data["Vehicles"]]
-wind_turbine_values = [item["Value"] for item in fixed_assets_data["WindTurbines"]]
-intangible_assets_values = [item["Value"] for item in fixed_assets_data["IntangibleAssets"]]
-other_fixed_assets_values = [item["Value"] for item in fixed_assets_data["OtherFixedAssets"]]
-gross_block_values = [item["Value"] for item in fixed_assets_data["GrossBlock"]]
-accumulated_depreciation_values = [item["Value"] for item in fixed_assets_data["AccumulatedDepreciation"]]
-cwip_values = [item["Value"] for item in fixed_assets_data["CWIP"]]
-investments_values = [item["Value"] for item in fixed_assets_data["Investments"]]
-inventories_values = [item["Value"] for item in fixed_assets_data["Inventories"]]
-trade_receivables_values = [item["Value"] for item in fixed_assets_data["TradeReceivables"]]
-cash_equivalents_values = [item["Value"] for item in fixed_assets_data["CashEquivalents"]]
-short_term_loans_values = [item["Value"] for item in fixed_assets_data["ShortTermLoans"]]
-other_asset_items_values = [item["Value"] for item in fixed_assets_data["OtherAssetItems"]]
-total_assets_values = [item["Value"] for item in fixed_assets_data["TotalAssets"]]
-
-# Combining all data into a single dictionary
-fixed_assets_dict = {
-    "years": years,
-    "land": land_values,
-    "building": building_values,
-    "plant_machinery": plant_machinery_values,
-    "equipment": equipment_values,
-    "furniture_fittings": furniture_fittings_values,
-    "vehicles": vehicle_values,
-    "wind_turbines": wind_turbine_values,
-    "intangible_assets": intangible_assets_values,
-    "other_fixed_assets": other_fixed_assets_values,
-    "gross_block": gross_block_values,
-    "accumulated_depreciation": accumulated_depreciation_values,
-    "cwip": cwip_values,
-    "investments": investments_values,
-    "inventories": inventories_values,
-    "trade_receivables": trade_receivables_values,
-    "cash_equivalents": cash_equivalents_values,
-    "short_term_loans": short_term_loans_values,
-    "other_asset_items": other_asset_items_values,
-    "total_assets": total_assets_values
-}
-
-fixed_assets_commentary = [escape_latex(comment) for comment in data["fixed_assets"]["commentary"]]
-# Accessing the cash flow analysis table from the provided data structure
-cash_flow_data = {}
-
-# Loop over each cash flow category in the table data
-for category, entries in data['cash_flow_analysis']['table'].items():
-    cash_flow_data[category] = []
-    
-    # Process each entry in the category
-    for entry in entries:
-        # Prepare the Year and Value, ensuring Value is converted to string and checking for null values
-        formatted_entry = {
-            "Year": escape_latex(entry['year']),
-            "Value": escape_latex(str(entry['value'])) if entry['value'] is not None else "N/A"
-        }
-        cash_flow_data[category].append(formatted_entry)
-
-cash_flow_data = data["cash_flow_analysis"]["table"]
-
-# Extracting data for each cash flow component
-years = [item["year"] for item in cash_flow_data["profit_from_operations"]]
-profit_from_operations = [item["value"] for item in cash_flow_data["profit_from_operations"]]
-receivables = [item["value"] for item in cash_flow_data["receivables"]]
-inventory = [item["value"] for item in cash_flow_data["inventory"]]
-loans_advances = [item["value"] for item in cash_flow_data["Loans_Advances"]]
-other_wc_items = [item["value"] for item in cash_flow_data["Other_WC_items"]]
-direct_taxes = [item["value"] for item in cash_flow_data["Direct_taxes"]]
-fixed_assets_purchased = [item["value"] for item in cash_flow_data["Fixed_assets_purchased"]]
-fixed_assets_sold = [item["value"] for item in cash_flow_data["Fixed_assets_sold"]]
-investments_purchased = [item["value"] for item in cash_flow_data["Investments_purchased"]]
-investments_sold = [item["value"] for item in cash_flow_data["Investments_sold"]]
-interest_received = [item["value"] for item in cash_flow_data["Interest_received"]]
-invest_in_subsidies = [item["value"] for item in cash_flow_data["Invest_in_subsidiaries"]]
-investment_in_group_cos = [item["value"] for item in cash_flow_data["Investment_in_group_cos"]]
-other_investing_items = [item["value"] for item in cash_flow_data["Other_investing_items"]]
-proceeds_from_shares = [item["value"] for item in cash_flow_data["Proceeds_from_shares"]]
-proceeds_from_borrowings = [item["value"] for item in cash_flow_data["Proceeds_from_borrowings"]]
-repayment_of_borrowings = [item["value"] for item in cash_flow_data["Repayment_of_borrowings"]]
-interest_paid_fin = [item["value"] for item in cash_flow_data["Interest_paid_fin"]]
-dividends_paid = [item["value"] for item in cash_flow_data["Dividends_paid"]]
-financial_liabilities = [item["value"] for item in cash_flow_data["Financial_liabilities"]]
-other_financing_items = [item["value"] for item in cash_flow_data["Other_financing_items"]]
-
-# Combining all data into a single dictionary
-cash_flow_analysis_dict = {
-    "years": years,
-    "profit_from_operations": profit_from_operations,
-    "changes_in_receivables": receivables,
-    "changes_in_inventory": inventory,
-    "changes_in_loans_advances": loans_advances,
-    "other_wc_items": other_wc_items,
-    "direct_taxes": direct_taxes,
-    "fixed_assets_purchased": fixed_assets_purchased,
-    "fixed_assets_sold": fixed_assets_sold,
-    "investments_purchased": investments_purchased,
-    "investments_sold": investments_sold,
-    "interest_received": interest_received,
-    "invest_in_subsidies": invest_in_subsidies,
-    "investment_in_group_cos": investment_in_group_cos,
-    "other_investing_items": other_investing_items,
-    "proceeds_from_shares": proceeds_from_shares,
-    "proceeds_from_borrowings": proceeds_from_borrowings,
-    "repayment_of_borrowings": repayment_of_borrowings,
-    "interest_paid_fin": interest_paid_fin,
-    "dividends_paid": dividends_paid,
-    "financial_liabilities": financial_liabilities,
-    "other_financing_items": other_financing_items
-}
-cash_flow_analysis_commentary = [escape_latex(comment) for comment in data["cash_flow_analysis"]["commentary"]]
-# Setup Jinja2 environment and load template file
-leverage_ratio_data = data["leverage_ratio"]
-#leverage_ratio_graphs = [{"name": key, "url": value["url"]} for key, value in leverage_ratio_data["graphs"].items()]
-leverage_ratio_commentary = [escape_latex(comment) for comment in leverage_ratio_data["commentary"]]
-leverage_ratio_graphs = [{"name": key, "url": value} for key, value in leverage_ratio_data["graphs"].items()]
-#leverage_ratio_commentary = leverage_ratio_data.commentary
-
-# Extracting performance ratios data
-performance_ratios_data = data["performance_ratios"]
-#performance_ratio_graphs = [{"name": key, "url": value["url"]} for key, value in performance_ratios_data["graphs"].items()]
-performance_ratio_commentary = [escape_latex(comment) for comment in performance_ratios_data["commentary"]]
-performance_ratio_graphs = [{"name": key, "url": value} for key, value in performance_ratios_data["graphs"].items()]
-#performance_ratio_commentary = leverage_ratio_data.commentary
-# Extracting activity ratios data
-activity_ratios_data = data["activity_ratio"]
-#activity_ratio_graphs = [{"name": key, "url": value["url"]} for key, value in activity_ratios_data["graphs"].items()]
-activity_ratio_commentary = [escape_latex(comment) for comment in activity_ratios_data["commentary"]]
-activity_ratio_graphs = [{"name": key, "url": value} for key, value in activity_ratios_data["graphs"].items()]
-#activity_ratio_commentary = activity_ratios_data.commentary
-# Extracting valuation ratios data
-# valuation_ratios_data = data["valuation_ratios"]
-# valuation_ratio_graphs = [{"name": key, "url": value["url"]} for key, value in valuation_ratios_data["graphs"].items()]
-# valuation_ratio_commentary = [escape_latex(comment) for comment in valuation_ratios_data["commentary"]]
-working_capital_movement_data = data["working_capital_movement"]
-working_capital_movement_commentary = [escape_latex(comment) for comment in working_capital_movement_data["commentary"]]
-working_capital_movement_graphs = [{"name": key, "url": value["url"]} for key, value in working_capital_movement_data["graphs"].items()]
-# Setup Jinja2 environment and load template file
-ownership_structure_data = data["ownership_structure"]
-ownership_structure_graphs = [{"name": key, "url": value["url"]} for key, value in ownership_structure_data["graphs"].items()]
-ownership_structure_commentary = [escape_latex(comment) for comment in ownership_structure_data["commentary"]]
-
-# Setup Jinja2 environment and load template file
-subsidiary_jv_info_data = {
-    "subsidiary": [],
-    "JV_information": [escape_latex(jv) for jv in data["subsidiary_jv_info"]["JV_information"]]
-}
-
-subsidiaries = data["subsidiary_jv_info"]["subsidiary"]
-for subsidiary in subsidiaries:
-    date_of_creation_key = "Date_of_Creation" if "Date_of_Creation" in subsidiary else "Date of Creation"
-    
-    subsidiary_info = {
-        "subsidiary_name": escape_latex(subsidiary["subsidiary_name"]),
-        date_of_creation_key: escape_latex(subsidiary[date_of_creation_key]),
-        "Interest": escape_latex(subsidiary["Interest"]),
-        "Location": escape_latex(subsidiary["Location"])
-    }
-    subsidiary_jv_info_data["subsidiary"].append(subsidiary_info)
-
-
-# Setup Jinja2 environment and load template file
-cash_flow_data = {
-    "commentary": [escape_latex(comment) for comment in data["cash_flow_analysis"]["commentary"]],
-    "graph": {
-        "url": escape_latex(data["cash_flow_analysis"]["graph"]["url"])
-    },
-    "graph_commentary": [escape_latex(comment) for comment in data["cash_flow_analysis"]["graph_commentary"]]
-}
-
-table = data["cash_flow_analysis"]["table"]
-cash_flow_data["table"] = {}
-
-for category, details in table.items():
-    years = [item["year"] for item in details]
-    values = [item["value"] for item in details]
-    cash_flow_data["table"][category] = {
-        "Years": years,
-        "Values": values
-    }
-financial_analysis_data = {
-    "Profitability": {},
-    "commentary": [escape_latex(comment) for comment in data["financial_analysis"]["commentary"]]
-}
-
-# profitability = data["financial_analysis"]["Profitability"]
-# for metric, details in profitability.items():
-#     years = [item["year"] for item in details]
-#     values = [item["value"] for item in details]
-#     financial_analysis_data["Profitability"][metric] = {
-#         "Years": years,
-#         "Values": values
-#     }
-
-print(financial_analysis_data)
-
-# Setup Jinja2 environment and load template file
-env = Environment(loader=FileSystemLoader('.'))
-env.filters['escape_latex'] = escape_latex
-template = env.get_template(latex_template_path)
-
-# Render the template with the combined data
-rendered_str = template.render(
-    concalls = concalls,
-    recent_news=recent_news,
-    company_profile=formatted_profile,
-    promoters_dict=promoters_dict,
-    key_issues=key_issues_list,
-    key_strengths=key_strengths_list,
-    industry_risks=industry_risks_list,
-    brief_financials=financial_data,
-    financial_dict=financial_dict,
-    financial_commentary=financial_commentary,
-    balance_sheet_dict=balance_sheet_dict,
-    balance_sheet_commentary=balance_sheet_commentary,
-    leverage_ratio_graphs=leverage_ratio_graphs,
-
-    fixed_assets_data = fixed_assets_data,
-    fixed_assets_commentary = fixed_assets_commentary,
-    fixed_assets_dict = fixed_assets_dict,
-    company_financials = company_financials,
-    company_financials_dict = company_financials_dict,
-    company_financials_commentary = company_financials_commentary,
-    debt_data=debt_schedule_data ,
-    debt_data_dict = debt_data_dict,
-    debt_schedule_commentary = debt_schedule_commentary,
-    cash_flow_data = cash_flow_data,
-    cash_flow_analysis_dict = cash_flow_analysis_dict,
-    cash_flow_analysis_commentary  = cash_flow_analysis_commentary ,
-    justification_of_proposal = justification_of_proposal_list,
-    Recommendation =  Recommendation_list,
-
-    leverage_ratio_commentary=leverage_ratio_commentary,
-    performance_ratio_graphs=performance_ratio_graphs,
-    performance_ratio_commentary=performance_ratio_commentary,
-    activity_ratio_graphs=activity_ratio_graphs,
-    activity_ratio_commentary=activity_ratio_commentary,
-    ownership_structure_graphs=ownership_structure_graphs,
-    ownership_structure_commentary=ownership_structure_commentary,
-    peer_ratings=peer_ratings_list,
-    peer_commentary=peer_ratings_commentary,
-   
-    working_capital_graphs=working_capital_movement_graphs,
-    working_capital_movement_commentary = working_capital_movement_commentary ,
-    subsidiary_jv_info_data=subsidiary_jv_info_data,
-    financial_analysis_data=financial_analysis_data
-)
-
-# Write the rendered template to the output file
-with open(output_file_path, "w") as f:
-    f.write(rendered_str)
-
-print("Credit Appraisal LaTeX file has been generated and saved as credit_appraisal_output.tex")
-print(rendered_str)
\ No newline at end of file
+import argparse
+import contextlib
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import charts
+import compile_pdf
+import fragments
+import sections
+import tracing
+from financials import SeriesTable
+from ingest import load_document
+from latex_escape import LatexSafe, escape_latex, finalize_latex
+from number_format import UNITS, number_format, unit_scale
+from profile_text import parse_profile
+from peers import benchmark_rows, company_id, load_benchmarks
+from providers import ProviderRegistry, generate
+from ratios import RATIO_DECIMALS, RATIOS, compute_ratios
+from schema import normalize_document
+from templates import make_environment
+from validation import SchemaError, validate_document
+
+# escaped_text = escape_latex("Mr. Jayanti Patel: 47 yrs of experience in Overseas corporate affairs & finance.")
+# print(escaped_text)
+# File paths
+json_file_path = '/Users/Shreyas2/Desktop/Onfinance/credit/credit_reports-main/orig.json'
+latex_template_path = 'combined.tex'
+output_file_path = 'credit_report2.tex'
+
+# Characters buffered before each write of the rendered output
+OUTPUT_BUFFER_SIZE = 64 * 1024
+
+# Threads rendering a single report's sections concurrently (see sections.py)
+SECTION_THREADS = 4
+
+# Unit the producers give amounts in, and the unit the tables show them in
+SOURCE_UNIT = 'crore'
+REPORT_UNIT = 'crore'
+
+# Canonical metrics that are percentages even where the producer writes bare
+# numbers, and per-share figures, which are never scaled to REPORT_UNIT
+PERCENT_METRICS = {"opm", "tax_percentage", "dividend_payout_percentage"}
+PER_SHARE_METRICS = {"eps"}
+
+# Cell formats for the tables (see number_format.py)
+AMOUNT_FORMAT = number_format(scale=unit_scale(SOURCE_UNIT, REPORT_UNIT))
+PER_SHARE_FORMAT = number_format()
+PERCENT_FORMAT = number_format(percent=True)
+RATIO_FORMAT = number_format(decimals=RATIO_DECIMALS)
+
+# Template row name -> canonical metric name (see schema.py) for every table.
+FINANCIAL_DICT_COLUMNS = {
+    "value_sales": "sales",
+    "value_expenses": "expenses",
+    "OperatingProfit": "operating_profit",
+    "OPM": "opm",
+    "OtherIncome": "other_income",
+    "Interest": "interest",
+    "Depreciation": "depreciation",
+    "ProfitBeforeTax": "profit_before_tax",
+    "TaxPercentage": "tax_percentage",
+    "NetProfit": "net_profit",
+    "EPS": "eps",
+}
+
+COMPANY_FINANCIALS_COLUMNS = {
+    "sales": "sales",
+    "expenses": "expenses",
+    "operating_profits": "operating_profit",
+    "otherIncomes": "other_income",
+    "interestExpenses": "interest",
+    "depreciationCosts": "depreciation",
+    "profitsbeforetax": "profit_before_tax",
+    "tax_rate_percentages": "tax_percentage",
+    "netprofits": "net_profit",
+    "earningspershare": "eps",
+    "dividendpayoutrates": "dividend_payout_percentage",
+}
+
+BORROWINGS_COLUMNS = {
+    "totalborrowings": "total",
+    "longterm_borrowings": "long_term",
+    "shorttermborrowings": "short_term",
+    "leaseliabilities": "lease_liabilities",
+    "otherborrowings": "other_borrowings",
+}
+
+OTHER_LIABILITIES_COLUMNS = {
+    "totalliabilities": "total",
+    "noncontrollinginterest": "non_controlling_interest",
+    "tradepayables": "trade_payables",
+    "advances_fromcustomers": "advance_from_customers",
+    "otherliabilityitems": "other_liability_items",
+}
+
+BALANCE_SHEET_COLUMNS = {
+    "EquityCapital": "equity_capital",
+    "Reserves": "reserves",
+    "Borrowings": "borrowings",
+    "OtherLiabilities": "other_liabilities",
+    "TotalLiabilities": "total_liabilities",
+    "FixedAssets": "fixed_assets",
+    "CWIP": "cwip",
+    "Investments": "investments",
+    "OtherAssets": "other_assets",
+    "Inventories": "inventories",
+    "TradeReceivables": "trade_receivables",
+    "CashEquivalents": "cash_equivalents",
+    "ShortTermLoans": "short_term_loans",
+    "OtherAssetItems": "other_asset_items",
+    "TotalAssets": "total_assets",
+}
+
+FIXED_ASSETS_COLUMNS = {
+    "land": "land",
+    "building": "building",
+    "plant_machinery": "plant_machinery",
+    "equipment": "equipments",
+    "furniture_fittings": "furniture_n_fittings",
+    "vehicles": "vehicles",
+    "wind_turbines": "wind_turbines",
+    "intangible_assets": "intangible_assets",
+    "other_fixed_assets": "other_fixed_assets",
+    "gross_block": "gross_block",
+    "accumulated_depreciation": "accumulated_depreciation",
+    "cwip": "cwip",
+    "investments": "investments",
+    "inventories": "inventories",
+    "trade_receivables": "trade_receivables",
+    "cash_equivalents": "cash_equivalents",
+    "short_term_loans": "short_term_loans",
+    "other_asset_items": "other_asset_items",
+    "total_assets": "total_assets",
+}
+
+CASH_FLOW_COLUMNS = {
+    "profit_from_operations": "profit_from_operations",
+    "changes_in_receivables": "receivables",
+    "changes_in_inventory": "inventory",
+    "changes_in_loans_advances": "loans_advances",
+    "other_wc_items": "other_wc_items",
+    "direct_taxes": "direct_taxes",
+    "fixed_assets_purchased": "fixed_assets_purchased",
+    "fixed_assets_sold": "fixed_assets_sold",
+    "investments_purchased": "investments_purchased",
+    "investments_sold": "investments_sold",
+    "interest_received": "interest_received",
+    "invest_in_subsidies": "invest_in_subsidiaries",
+    "investment_in_group_cos": "investment_in_group_cos",
+    "other_investing_items": "other_investing_items",
+    "proceeds_from_shares": "proceeds_from_shares",
+    "proceeds_from_borrowings": "proceeds_from_borrowings",
+    "repayment_of_borrowings": "repayment_of_borrowings",
+    "interest_paid_fin": "interest_paid_fin",
+    "dividends_paid": "dividends_paid",
+    "financial_liabilities": "financial_liabilities",
+    "other_financing_items": "other_financing_items",
+}
+
+def column_format(table, metric, amounts=AMOUNT_FORMAT):
+    # Percentages and per-share figures keep their own format; everything
+    # else is an amount
+    if metric in table.percent_metrics or metric in PERCENT_METRICS:
+        return PERCENT_FORMAT
+    if metric in PER_SHARE_METRICS:
+        return PER_SHARE_FORMAT
+    return amounts
+
+def table_dict(table, columns, years=None, amounts=AMOUNT_FORMAT):
+    """
+    Builds the {"years": [...], <row>: [cells]} dict a template table reads from
+    a columnar SeriesTable. Rows are formatted in the format column_format
+    picks for their metric, all the rows sharing a format in one pass.
+    """
+    result = {"years": table.periods if years is None else years}
+    by_format = {}
+    for row, metric in columns.items():
+        by_format.setdefault(column_format(table, metric, amounts), []).append((row, metric))
+    for fmt, rows in by_format.items():
+        cells = table.format_columns([metric for _, metric in rows], fmt)
+        result.update(zip([row for row, _ in rows], cells))
+    return result
+
+def verbatim(value):
+    # URLs and file paths must reach LaTeX untouched, so they skip the escaping
+    # the template's finalize hook applies to every other string
+    return LatexSafe(value) if isinstance(value, str) else value
+
+def first_source(sources):
+    # ultimate gives a risk's single source as a string, orig a list of them
+    if isinstance(sources, str):
+        return sources
+    return sources[0] if sources else None
+
+
+def chart_graphs(ratio_table, chart_cache=None, executor=None):
+    """
+    Returns {section: {graph name key: {"name": title, "url": png path}}} for
+    every chart in charts.CHARTS. Charts are only drawn (url set) with a chart
+    cache and when the report has data for the ratio; the titles are used
+    either way.
+    """
+    specs = charts.chart_specs(ratio_table)
+    paths = chart_cache.render(specs, executor) if chart_cache is not None else {}
+    result = {}
+    for name, (section, title, _, _) in charts.CHARTS.items():
+        result.setdefault(section, {})[charts.graph_name_key(name)] = {
+            "name": title,
+            "url": paths.get((section, name)),
+        }
+    return result
+
+def graph_list(graphs, generated=None):
+    """
+    Merges a section's graphs from the JSON with the charts generated for it: a
+    generated chart replaces the graph of the same name, the others are
+    appended. Graphs without an image are dropped.
+    """
+    generated = dict(generated or {})
+    result = []
+    for graph in graphs:
+        chart = generated.pop(charts.graph_name_key(graph["name"]), None) or {}
+        url = chart.get("url") or graph["url"]
+        if url:
+            result.append({"name": chart.get("name", graph["name"]), "url": verbatim(url)})
+    for chart in generated.values():
+        if chart["url"]:
+            result.append({"name": chart["name"], "url": verbatim(chart["url"])})
+    return result
+
+
+# Every template variable and the function that builds it (see providers.py)
+SECTIONS = ProviderRegistry()
+
+
+@SECTIONS.provides("_model")
+def _model(ctx):
+    with tracing.span("normalize"):
+        return normalize_document(ctx.inputs["data"], records=ctx.inputs.get("records", False))
+
+@SECTIONS.provides("_ratios")
+def _ratios(ctx):
+    return compute_ratios(ctx["_model"])
+
+@SECTIONS.provides("_charts")
+def _charts(ctx):
+    return chart_graphs(ctx["_ratios"], ctx.inputs.get("chart_cache"), ctx.inputs.get("chart_executor"))
+
+def _section_graphs(section):
+    def provide(ctx):
+        return graph_list(ctx["_model"][section]["graphs"], ctx["_charts"].get(section))
+    return provide
+
+def _producer_graphs(section):
+    # Sections with no generated charts: the producer's own images, as given
+    def provide(ctx):
+        return graph_list(ctx["_model"][section]["graphs"])
+    return provide
+
+def _commentary(section):
+    def provide(ctx):
+        return ctx["_model"][section]["commentary"]
+    return provide
+
+def _model_value(section):
+    def provide(ctx):
+        return ctx["_model"][section]
+    return provide
+
+
+SECTIONS.provides("concalls")(_model_value("concalls"))
+SECTIONS.provides("recent_news")(_model_value("recent_news"))
+SECTIONS.provides("justification_of_proposal")(_model_value("justification_of_proposal"))
+SECTIONS.provides("Recommendation")(_model_value("recommendation"))
+
+SECTIONS.provides("financial_commentary")(_commentary("financial_data"))
+SECTIONS.provides("balance_sheet_commentary")(_commentary("balance_sheet_analysis"))
+SECTIONS.provides("fixed_assets_commentary")(_commentary("fixed_assets"))
+SECTIONS.provides("company_financials_commentary")(_commentary("company_financials"))
+SECTIONS.provides("debt_schedule_commentary")(_commentary("debt_schedule"))
+SECTIONS.provides("cash_flow_analysis_commentary")(_commentary("cash_flow_analysis"))
+SECTIONS.provides("leverage_ratio_commentary")(_commentary("leverage_ratio"))
+SECTIONS.provides("performance_ratio_commentary")(_commentary("performance_ratios"))
+SECTIONS.provides("activity_ratio_commentary")(_commentary("activity_ratio"))
+SECTIONS.provides("ownership_structure_commentary")(_commentary("ownership_structure"))
+SECTIONS.provides("peer_commentary")(_commentary("peer_ratings"))
+SECTIONS.provides("working_capital_movement_commentary")(_commentary("working_capital_movement"))
+
+SECTIONS.provides("leverage_ratio_graphs")(_section_graphs("leverage_ratio"))
+SECTIONS.provides("performance_ratio_graphs")(_section_graphs("performance_ratios"))
+SECTIONS.provides("activity_ratio_graphs")(_section_graphs("activity_ratio"))
+SECTIONS.provides("ownership_structure_graphs")(_producer_graphs("ownership_structure"))
+SECTIONS.provides("working_capital_graphs")(_section_graphs("working_capital_movement"))
+
+
+@SECTIONS.provides("figures_unit")
+def figures_unit(ctx):
+    # Unit label for the table headers, e.g. "INR Cr."
+    return UNITS[REPORT_UNIT][1]
+
+@SECTIONS.provides("company_profile")
+def company_profile(ctx):
+    # Each field as a tree of bullets (see profile_text.py)
+    return parse_profile(ctx["_model"]["company_profile"])
+
+@SECTIONS.provides("promoters_dict")
+def promoters_dict(ctx):
+    promoters = ctx["_model"]["promoters"]
+    return {
+        "names": [promoter["name"] for promoter in promoters],
+        "experiences": [promoter["experience"] for promoter in promoters],
+    }
+
+@SECTIONS.provides("key_issues")
+def key_issues(ctx):
+    return [(issue["point_header"], issue["point_content"]) for issue in ctx["_model"]["key_issues"]]
+
+@SECTIONS.provides("key_strengths")
+def key_strengths(ctx):
+    return [(strength["point_header"], strength["point_content"])
+            for strength in ctx["_model"]["key_strengths"]]
+
+@SECTIONS.provides("industry_risks")
+def industry_risks(ctx):
+    return [(verbatim(first_source(risk["sources"])), risk["risk"]) for risk in ctx["_model"]["industry_risks"]]
+
+@SECTIONS.provides("peer_ratings")
+def peer_ratings(ctx):
+    return [
+        {
+            "company_name": rating["company_name"],
+            "long_term_rating": rating["long_term_rating"],
+            "short_term_rating": rating["short_term_rating"]
+        }
+        for rating in ctx["_model"]["peer_ratings"]["ratings"]
+    ]
+
+@SECTIONS.provides("peer_benchmark")
+def peer_benchmark(ctx):
+    # The company's entry in a portfolio benchmark file (see peers.py), if any
+    entry = ctx.inputs.get("peer_benchmark")
+    if not entry:
+        return None
+    return {
+        "sector": entry["sector"],
+        "period": entry["period"],
+        "peers": entry["peers"],
+        "rows": benchmark_rows(entry),
+    }
+
+# Every table below is a columnar SeriesTable (see financials.py)
+@SECTIONS.provides("brief_financials")
+def brief_financials(ctx):
+    return ctx["_model"]["financial_data"]["table"]
+
+@SECTIONS.provides("financial_dict")
+def financial_dict(ctx):
+    return table_dict(ctx["_model"]["financial_data"]["table"], FINANCIAL_DICT_COLUMNS)
+
+@SECTIONS.provides("company_financials")
+def company_financials(ctx):
+    return ctx["_model"]["company_financials"]["table"]
+
+@SECTIONS.provides("company_financials_dict")
+def company_financials_dict(ctx):
+    return table_dict(ctx["_model"]["company_financials"]["table"], COMPANY_FINANCIALS_COLUMNS)
+
+@SECTIONS.provides("debt_data")
+def debt_data(ctx):
+    return ctx["_model"]["debt_schedule"]["table"]
+
+@SECTIONS.provides("debt_data_dict")
+def debt_data_dict(ctx):
+    # Borrowings and other liabilities share the borrowings year axis
+    debt_table = ctx["_model"]["debt_schedule"]["table"]
+    borrowings = debt_table.get("borrowings") or SeriesTable.from_entries({})
+    other_liabilities = debt_table.get("other_liabilities") or SeriesTable.from_entries({})
+    result = table_dict(borrowings, BORROWINGS_COLUMNS)
+    result.update(table_dict(other_liabilities, OTHER_LIABILITIES_COLUMNS, years=result["years"]))
+    return result
+
+@SECTIONS.provides("balance_sheet_dict")
+def balance_sheet_dict(ctx):
+    return table_dict(ctx["_model"]["balance_sheet_analysis"]["table"], BALANCE_SHEET_COLUMNS)
+
+@SECTIONS.provides("fixed_assets_data")
+def fixed_assets_data(ctx):
+    return ctx["_model"]["fixed_assets"]["table"]
+
+@SECTIONS.provides("fixed_assets_dict")
+def fixed_assets_dict(ctx):
+    return table_dict(ctx["_model"]["fixed_assets"]["table"], FIXED_ASSETS_COLUMNS)
+
+@SECTIONS.provides("ratios_dict")
+def ratios_dict(ctx):
+    # One row per ratio in ratios.RATIOS, keyed by the ratio name
+    return table_dict(ctx["_ratios"], {name: name for name in RATIOS}, amounts=RATIO_FORMAT)
+
+@SECTIONS.provides("cash_flow_analysis_dict")
+def cash_flow_analysis_dict(ctx):
+    return table_dict(ctx["_model"]["cash_flow_analysis"]["table"], CASH_FLOW_COLUMNS)
+
+@SECTIONS.provides("cash_flow_data")
+def cash_flow_data(ctx):
+    cash_flow = ctx["_model"]["cash_flow_analysis"]
+    table = cash_flow["table"]
+    return {
+        "commentary": cash_flow["commentary"],
+        "graph": {
+            "url": verbatim(cash_flow["graph"]["url"])
+        },
+        "graph_commentary": cash_flow["graph_commentary"],
+        "table": {
+            category: {"Years": table.periods, "Values": table.format_column(category, column_format(table, category))}
+            for category in table.metrics
+        },
+    }
+
+@SECTIONS.provides("subsidiary_jv_info_data")
+def subsidiary_jv_info_data(ctx):
+    info = ctx["_model"]["subsidiary_jv_info"]
+    return {
+        "subsidiary": [
+            {
+                "subsidiary_name": subsidiary.get("subsidiary_name"),
+                "date_of_creation": subsidiary.get("date_of_creation"),
+                "interest": subsidiary.get("interest"),
+                "location": subsidiary.get("location")
+            }
+            for subsidiary in info["subsidiaries"]
+        ],
+        "JV_information": info["jv_information"],
+    }
+
+@SECTIONS.provides("financial_analysis_data")
+def financial_analysis_data(ctx):
+    return {
+        "Profitability": {},
+        "commentary": ctx["_model"]["financial_analysis"]["commentary"]
+    }
+
+
+def build_context(data, chart_cache=None, chart_executor=None, peer_benchmark=None, records=False):
+    """
+    Returns the template variables for one company from its parsed JSON
+    document, as a providers.LazyContext: each variable is built by its
+    provider in SECTIONS the first time the template (or anything else) reads
+    it, so sections the template does not use are never built.
+    Either producer layout is accepted; schema.normalize_document maps it first.
+    Values are left unescaped: the template environment escapes each one exactly
+    once on output (latex_escape.finalize_latex).
+    With a charts.ChartCache the ratio charts are drawn from the report's tables
+    (missing ones in chart_executor if given) and replace the JSON's image paths.
+    peer_benchmark is the company's entry from peers.load_benchmarks, shown in
+    the peer section. With records the model's list sections are built as
+    compact records (see records.py and add_records_arg).
+    """
+    return SECTIONS.context(data=data, chart_cache=chart_cache, chart_executor=chart_executor,
+                            peer_benchmark=peer_benchmark, records=records)
+
+
+def load_template(template_path=latex_template_path, search_path='.', cache_dir=None):
+    """
+    Sets up the Jinja2 environment and loads the LaTeX template. Every value the
+    template outputs is escaped once by finalize_latex; the escape_latex filter
+    stays registered and is a no-op on values that are already escaped, and
+    the latex_safe filter marks template output (a macro's, a recursive
+    loop's) as LaTeX already, so it is not escaped again.
+    Compiled templates are cached on disk (see templates.py), so only the first
+    run after the template changes pays for compilation.
+    Callers rendering many reports should load the template once and reuse it.
+    """
+    env = make_environment(search_path, cache_dir, filters={'escape_latex': escape_latex, 'latex_safe': LatexSafe},
+                           finalize=tracing.timed("escape", finalize_latex))
+    return env.get_template(template_path)
+
+
+def report_chunks(context, template, fragment_cache=None, section_names=None, executor=None):
+    # Rendered text in chunks, reusing cached sections when a cache is given;
+    # see sections.generate for rendering a subset of the sections, or in parallel
+    return sections.generate(template, context, section_names, executor, fragment_cache)
+
+
+def render_report(data, template):
+    return ''.join(generate(template, build_context(data)))
+
+
+def stream_context(context, template, output_path, echo=False, fragment_cache=None, section_names=None,
+                   executor=None):
+    """
+    Renders with Jinja's generator API and writes each chunk straight to a
+    buffered file, so the whole document is never held in memory. With echo the
+    chunks are copied to stdout as well. With a fragments.FragmentCache, only
+    the sections whose inputs changed since the last run are re-rendered.
+    section_names and executor are passed to sections.generate.
+    Time in the template is traced as "render", time in the file as "write".
+    Returns the number of characters written.
+    """
+    chunks = report_chunks(context, template, fragment_cache, section_names, executor)
+    written = 0
+    with tracing.span("write"), open(output_path, "w", buffering=OUTPUT_BUFFER_SIZE) as f, \
+            tracing.span("render"):
+        for chunk in chunks:
+            with tracing.span("write"):
+                f.write(chunk)
+                if echo:
+                    sys.stdout.write(chunk)
+            written += len(chunk)
+    if echo:
+        sys.stdout.write("\n")
+    return written
+
+
+def write_report(data, template, output_path, echo=False, fragment_cache=None, chart_cache=None,
+                 peer_benchmark=None, section_names=None, records=False):
+    context = build_context(data, chart_cache, peer_benchmark=peer_benchmark, records=records)
+    return stream_context(context, template, output_path, echo, fragment_cache, section_names)
+
+
+def main(json_path=json_file_path, output_path=output_file_path, echo=False, pdf=False, peers_path=None,
+         profile=False, profile_json=None, profile_prom=None, section_names=None, records=False):
+    # Every stage is traced when a breakdown or an export is asked for
+    profile = profile or bool(profile_json or profile_prom)
+    with (tracing.trace(company_id(json_path)) if profile else contextlib.nullcontext()) as report_trace:
+        # Open and read the JSON file, streaming it when ijson is available
+        data = load_document(json_path)
+
+        # Check the whole document before any work, reporting every problem at once
+        try:
+            with tracing.span("validate"):
+                validate_document(data)
+        except SchemaError as exc:
+            print("%s is not a valid company document (%d problems):" % (json_path, len(exc.problems)),
+                  file=sys.stderr)
+            for problem in exc.problems:
+                print("    %s" % problem, file=sys.stderr)
+            return 1
+
+        # This company's sector benchmark, when a portfolio benchmark file is given
+        benchmark = None
+        if peers_path:
+            with tracing.span("peers"):
+                benchmark = load_benchmarks(peers_path).get(company_id(json_path))
+
+        # Setup Jinja2 environment and load template file
+        with tracing.span("template"):
+            template = load_template()
+        sections.select_sections(template, section_names)
+
+        # Render the template with the combined data straight into the output file,
+        # reusing the cached sections whose inputs have not changed. Sections are
+        # rendered in parallel and built as they are reached; charts missing from
+        # the chart cache are drawn in parallel processes at that point, while
+        # the other sections carry on.
+        fragment_cache = fragments.open_cache()
+        chart_cache = charts.open_cache()
+        with ProcessPoolExecutor() as chart_executor, \
+                ThreadPoolExecutor(max_workers=SECTION_THREADS) as section_executor:
+            context = build_context(data, chart_cache, chart_executor, benchmark, records)
+            stream_context(context, template, output_path, echo, fragment_cache, section_names,
+                           section_executor)
+        if chart_cache is not None:
+            print("Charts drawn: %d, reused from cache: %d" % (chart_cache.misses, chart_cache.hits))
+        if fragment_cache is not None:
+            print("Sections re-rendered: %d, reused from cache: %d" % (fragment_cache.misses, fragment_cache.hits))
+
+        print("Credit Appraisal LaTeX file has been generated and saved as %s" % output_path)
+
+        if pdf:
+            with tracing.span("compile"):
+                result = compile_pdf.compile_tex(output_path)
+            if result["ok"]:
+                print("Compiled %s in %.3fs (%d passes)" % (result["output"], result["seconds"], result["passes"]))
+            else:
+                print("PDF compile failed: %s" % result["error"])
+
+    if profile:
+        traces = [report_trace.as_dict()]
+        tracing.print_breakdown(traces)
+        tracing.export(traces, profile_json, profile_prom)
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Render one credit appraisal note.")
+    parser.add_argument("--echo", action="store_true", help="also print the generated LaTeX to stdout")
+    parser.add_argument("--pdf", action="store_true", help="compile the generated LaTeX to PDF")
+    parser.add_argument("--peers", default=None, help="portfolio benchmark file written by peers.py")
+    add_sections_arg(parser)
+    add_records_arg(parser)
+    add_profile_args(parser)
+    return parser.parse_args(argv)
+
+
+def add_sections_arg(parser):
+    parser.add_argument("--sections", type=sections.parse_sections, default=None, metavar="NAMES",
+                        help="comma-separated sections or groups to render, e.g. financials,ratios "
+                             "(default: all; see sections.py)")
+
+
+def add_records_arg(parser):
+    parser.add_argument("--records", action="store_true",
+                        help="hold the list sections as compact records (see records.py): less memory "
+                             "per document held, slower to build; the output is the same")
+
+
+def add_profile_args(parser):
+    parser.add_argument("--profile", action="store_true", help="print the time spent in each stage")
+    parser.add_argument("--profile-json", default=None, metavar="PATH",
+                        help="write per-report stage times and percentiles as JSON (implies --profile)")
+    parser.add_argument("--profile-prom", default=None, metavar="PATH",
+                        help="write stage percentiles as a Prometheus textfile (implies --profile)")
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    raise SystemExit(main(echo=args.echo, pdf=args.pdf, peers_path=args.peers, profile=args.profile,
+                          profile_json=args.profile_json, profile_prom=args.profile_prom,
+                          section_names=args.sections, records=args.records))
@@ -0,0 +1,208 @@
+import argparse
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from ingest import check_unique_stems, file_stem
+
+# TeX engine to run; override with the environment variable (e.g. lualatex)
+ENGINE_ENV = 'CREDIT_REPORT_TEX_ENGINE'
+DEFAULT_ENGINE = 'pdflatex'
+
+# Per-report build directories live here and are kept between runs, so the
+# .aux/.out files from the previous compile seed the next one
+DEFAULT_BUILD_DIR = 'build'
+
+# longtable and hyperref settle in two passes; anything beyond this is a loop
+MAX_PASSES = 4
+
+# Files whose contents feed back into the next pass (references, longtable
+# column widths, hyperref bookmarks)
+AUX_SUFFIXES = ('.aux', '.out', '.toc')
+
+# Log messages asking for another pass
+_RERUN_PATTERN = re.compile(
+    r'Rerun to get|Label\(s\) may have changed|Table widths have changed\. Rerun LaTeX'
+)
+
+# Records the source that produced the PDF in a build directory
+_SOURCE_STAMP = '.source.sha1'
+
+
+def resolve_engine(engine=None):
+    return engine or os.environ.get(ENGINE_ENV) or DEFAULT_ENGINE
+
+
+def engine_available(engine=None):
+    return shutil.which(resolve_engine(engine)) is not None
+
+
+def build_dir_for(tex_path, build_root=DEFAULT_BUILD_DIR):
+    return os.path.join(build_root, file_stem(tex_path))
+
+
+def _file_digest(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _aux_state(build_dir, jobname):
+    # Digest of everything a pass writes for the next one to read
+    state = []
+    for suffix in AUX_SUFFIXES:
+        path = os.path.join(build_dir, jobname + suffix)
+        state.append(_file_digest(path) if os.path.exists(path) else None)
+    return tuple(state)
+
+
+def _needs_rerun(log_path):
+    try:
+        with open(log_path, 'r', encoding='latin-1') as f:
+            return _RERUN_PATTERN.search(f.read()) is not None
+    except FileNotFoundError:
+        return False
+
+
+def _log_error(log_path):
+    # First "! ..." line of the TeX log, which is where the engine reports the failure
+    try:
+        with open(log_path, 'r', encoding='latin-1') as f:
+            for line in f:
+                if line.startswith('!'):
+                    return line.strip()
+    except FileNotFoundError:
+        pass
+    return None
+
+
+def compile_tex(tex_path, build_root=DEFAULT_BUILD_DIR, engine=None, timeout=None, pdf_path=None):
+    """
+    Compiles one .tex file to PDF in its own persistent build directory.
+
+    The engine is rerun only while a pass changes the .aux/.out/.toc files or
+    the log asks for it, and since the previous run's auxiliary files are
+    reused, an unchanged report usually settles after a single pass. A source
+    that is identical to the last successful compile is not run at all.
+    The PDF is copied to pdf_path (default: next to the .tex file).
+    Returns a result dict like batch.render_one; errors are returned, not raised.
+    """
+    start = time.perf_counter()
+    engine = resolve_engine(engine)
+    jobname = os.path.splitext(os.path.basename(tex_path))[0]
+    build_dir = os.path.abspath(build_dir_for(tex_path, build_root))
+    built_pdf = os.path.join(build_dir, jobname + '.pdf')
+    log_path = os.path.join(build_dir, jobname + '.log')
+    stamp_path = os.path.join(build_dir, _SOURCE_STAMP)
+    if pdf_path is None:
+        pdf_path = os.path.splitext(tex_path)[0] + '.pdf'
+
+    def result(ok, passes, error=None):
+        outcome = {
+            "input": tex_path,
+            "ok": ok,
+            "passes": passes,
+            "seconds": time.perf_counter() - start,
+        }
+        if ok:
+            outcome["output"] = pdf_path
+        else:
+            outcome["error"] = error
+        return outcome
+
+    if shutil.which(engine) is None:
+        return result(False, 0, "TeX engine %r not found on PATH" % engine)
+
+    os.makedirs(build_dir, exist_ok=True)
+    source_digest = _file_digest(tex_path)
+    try:
+        with open(stamp_path) as f:
+            unchanged = f.read().strip() == source_digest
+    except FileNotFoundError:
+        unchanged = False
+    if unchanged and os.path.exists(built_pdf):
+        shutil.copyfile(built_pdf, pdf_path)
+        return result(True, 0)
+
+    command = [engine, '-interaction=nonstopmode', '-halt-on-error',
+               '-output-directory=' + build_dir, '-jobname=' + jobname,
+               os.path.basename(tex_path)]
+    # Run from the report's own directory so relative \includegraphics paths resolve
+    cwd = os.path.dirname(os.path.abspath(tex_path))
+    passes = 0
+    while passes < MAX_PASSES:
+        before = _aux_state(build_dir, jobname)
+        try:
+            completed = subprocess.run(command, cwd=cwd, stdin=subprocess.DEVNULL,
+                                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                       timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return result(False, passes + 1, "%s timed out after %ss" % (engine, timeout))
+        passes += 1
+        if completed.returncode != 0:
+            # Drop the stamp so a failed build is never mistaken for an up-to-date one
+            if os.path.exists(stamp_path):
+                os.remove(stamp_path)
+            error = _log_error(log_path) or "%s exited with status %d" % (engine, completed.returncode)
+            return result(False, passes, error)
+        if _aux_state(build_dir, jobname) == before and not _needs_rerun(log_path):
+            break
+
+    with open(stamp_path, 'w') as f:
+        f.write(source_digest)
+    shutil.copyfile(built_pdf, pdf_path)
+    return result(True, passes)
+
+
+def compile_many(tex_paths, workers=None, build_root=DEFAULT_BUILD_DIR, engine=None, timeout=None):
+    """
+    Compiles every .tex file across a worker pool and returns the per-report
+    results in completion order. The work is in the engine subprocesses, so
+    threads are enough to keep all cores busy. Raises ValueError when two
+    reports share a file name, since they would share a build directory.
+    """
+    # Two reports named alike would be compiled at once in one build directory
+    check_unique_stems(tex_paths)
+    results = []
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = [pool.submit(compile_tex, path, build_root, engine, timeout) for path in tex_paths]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if result["ok"]:
+                print("[pdf]  %s -> %s (%d passes, %.3fs)" % (
+                    result["input"], result["output"], result["passes"], result["seconds"]))
+            else:
+                print("[fail] %s: %s (%.3fs)" % (result["input"], result["error"], result["seconds"]))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile generated credit reports to PDF.")
+    parser.add_argument("inputs", nargs="+", help=".tex files to compile")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="parallel engine runs (default: CPU count)")
+    parser.add_argument("--build-dir", default=DEFAULT_BUILD_DIR, help="root of the per-report build directories")
+    parser.add_argument("--engine", default=None, help="TeX engine (default: $%s or %s)" % (ENGINE_ENV, DEFAULT_ENGINE))
+    parser.add_argument("--timeout", type=float, default=None, help="seconds allowed per engine pass")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    try:
+        results = compile_many(args.inputs, args.workers, args.build_dir, args.engine, args.timeout)
+    except ValueError as exc:
+        parser.error(str(exc))
+    elapsed = time.perf_counter() - start
+    succeeded = [r for r in results if r["ok"]]
+    print()
+    print("PDFs: %d ok, %d failed, %.3fs wall" % (len(succeeded), len(results) - len(succeeded), elapsed))
+    return 0 if len(succeeded) == len(results) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,149 @@
+import re
+import numpy as np
+
+from number_format import number_format
+
+# Tokens the producers use for "no figure"
+MISSING_TOKENS = {'', 'NA', 'N/A', 'NAN', 'NONE', 'NULL', '-', '--'}
+
+# How columns are shown unless the caller gives a format (see number_format.py)
+DEFAULT_FORMAT = number_format()
+PERCENT_FORMAT = number_format(percent=True)
+
+_PERIOD_SEPARATORS = re.compile(r'[\s_\-]+')
+
+
+def period_key(label):
+    """
+    Normalises a period label so 'Q4 FY-24', 'Q4-FY-24' and 'q4_fy_24' land on
+    the same slot of the period axis.
+    """
+    return _PERIOD_SEPARATORS.sub('-', str(label).strip()).upper()
+
+
+def parse_value(value):
+    """
+    Returns (number, is_percent) for a raw cell, or (None, False) when the cell
+    is missing or not a number.
+    """
+    if value is None or isinstance(value, bool):
+        return None, False
+    if isinstance(value, (int, float)):
+        return float(value), False
+    text = str(value).strip()
+    if text.upper() in MISSING_TOKENS:
+        return None, False
+    percent = text.endswith('%')
+    if percent:
+        text = text[:-1]
+    try:
+        return float(text.replace(',', '')), percent
+    except ValueError:
+        return None, False
+
+
+class SeriesTable:
+    """
+    Columnar form of one financial table: a shared period axis, a float64 array
+    per metric and a boolean mask per metric that is True where the figure is
+    missing (None, "NA", or not a number). Masked slots hold NaN.
+    """
+
+    def __init__(self, periods, values, masks, percent_metrics=()):
+        self.periods = periods
+        self.values = values
+        self.masks = masks
+        self.percent_metrics = set(percent_metrics)
+
+    @classmethod
+    def from_entries(cls, table, period_keys=('year', 'quarter'), value_key='value', key=None):
+        """
+        Builds the table from {metric: [{period_key: p, value_key: v}, ...]} in a
+        single pass over the entries. key maps raw entry/metric names to canonical
+        ones (see schema.canonical_key). Null metrics become fully masked columns.
+        """
+        key = key or (lambda name: name)
+        slots = {}
+        periods = []
+        rows = {}
+        percent_metrics = set()
+        for metric, entries in (table or {}).items():
+            cells = []
+            for entry in entries or ():
+                period = None
+                raw = None
+                for name, item in entry.items():
+                    name = key(name)
+                    if name == value_key:
+                        raw = item
+                    elif name in period_keys:
+                        period = item
+                slot = slots.get(period_key(period))
+                if slot is None:
+                    slot = slots[period_key(period)] = len(periods)
+                    periods.append(period)
+                number, percent = parse_value(raw)
+                if percent:
+                    percent_metrics.add(key(metric))
+                cells.append((slot, number))
+            rows[key(metric)] = cells
+
+        size = len(periods)
+        values = {}
+        masks = {}
+        for metric, cells in rows.items():
+            column = np.full(size, np.nan)
+            for slot, number in cells:
+                if number is not None:
+                    column[slot] = number
+            values[metric] = column
+            masks[metric] = np.isnan(column)
+        return cls(periods, values, masks, percent_metrics)
+
+    def __contains__(self, metric):
+        return metric in self.values
+
+    def __len__(self):
+        return len(self.periods)
+
+    @property
+    def metrics(self):
+        return list(self.values)
+
+    def column(self, metric):
+        """
+        Returns (values, mask) for a metric; unknown metrics come back fully masked.
+        """
+        if metric not in self.values:
+            return np.full(len(self.periods), np.nan), np.ones(len(self.periods), dtype=bool)
+        return self.values[metric], self.masks[metric]
+
+    def matrix(self, metrics):
+        """
+        Stacks the given metrics into a (len(metrics), periods) float64 array.
+        """
+        if not metrics:
+            return np.empty((0, len(self.periods)))
+        return np.vstack([self.column(metric)[0] for metric in metrics])
+
+    def format_column(self, metric, fmt=None):
+        """
+        Renders a whole column to strings at once with a
+        number_format.NumberFormat: by default two decimals in Indian digit
+        grouping, negatives in parentheses, a trailing '%' on percentage
+        columns and missing cells as 'NA'.
+        """
+        if fmt is None:
+            fmt = PERCENT_FORMAT if metric in self.percent_metrics else DEFAULT_FORMAT
+        values, mask = self.column(metric)
+        return fmt.format(values, mask)
+
+    def format_columns(self, metrics, fmt):
+        """
+        format_column for several metrics sharing one format, formatted in a
+        single pass over their matrix. Returns a list of columns.
+        """
+        if not metrics:
+            return []
+        masks = np.vstack([self.column(metric)[1] for metric in metrics])
+        return fmt.format(self.matrix(metrics), masks)
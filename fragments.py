@@ -0,0 +1,215 @@
+import hashlib
+import json
+import os
+import tempfile
+
+from jinja2 import nodes
+
+from financials import SeriesTable
+from templates import environment_signature
+
+# Where rendered section fragments are kept between runs. Set the environment
+# variable to an empty string to turn the fragment cache off.
+CACHE_DIR_ENV = 'CREDIT_REPORT_FRAGMENT_CACHE'
+DEFAULT_CACHE_DIR = '.fragment_cache'
+
+# Size the cache is trimmed back to, least recently used fragments first
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Bump when build_context changes what it hands the template without the
+# template itself changing, so fragments rendered by the old code are not reused.
+FRAGMENT_FORMAT = 1
+
+_dependency_cache = {}
+_include_cache = {}
+
+
+def _includes(node):
+    # Names of the templates a node includes by a constant name
+    return [include.template.value for include in node.find_all(nodes.Include)
+            if isinstance(include.template, nodes.Const)]
+
+
+def template_sources(env, name):
+    """
+    {template name: source} for the template and, recursively, every template
+    it includes. Each source is parsed once, to find its includes.
+    """
+    sources = {}
+    pending = [name]
+    while pending:
+        current = pending.pop()
+        if current in sources:
+            continue
+        source, _, _ = env.loader.get_source(env, current)
+        sources[current] = source
+        key = hashlib.sha1(source.encode('utf-8')).hexdigest()
+        included = _include_cache.get(key)
+        if included is None:
+            included = _include_cache[key] = _includes(env.parse(source))
+        pending.extend(included)
+    return sources
+
+
+def block_dependencies(template):
+    """
+    Returns {block name: (block digest, names)} for every {% block %} in the
+    template: a digest of the block's parsed body, the templates it includes
+    (the section templates, see sections.py) and the environment settings,
+    and the context variables all of them read. Parsed once per set of
+    template sources.
+    """
+    env = template.environment
+    sources = template_sources(env, template.name)
+    cache_key = hashlib.sha1(repr(sorted(sources.items())).encode('utf-8')).hexdigest()
+    cached = _dependency_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    signature = environment_signature(env)
+    parsed = {name: env.parse(source) for name, source in sources.items()}
+    result = {}
+    for block in parsed[template.name].find_all(nodes.Block):
+        body = [block]
+        pending = _includes(block)
+        while pending:
+            name = pending.pop(0)
+            body.append(parsed[name])
+            pending.extend(_includes(parsed[name]))
+        names = sorted({node.name for part in body for node in part.find_all(nodes.Name) if node.ctx == 'load'})
+        digest = hashlib.sha1((signature + repr(body)).encode('utf-8')).hexdigest()
+        result[block.name] = (digest, names)
+    _dependency_cache[cache_key] = result
+    return result
+
+
+def _encode(value):
+    # json.dumps fallback for the non-JSON values build_context produces
+    if isinstance(value, SeriesTable):
+        return {
+            "periods": value.periods,
+            "values": {metric: column.tolist() for metric, column in value.values.items()},
+            "percent": sorted(value.percent_metrics),
+        }
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    return repr(value)
+
+
+def fingerprint(values):
+    """
+    Stable text form of a block's inputs; equal inputs give equal text.
+    """
+    return json.dumps(values, default=_encode, sort_keys=True, ensure_ascii=False)
+
+
+class FragmentCache:
+    """
+    On-disk cache of rendered template blocks. Each fragment is keyed by the
+    block's own source and the values of the context variables it reads, so a
+    re-render only runs the blocks whose inputs changed and splices the cached
+    text of the rest. Counts hits and misses across renders. Once a render
+    has stored its new fragments, the least recently used ones are removed
+    until the cache fits in max_bytes.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.tex')
+
+    def _store(self, key, text):
+        # Write-then-rename so concurrent workers never see a partial fragment
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+        os.replace(temp_path, self._path(key))
+
+    def evict(self, keep=()):
+        """
+        Removes the least recently used fragments until the cache fits in
+        max_bytes, never touching the paths in keep.
+        """
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.tex'):
+                stat = entry.stat()
+                total += stat.st_size
+                if entry.path not in keep:
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def _cached_block(self, text):
+        def render(context):
+            yield text
+        return render
+
+    def _recording_block(self, key, render_block, pending, keep):
+        # pending holds the keys of the render's fragments not stored yet; the
+        # block that stores the last of them trims the cache
+        def render(context):
+            parts = list(render_block(context))
+            self._store(key, ''.join(parts))
+            pending.discard(key)
+            if not pending:
+                self.evict(keep)
+            yield from parts
+        return render
+
+    def prepare(self, template, context, jinja_context, selected=None):
+        """
+        Makes each block of a render about to start (jinja_context, see
+        sections.generate) come from the cache when its inputs are unchanged,
+        and be stored when they are not. selected limits this to some blocks.
+        """
+        pending = set()
+        keep = set()
+        for name, (digest, names) in block_dependencies(template).items():
+            if selected is not None and name not in selected:
+                continue
+            inputs = [FRAGMENT_FORMAT, digest, [(n, context.get(n)) for n in names if n in context]]
+            key = hashlib.sha1(fingerprint(inputs).encode('utf-8')).hexdigest()
+            path = self._path(key)
+            keep.add(path)
+            try:
+                with open(path, encoding='utf-8', newline='') as f:
+                    text = f.read()
+                # A hit refreshes the file's mtime, which is what eviction orders by
+                os.utime(path)
+            except FileNotFoundError:
+                self.misses += 1
+                pending.add(key)
+                render_block = jinja_context.blocks[name][0]
+                jinja_context.blocks[name][0] = self._recording_block(key, render_block, pending, keep)
+            else:
+                self.hits += 1
+                jinja_context.blocks[name][0] = self._cached_block(text)
+
+
+def resolve_cache_dir(search_path='.'):
+    cache_dir = os.environ.get(CACHE_DIR_ENV)
+    if cache_dir is None:
+        cache_dir = os.path.join(search_path, DEFAULT_CACHE_DIR)
+    return cache_dir or None
+
+
+def open_cache(search_path='.', cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Returns the FragmentCache to use, or None when it has been turned off.
+    """
+    if cache_dir is None:
+        cache_dir = resolve_cache_dir(search_path)
+    return FragmentCache(cache_dir, max_bytes) if cache_dir else None
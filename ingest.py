@@ -0,0 +1,148 @@
+import glob
+import io
+import json
+import os
+
+import tracing
+from schema import USED_SECTIONS
+
+# ijson is optional: without it documents are loaded with json.load
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Read size for the incremental parser
+CHUNK_SIZE = 64 * 1024
+
+# Raised for a document that is valid JSON but not an object of sections
+TOP_LEVEL_ERROR = "expected a JSON object at top level"
+
+
+def streaming_available():
+    return ijson is not None
+
+
+def _spill(spill_dir, key, value):
+    # Unused sections are written out one at a time and dropped from memory
+    os.makedirs(spill_dir, exist_ok=True)
+    safe_name = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in key)
+    with open(os.path.join(spill_dir, safe_name + '.json'), 'w') as f:
+        json.dump(value, f)
+
+
+def _document(value):
+    if not isinstance(value, dict):
+        raise ValueError(TOP_LEVEL_ERROR)
+    return value
+
+
+def iter_sections(file, wanted=USED_SECTIONS, spill_dir=None):
+    """
+    Incrementally parses a company document and yields (key, value) for each
+    top-level section as soon as it has been read. Sections not in wanted are
+    skipped without being built, or built one at a time and written to
+    spill_dir if one is given. Peak memory is therefore bounded by the sections
+    the report uses rather than by the file size. Raises ValueError when the
+    document is not a JSON object.
+    """
+    if ijson is None:
+        raise ImportError("Streaming ingestion needs the ijson package (pip install ijson)")
+    builder = None
+    key = None
+    keep = False
+    depth = 0
+    for prefix, event, value in ijson.parse(file, buf_size=CHUNK_SIZE, use_float=True):
+        if builder is None:
+            # Top-level events: the document's own start/end and its section keys.
+            # Events of a skipped section are only counted, never built.
+            if depth == 0 and event != 'start_map':
+                raise ValueError(TOP_LEVEL_ERROR)
+            if event == 'map_key' and depth == 1:
+                key = value
+                keep = wanted is None or key in wanted
+                if keep or spill_dir:
+                    builder = ijson.ObjectBuilder()
+                    depth = 0
+                    continue
+            if event in ('start_map', 'start_array'):
+                depth += 1
+            elif event in ('end_map', 'end_array'):
+                depth -= 1
+            continue
+        builder.event(event, value)
+        if event in ('start_map', 'start_array'):
+            depth += 1
+        elif event in ('end_map', 'end_array'):
+            depth -= 1
+        # Back at the section's own level: a scalar, or the end of its map/array
+        if depth == 0:
+            if keep:
+                yield key, builder.value
+            else:
+                _spill(spill_dir, key, builder.value)
+            builder = None
+            depth = 1
+
+
+def load_document(path, streaming=None, wanted=USED_SECTIONS, spill_dir=None):
+    """
+    Loads a company JSON document. With streaming (the default whenever ijson is
+    installed) only the sections the report needs are materialised; pass
+    streaming=False to use json.load and keep the whole document.
+    """
+    if streaming is None:
+        streaming = streaming_available()
+    with tracing.span("load"):
+        if not streaming:
+            with open(path, 'r') as file:
+                return _document(json.load(file))
+        with open(path, 'rb') as file:
+            return dict(iter_sections(file, wanted, spill_dir))
+
+
+def parse_document(raw, streaming=None, wanted=USED_SECTIONS):
+    """
+    load_document for a document already in memory as bytes, e.g. a request
+    body.
+    """
+    if streaming is None:
+        streaming = streaming_available()
+    with tracing.span("load"):
+        if not streaming:
+            return _document(json.loads(raw))
+        return dict(iter_sections(io.BytesIO(raw), wanted))
+
+
+def file_stem(path):
+    # "data/acme.json" -> "acme"; reports, build directories and company ids are named this way
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def check_unique_stems(paths):
+    """
+    Raises ValueError when two paths share a file name stem (a/acme.json and
+    b/acme.json), since their reports would overwrite each other.
+    """
+    seen = {}
+    for path in paths:
+        seen.setdefault(file_stem(path), []).append(path)
+    clashes = ["%s (%s)" % (stem, ', '.join(group)) for stem, group in seen.items() if len(group) > 1]
+    if clashes:
+        raise ValueError("inputs with the same file name would write the same report: %s" % '; '.join(clashes))
+
+
+def expand_inputs(inputs):
+    """
+    Turns a mix of directories, glob patterns and file paths into a sorted list of JSON files.
+    Raises ValueError when two of them share a file name (see check_unique_stems).
+    """
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(glob.glob(os.path.join(item, '*.json')))
+        else:
+            paths.extend(glob.glob(item))
+    paths = sorted(set(paths))
+    check_unique_stems(paths)
+    return paths
@@ -0,0 +1,126 @@
+from functools import lru_cache
+
+import numpy as np
+
+# What a missing cell renders as
+MISSING_LABEL = 'NA'
+
+# Decimal places figures are shown with unless a format says otherwise
+DEFAULT_DECIMALS = 2
+
+# Rounded figures (in units of their last decimal) from here up do not fit in
+# an int64; columns holding one are rounded in Python integers instead
+INT64_LIMIT = float(2 ** 63)
+
+# Digit groupings: Indian counts lakhs and crores in twos above the thousands
+# (1,19,98,600), western groups in threes throughout (119,986,000)
+GROUPINGS = ('indian', 'western')
+
+# Units amounts can be shown in: rupees per unit, and the label for table headers
+UNITS = {
+    'rupees': (1, 'INR'),
+    'thousand': (1e3, "INR '000"),
+    'lakh': (1e5, 'INR Lakh'),
+    'crore': (1e7, 'INR Cr.'),
+}
+
+
+def unit_scale(source, target):
+    # What figures in source units are divided by to show them in target units
+    return UNITS[target][0] / UNITS[source][0]
+
+
+def group_digits(whole, grouping='indian'):
+    """
+    A non-negative integer with thousands separators: 1,19,986 (indian) or
+    119,986 (western). grouping=None leaves the digits ungrouped.
+    """
+    if grouping is None or whole < 1000:
+        return str(whole)
+    if grouping == 'western':
+        return format(whole, ',')
+    higher, low = divmod(whole, 1000)
+    parts = ['%03d' % low]
+    while higher >= 100:
+        higher, part = divmod(higher, 100)
+        parts.append('%02d' % part)
+    parts.append(str(higher))
+    return ','.join(reversed(parts))
+
+
+class NumberFormat:
+    """
+    How a column of figures is shown: divided by scale (e.g. to show rupees in
+    crores), rounded to a fixed number of decimals, digits grouped (see
+    group_digits), negatives in parentheses or with a minus sign, an optional
+    '%' suffix, and missing cells as a placeholder. Formats are immutable;
+    get shared ones from number_format.
+    """
+
+    __slots__ = ('decimals', 'grouping', 'parens', 'percent', 'scale', 'missing', '_factor', '_patterns')
+
+    def __init__(self, decimals=DEFAULT_DECIMALS, grouping='indian', parens=True, percent=False, scale=1,
+                 missing=MISSING_LABEL):
+        if grouping is not None and grouping not in GROUPINGS:
+            raise ValueError("unknown grouping %r; groupings are %s" % (grouping, ', '.join(GROUPINGS)))
+        self.decimals = decimals
+        self.grouping = grouping
+        self.parens = parens
+        self.percent = percent
+        self.scale = scale
+        self.missing = missing
+        self._factor = 10 ** decimals
+        # The cell text around the grouped whole part and the decimals, for
+        # positive and negative figures, built once per format
+        cell = '%s' + ('.%0' + str(decimals) + 'd' if decimals else '%.0s') + ('%%' if percent else '')
+        self._patterns = (cell, '(' + cell + ')' if parens else '-' + cell)
+
+    def format(self, values, mask=None):
+        """
+        Formats a column and returns a list of strings; a 2-D array of
+        columns (e.g. SeriesTable.matrix) gives a list of them, formatted
+        together. mask is True for missing cells; NaN and infinite figures
+        are always missing. Scaling, rounding, signs and the missing mask
+        are worked out for every cell at once with array operations; what is
+        left per cell is one precompiled pattern.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if not values.size:
+            return [[] for _ in values] if values.ndim > 1 else []
+        missing = ~np.isfinite(values)
+        if mask is not None:
+            missing |= mask
+        filled = np.where(missing, 0.0, values)
+        if self.scale != 1:
+            filled = filled / self.scale
+        # Rounded once, in integer units of the last decimal, so carries
+        # (9.999 -> 10.00) and -0.00 come out right
+        magnitudes = np.rint(np.abs(filled) * self._factor)
+        negative = (filled < 0) & (magnitudes > 0)
+        if (magnitudes < INT64_LIMIT).all():
+            wholes, fractions = np.divmod(magnitudes.astype(np.int64).ravel(), self._factor)
+            wholes, fractions = wholes.tolist(), fractions.tolist()
+        else:
+            wholes, fractions = zip(*(divmod(int(m), self._factor) for m in magnitudes.ravel().tolist()))
+        grouping = self.grouping
+        patterns = self._patterns
+        label = self.missing
+        cells = [label if gap else patterns[sign] % (group_digits(whole, grouping), fraction)
+                 for whole, fraction, sign, gap in zip(wholes, fractions,
+                                                       negative.ravel().tolist(), missing.ravel().tolist())]
+        if values.ndim == 1:
+            return cells
+        width = values.shape[1]
+        return [cells[start:start + width] for start in range(0, len(cells), width)]
+
+    def __call__(self, value):
+        # One figure, e.g. a benchmark value; None is missing
+        return self.format([np.nan if value is None else value])[0]
+
+    def __repr__(self):
+        return "NumberFormat(decimals=%r, grouping=%r, parens=%r, percent=%r, scale=%r, missing=%r)" % (
+            self.decimals, self.grouping, self.parens, self.percent, self.scale, self.missing)
+
+
+# Shared formats: the same arguments always give the same NumberFormat
+number_format = lru_cache(maxsize=None)(NumberFormat)
@@ -0,0 +1,255 @@
+import argparse
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from ingest import expand_inputs, file_stem, load_document
+from number_format import number_format
+from ratios import RATIO_DECIMALS, RATIOS, latest_period, ratio_axis, ratio_inputs, ratios_from_inputs
+from schema import FINANCIAL_SECTIONS, normalize_financials
+
+# Ratios companies are benchmarked on, and whether a higher value is better.
+# Percentile 100 is always the best in the sector.
+PEER_RATIOS = {
+    "debt_equity": False,
+    "interest_coverage": True,
+    "current_ratio": True,
+    "quick_ratio": True,
+    "inventory_turnover": True,
+    "receivable_days": False,
+    "cash_conversion_cycle": False,
+    "roe": True,
+    "roce": True,
+    "roa": True,
+    "asset_turnover": True,
+}
+
+# Cell formats for the benchmark table: ratios as in the report's ratio table,
+# percentiles as computed (one decimal)
+RATIO_FORMAT = number_format(decimals=RATIO_DECIMALS)
+PERCENT_RATIO_FORMAT = number_format(decimals=RATIO_DECIMALS, percent=True)
+PERCENTILE_FORMAT = number_format(decimals=1)
+
+# Peer group for companies with no sector
+UNCLASSIFIED = 'Unclassified'
+
+DEFAULT_OUTPUT = 'peer_benchmarks.json'
+
+# Documents are read in chunks of this many per worker task
+LOAD_CHUNK_SIZE = 64
+
+
+def company_id(json_path):
+    # Reports are named after their input file, so benchmarks are too; inputs
+    # are checked to have distinct names (see ingest.check_unique_stems)
+    return file_stem(json_path)
+
+
+def company_inputs(json_path):
+    """
+    Loads the financial tables of one document and returns (sector, period,
+    {input name: value}) for its latest ratio year, by the year in the label
+    rather than stored order (see ratios.latest_period). Only the sections
+    ratios need are parsed.
+    """
+    data = load_document(json_path, wanted=FINANCIAL_SECTIONS)
+    model = normalize_financials(data)
+    latest = latest_period(ratio_axis(model))
+    periods = [latest] if latest is not None else []
+    inputs = ratio_inputs(model, periods)
+    values = {name: float(column[0]) if len(column) else math.nan for name, column in inputs.items()}
+    return model["sector"], (str(periods[0]) if periods else None), values
+
+
+def _load_one(path):
+    # (row, None) for a readable document, (None, error message) otherwise
+    try:
+        return company_inputs(path), None
+    except Exception as exc:
+        return None, "%s: %s" % (type(exc).__name__, exc)
+
+
+def _load_chunk(paths):
+    return [_load_one(path) for path in paths]
+
+
+def load_portfolio(json_paths, sectors=None, workers=None):
+    """
+    Reads a whole portfolio into one input matrix: returns ((ids, sector
+    labels, periods, {input name: float64 array over companies}), failures).
+    A document that cannot be read is left out of the matrix and listed in
+    failures as (path, error) instead, so the rest are still benchmarked.
+    sectors maps company ids to sector names and overrides the documents' own
+    'sector' key.
+    """
+    sectors = sectors or {}
+    chunks = [json_paths[i:i + LOAD_CHUNK_SIZE] for i in range(0, len(json_paths), LOAD_CHUNK_SIZE)]
+    if workers == 1 or len(chunks) <= 1:
+        loaded = [entry for chunk in chunks for entry in _load_chunk(chunk)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            loaded = [entry for result in pool.map(_load_chunk, chunks) for entry in result]
+
+    failures = [(path, error) for path, (_, error) in zip(json_paths, loaded) if error is not None]
+    kept = [(path, row) for path, (row, error) in zip(json_paths, loaded) if error is None]
+    ids = [company_id(path) for path, _ in kept]
+    rows = [row for _, row in kept]
+    labels = [sectors.get(cid) or sector or UNCLASSIFIED for cid, (sector, _, _) in zip(ids, rows)]
+    periods = [period for _, period, _ in rows]
+    names = rows[0][2].keys() if rows else ()
+    matrix = np.array([[values[name] for name in names] for _, _, values in rows], dtype=np.float64)
+    inputs = {name: matrix[:, i] for i, name in enumerate(names)}
+    return (ids, labels, periods, inputs), failures
+
+
+def sector_percentiles(values, groups, group_count, higher_is_better=True):
+    """
+    Percentile rank (0-100) of every company within its group, for a whole
+    column at once: one lexsort over (group, value), then positions inside each
+    group. Ties share the lower rank; missing values get NaN and do not count
+    towards their group. Also returns each group's median, indexed by group.
+    """
+    count = len(values)
+    valid = ~np.isnan(values)
+    group_valid = np.bincount(groups, weights=valid, minlength=group_count).astype(np.intp)
+    if not count:
+        return np.empty(0), np.full(group_count, np.nan)
+    # Missing values sort to the end of their group
+    keyed = np.where(valid, values if higher_is_better else -values, np.inf)
+    order = np.lexsort((keyed, groups))
+    sorted_groups = groups[order]
+    sorted_values = keyed[order]
+    position = np.arange(count)
+
+    group_start = np.searchsorted(sorted_groups, sorted_groups, side='left')
+    new_value = np.ones(count, dtype=bool)
+    new_value[1:] = (sorted_groups[1:] != sorted_groups[:-1]) | (sorted_values[1:] != sorted_values[:-1])
+    tie_start = np.maximum.accumulate(np.where(new_value, position, 0))
+    below = tie_start - group_start
+
+    peers = group_valid[sorted_groups] - 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ranked = np.where(peers > 0, below / peers * 100, 100.0)
+    percentiles = np.empty(count)
+    percentiles[order] = np.where(np.isfinite(sorted_values), ranked, np.nan)
+
+    # Each group's valid values are the first group_valid entries of its run
+    starts = np.searchsorted(sorted_groups, np.arange(group_count), side='left')
+    lower = np.minimum(starts + np.maximum(group_valid - 1, 0) // 2, count - 1)
+    upper = np.minimum(starts + group_valid // 2, count - 1)
+    ordered = values[order]
+    medians = np.where(group_valid > 0, (ordered[lower] + ordered[upper]) / 2, np.nan)
+    return percentiles, medians
+
+
+def benchmark(ids, labels, periods, inputs):
+    """
+    Computes every company's ratios and sector percentile ranks in one pass
+    over the portfolio matrix. Returns {company id: benchmark} where a
+    benchmark is {"sector", "period", "peers", "ratios": {name: {"value",
+    "percentile", "sector_median"}}}.
+    """
+    sectors, groups = np.unique(np.array(labels, dtype=object).astype(str), return_inverse=True)
+    groups = groups.astype(np.intp)
+    sizes = np.bincount(groups, minlength=len(sectors))
+    values = ratios_from_inputs(inputs)
+
+    # Each column goes to a list of floats (None for NA) once, not cell by cell
+    def as_list(array):
+        return np.where(np.isnan(array), None, array).tolist()
+
+    columns = {}
+    for name, higher_is_better in PEER_RATIOS.items():
+        percentiles, medians = sector_percentiles(values[name], groups, len(sectors), higher_is_better)
+        columns[name] = (as_list(values[name]), as_list(np.round(percentiles, 1)),
+                         as_list(np.round(medians[groups], 2)))
+
+    sector_names = [str(sector) for sector in sectors]
+    peer_counts = (sizes - 1).tolist()
+    result = {}
+    for row, (cid, group) in enumerate(zip(ids, groups.tolist())):
+        result[cid] = {
+            "sector": sector_names[group],
+            "period": periods[row],
+            "peers": peer_counts[group],
+            "ratios": {
+                name: {"value": value[row], "percentile": percentile[row], "sector_median": median[row]}
+                for name, (value, percentile, median) in columns.items()
+            },
+        }
+    return result
+
+
+def load_benchmarks(path):
+    """
+    Reads a benchmark file written by this module's CLI.
+    """
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def benchmark_rows(entry):
+    """
+    Template rows for one company's benchmark: (label, value, sector median,
+    percentile) per ratio, with the unit applied to value and median. Each
+    column is formatted in one pass (see number_format.py).
+    """
+    ratios = entry["ratios"]
+    names = list(ratios)
+    percent = [RATIOS[name][1] == '%' for name in names]
+
+    def column(key, fmt, percent_fmt=None):
+        figures = [np.nan if ratios[name][key] is None else ratios[name][key] for name in names]
+        cells = fmt.format(figures)
+        if percent_fmt is None:
+            return cells
+        return [p if is_percent else cell
+                for cell, p, is_percent in zip(cells, percent_fmt.format(figures), percent)]
+
+    return list(zip([RATIOS[name][0] for name in names],
+                    column("value", RATIO_FORMAT, PERCENT_RATIO_FORMAT),
+                    column("sector_median", RATIO_FORMAT, PERCENT_RATIO_FORMAT),
+                    column("percentile", PERCENTILE_FORMAT)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark a portfolio of companies against their sector peers.")
+    parser.add_argument("inputs", nargs="+", help="JSON files, directories or glob patterns")
+    parser.add_argument("-o", "--output", default=DEFAULT_OUTPUT, help="benchmark file to write")
+    parser.add_argument("--sectors", default=None, help="JSON file mapping company id (file name) to sector")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes for loading")
+    args = parser.parse_args(argv)
+
+    try:
+        json_paths = expand_inputs(args.inputs)
+    except ValueError as exc:
+        parser.error(str(exc))
+    if not json_paths:
+        parser.error("no JSON inputs matched")
+    sectors = None
+    if args.sectors:
+        with open(args.sectors, 'r') as f:
+            sectors = json.load(f)
+
+    start = time.perf_counter()
+    portfolio, failures = load_portfolio(json_paths, sectors, args.workers)
+    loaded = time.perf_counter()
+    for path, error in failures:
+        print("[fail] %s: %s" % (path, error))
+    benchmarks = benchmark(*portfolio)
+    ranked = time.perf_counter()
+    with open(args.output, 'w') as f:
+        json.dump(benchmarks, f)
+
+    print("Benchmarked %d companies in %d sectors -> %s (%d failed)" % (
+        len(benchmarks), len(set(portfolio[1])), args.output, len(failures)))
+    print("Load %.3fs, ratios and ranks %.3fs" % (loaded - start, ranked - loaded))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,192 @@
+import asyncio
+import contextlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import batch
+import compile_pdf
+import peers
+import tracing
+from validation import SchemaError
+
+# Reports allowed to wait between two stages. A stage that falls behind fills
+# its inbox and stalls the stages before it instead of buffering the batch.
+DEFAULT_QUEUE_SIZE = 16
+
+# Concurrent reads and writes; the disk, not the CPU, is the limit for these
+IO_CONCURRENCY = 4
+
+# Read size when prefetching without posix_fadvise
+PREFETCH_CHUNK_SIZE = 1024 * 1024
+
+# Marks the end of a stage's input; each worker hands it on to its siblings
+_DONE = object()
+
+
+def _prefetch(path):
+    """
+    Pulls a document into the OS page cache so the render worker's parse
+    reads from memory. The bytes stay in the kernel: the worker parses the
+    file itself, in parallel with the others, instead of being sent a copy.
+    """
+    with open(path, 'rb') as f:
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+        else:
+            while f.read(PREFETCH_CHUNK_SIZE):
+                pass
+
+
+def _discard(path):
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
+
+
+async def _stage(name, work, inbox, outbox, concurrency, busy):
+    """
+    Runs concurrency workers that take jobs from inbox, apply work and pass
+    them to outbox. A job that failed in an earlier stage is passed on
+    untouched. busy[name] accumulates the time spent in work, and each job
+    records its own time under job["stages"][name].
+    """
+    async def worker():
+        while True:
+            job = await inbox.get()
+            if job is _DONE:
+                await inbox.put(_DONE)
+                return
+            if "error" not in job:
+                start = time.perf_counter()
+                try:
+                    await work(job)
+                except Exception as exc:
+                    job["error"] = "%s: %s" % (type(exc).__name__, exc)
+                    if isinstance(exc, SchemaError):
+                        job["problems"] = exc.problems
+                elapsed = time.perf_counter() - start
+                busy[name] += elapsed
+                job["stages"][name] = elapsed
+            await outbox.put(job)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    await outbox.put(_DONE)
+
+
+def _merge_trace(trace, stages):
+    # The worker traced the render in detail; the pipeline adds its own stages
+    # and the time spent getting the job to and from the worker
+    worker_seconds = sum(trace["stages"].values())
+    for name, seconds in stages.items():
+        if name == "render":
+            name, seconds = "dispatch", max(seconds - worker_seconds, 0.0)
+        trace["stages"][name] = trace["stages"].get(name, 0.0) + seconds
+        trace["calls"][name] = trace["calls"].get(name, 0) + 1
+    return trace
+
+
+async def _run(json_paths, out_dir, pool, workers, streaming, pdf, build_root, engine, queue_size, profile,
+               section_names):
+    loop = asyncio.get_running_loop()
+    busy = {"prefetch": 0.0, "render": 0.0, "write": 0.0}
+    if pdf:
+        busy["compile"] = 0.0
+    results = []
+    pdf_results = []
+
+    async def prefetch(job):
+        await asyncio.to_thread(_prefetch, job["input"])
+
+    # The worker streams each report to a temporary file in out_dir and
+    # returns only its path, so the queues hold paths rather than reports;
+    # the write stage renames the file into place
+    async def render(job):
+        if profile:
+            (job["temp"], job["chars"]), job["trace"] = await loop.run_in_executor(
+                pool, tracing.call_traced, peers.company_id(job["input"]), batch.render_to_temp,
+                job["input"], out_dir, streaming, section_names)
+        else:
+            job["temp"], job["chars"] = await loop.run_in_executor(pool, batch.render_to_temp, job["input"],
+                                                                   out_dir, streaming, section_names)
+
+    async def write(job):
+        job["output"] = batch.output_path_for(job["input"], out_dir)
+        await asyncio.to_thread(os.replace, job.pop("temp"), job["output"])
+        job["seconds"] = time.perf_counter() - job["start"]
+
+    async def compile_report(job):
+        job["pdf"] = await asyncio.to_thread(compile_pdf.compile_tex, job["output"], build_root, engine)
+
+    stages = [("prefetch", prefetch, IO_CONCURRENCY), ("render", render, workers), ("write", write, IO_CONCURRENCY)]
+    if pdf:
+        stages.append(("compile", compile_report, workers))
+    queues = [asyncio.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+
+    async def feed():
+        for path in json_paths:
+            await queues[0].put({"input": path, "start": time.perf_counter(), "stages": {}})
+        await queues[0].put(_DONE)
+
+    async def collect():
+        while True:
+            job = await queues[-1].get()
+            if job is _DONE:
+                return
+            if "error" in job:
+                if "temp" in job:
+                    _discard(job.pop("temp"))
+                result = {"input": job["input"], "ok": False, "error": job["error"],
+                          "seconds": time.perf_counter() - job["start"]}
+                if "problems" in job:
+                    result["problems"] = job["problems"]
+                print("[fail] %s: %s (%.3fs)" % (result["input"], result["error"], result["seconds"]))
+                results.append(result)
+                continue
+            result = {key: job[key] for key in ("input", "output", "chars", "seconds")}
+            result["ok"] = True
+            if "trace" in job:
+                result["trace"] = _merge_trace(job["trace"], job["stages"])
+            results.append(result)
+            print("[ok]   %s -> %s (%.3fs)" % (result["input"], result["output"], result["seconds"]))
+            if "pdf" in job:
+                outcome = job["pdf"]
+                pdf_results.append(outcome)
+                if outcome["ok"]:
+                    print("[pdf]  %s -> %s (%d passes, %.3fs)" % (
+                        outcome["input"], outcome["output"], outcome["passes"], outcome["seconds"]))
+                else:
+                    print("[fail] %s: %s (%.3fs)" % (outcome["input"], outcome["error"], outcome["seconds"]))
+
+    tasks = [feed(), collect()]
+    for (name, work, concurrency), inbox, outbox in zip(stages, queues, queues[1:]):
+        tasks.append(_stage(name, work, inbox, outbox, concurrency, busy))
+    await asyncio.gather(*tasks)
+    return results, pdf_results, busy
+
+
+def run_pipeline(json_paths, out_dir, workers=None, template_path='combined.tex', search_path='.',
+                 streaming=None, peers_path=None, pdf=False, build_root=compile_pdf.DEFAULT_BUILD_DIR,
+                 engine=None, queue_size=DEFAULT_QUEUE_SIZE, profile=False, section_names=None,
+                 records=False):
+    """
+    batch.run_batch as a pipeline: prefetching inputs, rendering, writing
+    and (with pdf) compiling run as separate stages joined by bounded queues,
+    so file I/O and TeX subprocesses overlap with rendering instead of each
+    report doing them in turn. Parsing and rendering run in a process pool
+    set up by batch.init_worker, each worker streaming its report to a
+    temporary file (batch.render_to_temp), so only paths pass between the
+    stages; the other stages, including the write stage that renames the
+    file into place, run in threads.
+    Returns (render results, PDF results, {stage: busy seconds}); results
+    are in completion order, in batch.render_one's and
+    compile_pdf.compile_tex's formats. With profile each render result
+    carries its trace, as in batch.render_one. section_names limits the
+    reports to some sections (see sections.py); records is passed to
+    batch.init_worker.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers, initializer=batch.init_worker,
+                             initargs=(template_path, search_path, peers_path, False, records)) as pool:
+        return asyncio.run(_run(json_paths, out_dir, pool, workers, streaming, pdf, build_root,
+                                engine, queue_size, profile, section_names))
@@ -0,0 +1,187 @@
+import argparse
+import os
+import re
+import time
+
+from markupsafe import Markup
+
+import combined
+import peers
+import sections
+from ingest import load_document, parse_document
+from latex_escape import LatexSafe
+from templates import make_environment
+from validation import validate_document
+
+# Preview templates, one per format. Their blocks are named like those of
+# combined.tex, so the same section names and groups select parts of them.
+PREVIEW_TEMPLATES = {
+    "html": "preview/report.html",
+    "md": "preview/report.md",
+}
+
+CONTENT_TYPES = {
+    "html": "text/html; charset=utf-8",
+    "md": "text/markdown; charset=utf-8",
+}
+
+# Company profile rows shown, as (company_profile key, title)
+PROFILE_ROWS = (
+    ("introduction", "Introduction"),
+    ("core_products_services", "Core Products and Services"),
+    ("primary_revenue", "Primary Revenue"),
+    ("manufactering_facilities", "Manufacturing Facilities"),
+    ("corporate_offices", "Corporate Offices"),
+    ("research_dev", "Research and Development"),
+)
+
+# Table rows as (row of the template dict, label), labelled as in the LaTeX tables
+FINANCIAL_ROWS = (
+    ("value_sales", "Sales"),
+    ("value_expenses", "Expenses"),
+    ("OperatingProfit", "Operating Profit"),
+    ("OPM", "OPM"),
+    ("OtherIncome", "Other Income"),
+    ("Interest", "Interest"),
+    ("Depreciation", "Depreciation"),
+    ("ProfitBeforeTax", "Profit Before Tax"),
+    ("TaxPercentage", "Tax"),
+    ("NetProfit", "Net Profit"),
+    ("EPS", "EPS"),
+)
+
+BALANCE_SHEET_ROWS = (
+    ("EquityCapital", "Equity Capital"),
+    ("Reserves", "Reserves"),
+    ("Borrowings", "Borrowings"),
+    ("OtherLiabilities", "Other Liabilities"),
+    ("TotalLiabilities", "Total Liabilities"),
+    ("FixedAssets", "Fixed Assets"),
+    ("CWIP", "CWIP"),
+    ("Investments", "Investments"),
+    ("OtherAssets", "Other Assets"),
+    ("Inventories", "Inventories"),
+    ("TradeReceivables", "Trade Receivables"),
+    ("CashEquivalents", "Cash Equivalents"),
+    ("ShortTermLoans", "Short Term Loans"),
+    ("OtherAssetItems", "Other Asset Items"),
+    ("TotalAssets", "Total Assets"),
+)
+
+CASH_FLOW_ROWS = (
+    ("profit_from_operations", "Profit from Operations"),
+    ("changes_in_receivables", "Changes in Receivables"),
+    ("changes_in_inventory", "Changes in Inventory"),
+    ("changes_in_loans_advances", "Changes in Loans & Advances"),
+    ("other_wc_items", "Other Working Capital Items"),
+    ("direct_taxes", "Direct Taxes"),
+    ("fixed_assets_purchased", "Fixed Assets Purchased"),
+    ("fixed_assets_sold", "Fixed Assets Sold"),
+    ("investments_purchased", "Investments Purchased"),
+    ("investments_sold", "Investments Sold"),
+    ("interest_received", "Interest Received"),
+    ("invest_in_subsidies", "Invest in Subsidiaries"),
+    ("investment_in_group_cos", "Investment in Group Companies"),
+    ("other_investing_items", "Other Investing Items"),
+    ("proceeds_from_shares", "Proceeds from Shares"),
+    ("proceeds_from_borrowings", "Proceeds from Borrowings"),
+    ("repayment_of_borrowings", "Repayment of Borrowings"),
+    ("interest_paid_fin", "Interest Paid on Finances"),
+    ("dividends_paid", "Dividends Paid"),
+    ("financial_liabilities", "Financial Liabilities"),
+    ("other_financing_items", "Other Financing Items"),
+)
+
+# Characters Markdown would read as markup, inside text or a table cell
+_MARKDOWN_SPECIAL = re.compile(r'([\\`*_\[\]<>|])')
+
+# Loaded preview templates, per format and search path, reused for every render
+_templates = {}
+
+
+def finalize_markdown(value):
+    """
+    Jinja2 finalize hook for the Markdown preview, the counterpart of
+    latex_escape.finalize_latex: plain strings are escaped and flattened to
+    one line, so they cannot break a list item or table row. Markup (macro
+    output marked |safe) and LatexSafe values (URLs, see combined.verbatim)
+    pass through.
+    """
+    if not isinstance(value, str) or isinstance(value, (Markup, LatexSafe)):
+        return value
+    return _MARKDOWN_SPECIAL.sub(r'\\\1', value).replace('\n', ' ')
+
+
+def load_template(output='html', search_path='.', cache_dir=None):
+    """
+    The preview template for output ('html' or 'md'), loaded once per
+    process. HTML is escaped by Jinja's autoescaping, Markdown by
+    finalize_markdown; nothing goes through the LaTeX escaping.
+    """
+    key = (output, search_path)
+    template = _templates.get(key)
+    if template is None:
+        if output not in PREVIEW_TEMPLATES:
+            raise ValueError("unknown preview format %r; formats are %s" % (output, ', '.join(PREVIEW_TEMPLATES)))
+        if output == "html":
+            env = make_environment(search_path, cache_dir, autoescape=True)
+        else:
+            env = make_environment(search_path, cache_dir, finalize=finalize_markdown)
+        env.globals.update(profile_rows=PROFILE_ROWS, financial_rows=FINANCIAL_ROWS,
+                           balance_sheet_rows=BALANCE_SHEET_ROWS, cash_flow_rows=CASH_FLOW_ROWS)
+        template = _templates[key] = env.get_template(PREVIEW_TEMPLATES[output])
+    return template
+
+
+def render_preview(data, output='html', section_names=None, peer_benchmark=None):
+    """
+    Renders a quick HTML or Markdown preview of one company's report from its
+    parsed document. The variables come from the same providers as the LaTeX
+    report (combined.SECTIONS), so the figures and commentary are the ones
+    the .tex would show; charts are not drawn. Raises validation.SchemaError
+    for an invalid document and ValueError for an unknown format or section.
+    """
+    validate_document(data)
+    template = load_template(output)
+    context = combined.build_context(data, peer_benchmark=peer_benchmark)
+    return ''.join(sections.generate(template, context, section_names))
+
+
+def render_document(raw, output='html', section_names=None):
+    # render_preview for a document still in bytes, e.g. a request body
+    try:
+        data = parse_document(raw)
+    except Exception as exc:
+        raise ValueError("invalid company document: %s" % exc) from None
+    return render_preview(data, output, section_names)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Preview a credit report as HTML or Markdown, without LaTeX. "
+                    "The .tex from combined.py remains the report of record.")
+    parser.add_argument("input", help="company JSON document")
+    parser.add_argument("-f", "--format", dest="output", choices=sorted(PREVIEW_TEMPLATES), default="html",
+                        help="preview format (default: html)")
+    parser.add_argument("-o", "--output-path", default=None,
+                        help="file to write (default: the input's name with the format's extension)")
+    parser.add_argument("--peers", default=None, help="portfolio benchmark file written by peers.py")
+    combined.add_sections_arg(parser)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    data = load_document(args.input)
+    benchmark = peers.load_benchmarks(args.peers).get(peers.company_id(args.input)) if args.peers else None
+    try:
+        text = render_preview(data, args.output, args.sections, benchmark)
+    except ValueError as exc:
+        parser.exit(1, "%s: %s\n" % (args.input, exc))
+    output_path = args.output_path or os.path.splitext(os.path.basename(args.input))[0] + '.' + args.output
+    with open(output_path, 'w') as f:
+        f.write(text)
+    print("Preview written to %s in %.1f ms" % (output_path, (time.perf_counter() - start) * 1000))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,73 @@
+import re
+
+from records import Record
+
+# One line of company profile text: its indentation, an optional bullet ('-',
+# '*', '+', '•' or '1.'), an optional bold lead-in ("**Header:**" or
+# "**Header**:"; bold with no colon is just emphasis) and the rest of the
+# line. Every field is read with this one pattern, in a single pass over the
+# text; its quantifiers are all greedy, which keeps each line's match linear
+# in its length.
+_LINE = re.compile(r'''
+    ^([ \t]*)
+    (?:([-*+•]|\d{1,3}[.)])[ \t]+)?
+    (?:\*\*([^*\n]+)\*\*(?:(?<=:\*\*)|[ \t]*:)[ \t]*)?
+    (.*)
+''', re.MULTILINE | re.VERBOSE)
+
+# Columns a tab counts for when comparing bullet indentation
+TAB_WIDTH = 4
+
+
+class ProfileItem(Record):
+    """
+    One bullet (or prose paragraph) of a company profile field: its bold
+    lead-in, if it had one, its text and the bullets nested under it.
+    """
+    __slots__ = ('header', 'text', 'children')
+
+    def __init__(self, header, text, children=None):
+        self.header = header
+        self.text = text
+        self.children = children if children is not None else []
+
+
+def parse_profile_text(text):
+    """
+    Parses one profile field into a list of ProfileItems. Bullets nest by
+    indentation ("  - " under "- "); lines without a bullet continue the item
+    above them, or, after a blank line or at the start, are a paragraph of
+    their own, so prose fields come back as one item per paragraph. '**'
+    emphasis is dropped from the text.
+    """
+    items = []
+    # (indentation, item) for each bullet the next one may nest under, outermost first
+    open_items = []
+    last = None
+    for indent, bullet, header, body in _LINE.findall(text or ''):
+        body = body.rstrip()
+        if not bullet:
+            if not header and not body:
+                last = None
+                continue
+            if last is not None:
+                line = (header + ' ' + body if header else body).replace('**', '')
+                last.text = last.text + ' ' + line if last.text else line
+                continue
+        item = ProfileItem(header.rstrip(' \t:') or None, body.replace('**', ''))
+        if not bullet:
+            open_items = []
+            items.append(item)
+        else:
+            width = len(indent.expandtabs(TAB_WIDTH))
+            while open_items and open_items[-1][0] >= width:
+                open_items.pop()
+            (open_items[-1][1].children if open_items else items).append(item)
+            open_items.append((width, item))
+        last = item
+    return items
+
+
+def parse_profile(profile):
+    # {field: [ProfileItem, ...]} for a company_profile section
+    return {key: parse_profile_text(value) for key, value in profile.items()}
@@ -0,0 +1,106 @@
+import threading
+from collections import ChainMap
+from collections.abc import Mapping
+
+import tracing
+
+
+class ProviderRegistry(dict):
+    """
+    Maps each template variable to the function that builds it. Providers take
+    the LazyContext they are being evaluated for, so they can read its inputs
+    and other variables. Names starting with '_' are intermediate values shared
+    between providers rather than template variables.
+    """
+
+    def provides(self, name):
+        def register(func):
+            self[name] = func
+            return func
+        return register
+
+    def context(self, **inputs):
+        return LazyContext(self, inputs)
+
+
+class LazyContext(Mapping):
+    """
+    Template variables that are built the first time something reads them and
+    cached for the rest of the render. Sections the template never touches are
+    never built. Each build is a "section.<name>" span (see tracing.py).
+    Sections rendered in parallel (see sections.py) may read a variable at the
+    same time; it is still built only once.
+    """
+
+    def __init__(self, providers, inputs):
+        self.providers = providers
+        self.inputs = inputs
+        self.values = {}
+        self._lock = threading.Lock()
+        self._building = {}
+
+    def __getitem__(self, name):
+        try:
+            return self.values[name]
+        except KeyError:
+            pass
+        if name not in self.providers:
+            raise KeyError(name)
+        # One lock per variable, so building one never waits on unrelated ones
+        with self._lock:
+            lock = self._building.setdefault(name, threading.Lock())
+        with lock:
+            if name in self.values:
+                return self.values[name]
+            return self._build(name)
+
+    def _build(self, name):
+        try:
+            with tracing.span("section." + name.lstrip('_')):
+                value = self.providers[name](self)
+        except KeyError as exc:
+            # A bare KeyError would read as "variable not defined" to Jinja
+            raise LookupError("building %r: missing key %s" % (name, exc)) from exc
+        self.values[name] = value
+        return value
+
+    def __contains__(self, name):
+        return name in self.values or name in self.providers
+
+    def __iter__(self):
+        return (name for name in self.providers if not name.startswith('_'))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def copy(self):
+        # The template variables built so far; unbuilt ones stay unbuilt. Jinja
+        # copies its context's variables when it rewrites a template traceback.
+        return {name: value for name, value in self.values.items() if not name.startswith('_')}
+
+    @property
+    def evaluated(self):
+        # Template variables built so far, in build order
+        return [name for name in self.values if not name.startswith('_')]
+
+
+def new_template_context(template, variables):
+    """
+    Jinja context for rendering template with variables. A LazyContext is
+    shared with Jinja rather than copied, since copying would build every
+    section up front; the template globals (range, ...) are chained behind it.
+    """
+    if isinstance(variables, LazyContext):
+        return template.new_context(ChainMap(variables, template.globals), shared=True)
+    return template.new_context(dict(variables))
+
+
+def generate(template, variables):
+    """
+    template.generate(**variables) that keeps a LazyContext lazy.
+    """
+    context = new_template_context(template, variables)
+    try:
+        yield from template.root_render_func(context)
+    except Exception:
+        yield template.environment.handle_exception()
@@ -0,0 +1,172 @@
+import re
+import numpy as np
+
+from financials import SeriesTable, period_key
+
+# Decimal places ratios are rounded to before they are shown
+RATIO_DECIMALS = 2
+
+# Ratio name -> (label, unit) for every ratio compute_ratios produces, in the
+# order they are computed. '%' ratios are marked as percentage columns.
+RATIOS = {
+    "debt_equity": ("Debt/Equity", "x"),
+    "interest_coverage": ("Interest Coverage", "x"),
+    "current_ratio": ("Current Ratio", "x"),
+    "quick_ratio": ("Quick Ratio", "x"),
+    "inventory_turnover": ("Inventory Turnover", "x"),
+    "inventory_days": ("Inventory Days", "days"),
+    "receivable_days": ("Receivable Days", "days"),
+    "payable_days": ("Payable Days", "days"),
+    "cash_conversion_cycle": ("Cash Conversion Cycle", "days"),
+    "roe": ("ROE", "%"),
+    "roce": ("ROCE", "%"),
+    "roa": ("ROA", "%"),
+    "asset_turnover": ("Asset Turnover", "x"),
+}
+
+_FISCAL_YEAR = re.compile(r'(?:FY-?)?(\d{2}|\d{4})')
+
+# The last year number in a period label
+_LAST_YEAR = re.compile(r'(?<!\d)(\d{4}|\d{2})(?!.*\d)')
+
+
+def align_key(label):
+    """
+    Key used to line up periods across tables. On top of period_key, annual
+    labels from different producers meet on one key: 'FY 23', 'FY-23', 'FY2023'
+    and '2023' all become 'FY-23'.
+    """
+    key = period_key(label)
+    match = _FISCAL_YEAR.fullmatch(key)
+    if match:
+        return 'FY-' + match.group(1)[-2:]
+    return key
+
+
+def latest_period(periods):
+    """
+    The most recent of periods by the year in its label ('FY-24', '2024',
+    'Q4 FY-24'), whatever order the producer stored them in. Labels with no
+    year count as older than any dated one; among equals the last stored wins.
+    Returns None for no periods.
+    """
+    def order(item):
+        position, label = item
+        match = _LAST_YEAR.search(align_key(label))
+        return (int(match.group(1)[-2:]) if match else -1, position)
+    return max(enumerate(periods), key=order)[1] if periods else None
+
+
+def slots(table, periods):
+    """
+    Index of each of periods in table's period axis, -1 where the table has no
+    such period. Computed once per table and reused for every metric.
+    """
+    index = {align_key(p): i for i, p in enumerate(table.periods)}
+    return np.array([index.get(align_key(p), -1) for p in periods], dtype=np.intp)
+
+
+def gather(table, metrics, periods):
+    """
+    Returns {metric: float64 array on periods} for the metrics of one table,
+    with NaN wherever the table has no figure for that period.
+    """
+    positions = slots(table, periods)
+    missing = positions < 0
+    result = {}
+    for metric in metrics:
+        values, _ = table.column(metric)
+        if len(values):
+            column = values[np.where(missing, 0, positions)]
+        else:
+            column = np.full(len(periods), np.nan)
+        column[missing] = np.nan
+        result[metric] = column
+    return result
+
+
+def _divide(numerator, denominator):
+    # NaN in, NaN out; a zero denominator also gives NaN rather than inf
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = numerator / denominator
+    result[~np.isfinite(result)] = np.nan
+    return result
+
+
+def ratio_axis(model):
+    """
+    Period axis for the ratio table: the balance sheet years, which nearly every
+    ratio needs, or the company financials years when there is no balance sheet.
+    """
+    periods = model["balance_sheet_analysis"]["table"].periods
+    return list(periods or model["company_financials"]["table"].periods)
+
+
+def ratio_inputs(model, periods):
+    """
+    Gathers every figure the ratios need onto periods: {input name: float64
+    array}, NaN where a figure is missing. Each source table is indexed once.
+    """
+    inputs = gather(model["balance_sheet_analysis"]["table"],
+                    ("equity_capital", "reserves", "borrowings", "inventories",
+                     "trade_receivables", "total_assets"), periods)
+    inputs.update(gather(model["company_financials"]["table"],
+                         ("sales", "expenses", "interest", "profit_before_tax", "net_profit"), periods))
+    inputs.update(gather(model["brief_financials"],
+                         ("current_assets", "current_liabilities", "current_ratio"), periods))
+    other_liabilities = model["debt_schedule"]["table"].get("other_liabilities")
+    if other_liabilities is not None:
+        inputs.update(gather(other_liabilities, ("trade_payables",), periods))
+    else:
+        inputs["trade_payables"] = np.full(len(periods), np.nan)
+    return inputs
+
+
+def ratios_from_inputs(inputs):
+    """
+    The ratio formulas, as whole-array operations on the arrays from
+    ratio_inputs. The arrays can run along periods (one company) or along
+    companies (a portfolio, see peers.py); a figure missing in any input (NA)
+    makes just the affected ratio cells NA. Returns {ratio name: array}
+    rounded to RATIO_DECIMALS.
+    """
+    equity = inputs["equity_capital"] + inputs["reserves"]
+    ebit = inputs["profit_before_tax"] + inputs["interest"]
+    current_ratio = _divide(inputs["current_assets"], inputs["current_liabilities"])
+    # The producer's figure only fills in where the ratio cannot be computed,
+    # and only when positive: producers write 0 as a placeholder
+    producer = inputs["current_ratio"]
+    current_ratio = np.where(np.isnan(current_ratio) & (producer > 0), producer, current_ratio)
+
+    values = {}
+    values["debt_equity"] = _divide(inputs["borrowings"], equity)
+    values["interest_coverage"] = _divide(ebit, inputs["interest"])
+    values["current_ratio"] = current_ratio
+    values["quick_ratio"] = _divide(inputs["current_assets"] - inputs["inventories"],
+                                    inputs["current_liabilities"])
+    values["inventory_turnover"] = _divide(inputs["sales"], inputs["inventories"])
+    values["inventory_days"] = _divide(inputs["inventories"], inputs["expenses"]) * 365
+    values["receivable_days"] = _divide(inputs["trade_receivables"], inputs["sales"]) * 365
+    values["payable_days"] = _divide(inputs["trade_payables"], inputs["expenses"]) * 365
+    values["cash_conversion_cycle"] = (values["inventory_days"] + values["receivable_days"]
+                                       - values["payable_days"])
+    values["roe"] = _divide(inputs["net_profit"], equity) * 100
+    values["roce"] = _divide(ebit, equity + inputs["borrowings"]) * 100
+    values["roa"] = _divide(inputs["net_profit"], inputs["total_assets"]) * 100
+    values["asset_turnover"] = _divide(inputs["sales"], inputs["total_assets"])
+    return {name: np.round(values[name], RATIO_DECIMALS) for name in RATIOS}
+
+
+def compute_ratios(model, periods=None):
+    """
+    Computes every ratio in RATIOS for all periods at once from the canonical
+    model's balance sheet, company financials, brief financials and debt
+    schedule, with no per-cell Python loop.
+    Returns a SeriesTable, so ratios format and chart like any other table.
+    """
+    if periods is None:
+        periods = ratio_axis(model)
+    values = ratios_from_inputs(ratio_inputs(model, periods))
+    masks = {name: np.isnan(column) for name, column in values.items()}
+    percent = [name for name, (_, unit) in RATIOS.items() if unit == '%']
+    return SeriesTable(periods, values, masks, percent)
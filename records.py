@@ -0,0 +1,140 @@
+import sys
+
+# Compact records for the list sections of the canonical model. A parsed
+# JSON object is a hash table holding every key the producer wrote; a record
+# keeps only the fields the report reads, in fixed __slots__, so a model that
+# is held (many documents at once) takes less memory. Records are built from
+# the parsed objects, so they cost time on top of json.load rather than
+# saving it: the model keeps the producer's objects unless asked for records
+# (schema.normalize_document). Either way items are read by their JSON field
+# names. The financial tables need no records: schema.normalize_table
+# already makes them columnar (financials.SeriesTable).
+
+# Longest field value that is interned
+SHORT_TEXT = 40
+
+# Field layouts remembered per record type (see Record._layout); producers
+# write a handful, so more than this means field names that keep changing
+MAX_LAYOUTS = 16
+
+
+def _short(value):
+    # Short categorical values ('NA', '100.00%', 'India', ratings) repeat across
+    # records and documents; interned, every repeat shares one string
+    return sys.intern(value) if isinstance(value, str) and len(value) <= SHORT_TEXT else value
+
+
+class Record:
+    __slots__ = ()
+
+    # Slot -> the JSON field it is read from, where the names differ
+    _aliases = {}
+
+    # JSON field -> slot, the reverse of _aliases; set for each subclass
+    _slots_by_field = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._slots_by_field = {field: name for name, field in cls._aliases.items()}
+        # (fields, key) -> layout, for this type alone (see _layout)
+        cls._layouts = {}
+
+    @classmethod
+    def from_json(cls, obj, key=None):
+        """
+        Builds the record from one parsed JSON object; fields the record does
+        not know are dropped and missing ones are None. key maps the JSON's
+        field names before they are matched (see schema.canonical_key).
+        """
+        return cls(*map(obj.get, cls._layout(tuple(obj), key)))
+
+    @classmethod
+    def from_list(cls, items, key=None):
+        return [cls.from_json(item, key) for item in items or ()]
+
+    @classmethod
+    def _layout(cls, fields, key):
+        """
+        The JSON field read for each slot, for objects with these fields. A
+        section's objects almost always share one layout, so matching names
+        (and calling key) happens once per layout, not once per object. Each
+        record type keeps at most MAX_LAYOUTS, starting afresh when full.
+        """
+        layouts = cls._layouts
+        layout = layouts.get((fields, key))
+        if layout is None:
+            if len(layouts) >= MAX_LAYOUTS:
+                layouts.clear()
+            by_name = {(key(field) if key else field): field for field in fields}
+            layout = layouts[(fields, key)] = tuple(
+                by_name.get(cls._aliases.get(name, name)) for name in cls.__slots__)
+        return layout
+
+    def __getitem__(self, field):
+        # Read by JSON field name, like the producer's objects
+        try:
+            return getattr(self, self._slots_by_field.get(field, field))
+        except AttributeError:
+            raise KeyError(field) from None
+
+    def get(self, field, default=None):
+        try:
+            return self[field]
+        except KeyError:
+            return default
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other):
+        return type(other) is type(self) and self.as_dict() == other.as_dict()
+
+    def __repr__(self):
+        return "%s(%s)" % (type(self).__name__,
+                           ", ".join("%s=%r" % (name, getattr(self, name)) for name in self.__slots__))
+
+
+class Promoter(Record):
+    __slots__ = ('name', 'experience')
+
+    def __init__(self, name, experience):
+        self.name = name
+        self.experience = experience
+
+
+class KeyPoint(Record):
+    # A key issue or key strength
+    __slots__ = ('header', 'content')
+    _aliases = {'header': 'point_header', 'content': 'point_content'}
+
+    def __init__(self, header, content):
+        self.header = header
+        self.content = content
+
+
+class IndustryRisk(Record):
+    __slots__ = ('sources', 'risk')
+
+    def __init__(self, sources, risk):
+        # ultimate gives a single source as a string, orig a list of them
+        self.sources = tuple(sources) if isinstance(sources, list) else (sources,)
+        self.risk = risk
+
+
+class PeerRating(Record):
+    __slots__ = ('company_name', 'long_term_rating', 'short_term_rating')
+
+    def __init__(self, company_name, long_term_rating, short_term_rating):
+        self.company_name = company_name
+        self.long_term_rating = _short(long_term_rating)
+        self.short_term_rating = _short(short_term_rating)
+
+
+class Subsidiary(Record):
+    __slots__ = ('subsidiary_name', 'date_of_creation', 'interest', 'location')
+
+    def __init__(self, subsidiary_name, date_of_creation, interest, location):
+        self.subsidiary_name = subsidiary_name
+        self.date_of_creation = _short(date_of_creation)
+        self.interest = _short(interest)
+        self.location = _short(location)
@@ -0,0 +1,246 @@
+import re
+from financials import SeriesTable
+from records import IndustryRisk, KeyPoint, PeerRating, Promoter, Subsidiary
+
+# The two producer layouts we receive:
+#   orig     - PascalCase tables with Year/Value entries (orig.json)
+#   ultimate - snake_case tables with year/value entries (ultimate.json)
+ORIG = 'orig'
+ULTIMATE = 'ultimate'
+
+# Top-level keys that only one of the producers uses, which are also each
+# producer's names for the sections in SECTION_ALIASES
+DIALECT_SECTIONS = {
+    ORIG: ('promoters', 'Concalls', 'Recent_News', 'cash_flow_analysis',
+           'performance_ratios', 'working_capital_movement', 'subsidiary_jv_info'),
+    ULTIMATE: ('promoter_list', 'concalls', 'recent_news', 'cash_flow_data',
+               'performance_ratio', 'working_capital_movemement', 'subsidiary_info'),
+}
+
+# Section names in either layout and the canonical name they are stored under
+SECTION_ALIASES = {
+    'promoter_list': 'promoters',
+    'Concalls': 'concalls',
+    'Recent_News': 'recent_news',
+    'cash_flow_data': 'cash_flow_analysis',
+    'performance_ratio': 'performance_ratios',
+    'working_capital_movemement': 'working_capital_movement',
+    'subsidiary_info': 'subsidiary_jv_info',
+}
+
+# Every top-level key normalize_document reads, in either layout. Anything else
+# in a document (e.g. orig.json's loose EBITDA/PAT lists or ratio_analysis) is
+# not used by the report and can be skipped at load time.
+USED_SECTIONS = frozenset((
+    'company_profile', 'promoters', 'key_issues', 'key_strengths', 'industry_risks',
+    'brief_financials', 'financial_data', 'company_financials', 'balance_sheet_analysis',
+    'debt_schedule', 'fixed_assets', 'cash_flow_analysis', 'peer_ratings', 'leverage_ratio',
+    'performance_ratios', 'activity_ratio', 'working_capital_movement', 'ownership_structure',
+    'financial_analysis', 'justification_of_proposal', 'recommendation', 'subsidiary_jv_info',
+    'concalls', 'recent_news',
+)) | frozenset(SECTION_ALIASES)
+
+# The table sections ratios are computed from. They have the same name in both
+# layouts, plus the optional top-level sector label used for peer groups.
+FINANCIAL_SECTIONS = frozenset((
+    'brief_financials', 'balance_sheet_analysis', 'company_financials', 'debt_schedule', 'sector',
+))
+
+# Keys that the generic snake_case conversion cannot derive
+KEY_ALIASES = {
+    'OPM %': 'opm',
+    'subsidiary': 'subsidiaries',
+}
+
+_NUMBER_PREFIX = re.compile(r'^\d+\.')
+_CAMEL_BOUNDARY = re.compile(r'(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])')
+_SEPARATORS = re.compile(r'[\s_]+')
+
+_key_cache = {}
+
+
+def canonical_key(key):
+    """
+    Maps a key from either layout to its snake_case canonical form, e.g.
+    'OperatingProfit' -> 'operating_profit', '1.Headline_and_Source' ->
+    'headline_and_source', 'Infrastructure Developments' -> 'infrastructure_developments'.
+    """
+    cached = _key_cache.get(key)
+    if cached is not None:
+        return cached
+    if key in KEY_ALIASES:
+        result = KEY_ALIASES[key]
+    else:
+        result = _NUMBER_PREFIX.sub('', key.strip())
+        result = _CAMEL_BOUNDARY.sub('_', result)
+        result = _SEPARATORS.sub('_', result).strip('_').lower()
+    _key_cache[key] = result
+    return result
+
+
+def detect_dialect(data):
+    """
+    Works out which producer wrote the document from its top-level keys.
+    """
+    scores = {dialect: sum(1 for key in markers if key in data)
+              for dialect, markers in DIALECT_SECTIONS.items()}
+    best = max(scores, key=scores.get)
+    if scores[best] == 0:
+        raise ValueError("Unrecognised company document: none of the known section names are present")
+    return best
+
+
+def normalize_keys(node):
+    """
+    Recursively renames dict keys to canonical form, e.g. for the concalls and
+    recent_news sections, whose structure is otherwise the same in both layouts.
+    """
+    if isinstance(node, dict):
+        return {canonical_key(key): normalize_keys(value) for key, value in node.items()}
+    if isinstance(node, list):
+        return [normalize_keys(value) for value in node]
+    return node
+
+
+def normalize_table(table):
+    """
+    Turns {metric: [{year|Year|quarter|Quarter: p, value|Value: v}, ...]} into a
+    columnar financials.SeriesTable in one pass over the entries, with metric
+    names in canonical form.
+    """
+    return SeriesTable.from_entries(table, key=canonical_key)
+
+
+def normalize_nested_table(table):
+    # debt_schedule nests one more level: {"borrowings": {...}, "other_liabilities": {...}}
+    return {canonical_key(group): normalize_table(metrics) for group, metrics in (table or {}).items()}
+
+
+def normalize_graphs(graphs):
+    """
+    Graphs are {name: url}, {name: {"url": url}} or {name: {"path": path}}
+    depending on the producer; the canonical form is a list of {"name", "url"}.
+    """
+    result = []
+    for name, target in (graphs or {}).items():
+        if isinstance(target, dict):
+            target = target.get('url', target.get('path'))
+        result.append({"name": name, "url": target})
+    return result
+
+
+def _points(value):
+    # ultimate nests these lists as {"points": [...]}
+    if isinstance(value, dict):
+        return list(value.get('points') or ())
+    return list(value or ())
+
+
+def _items(record_type, items, records, key=None):
+    """
+    A list section: the producer's objects, with field names mapped by key
+    (see schema.canonical_key), or with records as record_type records (see
+    records.py). Both are read by field name.
+    """
+    if records:
+        return record_type.from_list(items, key)
+    if key is not None:
+        return [{key(field): value for field, value in item.items()} for item in items or ()]
+    return list(items or ())
+
+
+def _table_section(section, nested=False):
+    section = section or {}
+    return {
+        "table": (normalize_nested_table if nested else normalize_table)(section.get('table')),
+        "commentary": list(section.get('commentary') or ()),
+    }
+
+
+def _graph_section(section):
+    section = section or {}
+    return {
+        "graphs": normalize_graphs(section.get('graphs')),
+        "commentary": list(section.get('commentary') or ()),
+    }
+
+
+def normalize_financials(data):
+    """
+    Just the financial tables of a document in either layout, in the same shape
+    normalize_document gives them. Used where the rest of the report is not
+    needed, e.g. when benchmarking a whole portfolio (see peers.py).
+    """
+    return {
+        "sector": data.get('sector'),
+        "brief_financials": normalize_table(data.get('brief_financials')),
+        "balance_sheet_analysis": _table_section(data.get('balance_sheet_analysis')),
+        "company_financials": _table_section(data.get('company_financials')),
+        "debt_schedule": _table_section(data.get('debt_schedule'), nested=True),
+    }
+
+
+def normalize_document(data, records=False):
+    """
+    Maps a company document in either producer layout onto the canonical model
+    the renderer works from. Each section of the input is visited once. The
+    tables become columnar SeriesTables; with records, the list sections
+    become compact records (see records.py), which hold less memory but take
+    longer to build than keeping the parsed objects.
+    """
+    dialect = detect_dialect(data)
+    sections = {SECTION_ALIASES.get(key, key): value for key, value in data.items()}
+
+    promoters = sections.get('promoters') or {}
+    justification = sections.get('justification_of_proposal')
+    if isinstance(justification, dict):
+        recommendation = justification.get('recommendation')
+        justification = justification.get('justification_of_proposal')
+    else:
+        recommendation = sections.get('recommendation')
+
+    cash_flow = sections.get('cash_flow_analysis') or {}
+    cash_flow_graph = cash_flow.get('graph') or {}
+    cash_flow_model = _table_section(cash_flow)
+    cash_flow_model["graph"] = {"url": cash_flow_graph.get('url', cash_flow_graph.get('path'))}
+    cash_flow_model["graph_commentary"] = list(cash_flow.get('graph_commentary') or ())
+
+    subsidiary_info = {canonical_key(key): value
+                       for key, value in (sections.get('subsidiary_jv_info') or {}).items()}
+    peer_ratings = sections.get('peer_ratings') or {}
+
+    return {
+        "dialect": dialect,
+        "company_profile": dict(sections.get('company_profile') or {}),
+        "promoters": _items(Promoter, promoters.get('promoters'), records),
+        "key_issues": _items(KeyPoint, (sections.get('key_issues') or {}).get('issues'), records),
+        "key_strengths": _items(KeyPoint, (sections.get('key_strengths') or {}).get('strengths'), records),
+        "industry_risks": _items(IndustryRisk, (sections.get('industry_risks') or {}).get('risks'), records),
+        "brief_financials": normalize_table(sections.get('brief_financials')),
+        "financial_data": _table_section(sections.get('financial_data')),
+        "company_financials": _table_section(sections.get('company_financials')),
+        "balance_sheet_analysis": _table_section(sections.get('balance_sheet_analysis')),
+        "debt_schedule": _table_section(sections.get('debt_schedule'), nested=True),
+        "fixed_assets": _table_section(sections.get('fixed_assets')),
+        "cash_flow_analysis": cash_flow_model,
+        "peer_ratings": {
+            "ratings": _items(PeerRating, peer_ratings.get('ratings'), records),
+            "commentary": list(peer_ratings.get('commentary') or ()),
+        },
+        "leverage_ratio": _graph_section(sections.get('leverage_ratio')),
+        "performance_ratios": _graph_section(sections.get('performance_ratios')),
+        "activity_ratio": _graph_section(sections.get('activity_ratio')),
+        "working_capital_movement": _graph_section(sections.get('working_capital_movement')),
+        "ownership_structure": _graph_section(sections.get('ownership_structure')),
+        "financial_analysis": {
+            "commentary": list((sections.get('financial_analysis') or {}).get('commentary') or ()),
+        },
+        "justification_of_proposal": _points(justification),
+        "recommendation": _points(recommendation),
+        "subsidiary_jv_info": {
+            "subsidiaries": _items(Subsidiary, subsidiary_info.get('subsidiaries'), records, canonical_key),
+            "jv_information": list(subsidiary_info.get('jv_information') or ()),
+        },
+        "concalls": normalize_keys(sections.get('concalls') or {}),
+        "recent_news": normalize_keys(sections.get('recent_news') or {}),
+    }
@@ -0,0 +1,100 @@
+import tracing
+from providers import new_template_context
+
+# combined.tex is a layout of {% block %}s, one per section, each including its
+# body from a template in this directory. Sections are rendered and cached
+# (see fragments.py) block by block.
+SECTION_DIR = 'sections'
+
+# Names that select several sections at once, e.g. for a financials-only refresh
+SECTION_GROUPS = {
+    "key_points": ("key_issues", "key_strengths"),
+    "financial_data": ("financial_data", "financial_commentary"),
+    "peer_ratings": ("peer_ratings", "peer_commentary"),
+    "balance_sheet": ("balance_sheet", "balance_sheet_commentary"),
+    "ratios": ("leverage_ratio", "leverage_ratio_commentary", "performance_ratios",
+               "performance_ratio_commentary", "activity_ratios"),
+    "ownership": ("ownership_structure", "ownership_structure_commentary"),
+    "financial_analysis": ("company_financials", "debt_schedule", "working_capital", "fixed_assets",
+                           "cash_flow"),
+    "financials": ("brief_financials", "financial_data", "financial_commentary", "balance_sheet",
+                   "balance_sheet_commentary", "company_financials", "debt_schedule", "working_capital",
+                   "fixed_assets", "cash_flow"),
+    "proposal": ("justification_of_proposal", "recommendation"),
+}
+
+
+def section_names(template):
+    # Every section of the template, in report order
+    return list(template.blocks)
+
+
+def select_sections(template, names):
+    """
+    The sections named by names (SECTION_GROUPS or section names; a group
+    named after a section also brings its commentary), or every section when
+    names is None. Raises ValueError for an unknown name.
+    """
+    known = section_names(template)
+    if names is None:
+        return set(known)
+    selected = set()
+    for name in names:
+        if name in SECTION_GROUPS:
+            selected.update(SECTION_GROUPS[name])
+        elif name in known:
+            selected.add(name)
+        else:
+            raise ValueError("unknown section %r; sections are %s and the groups %s" % (
+                name, ', '.join(known), ', '.join(SECTION_GROUPS)))
+    return selected
+
+
+def parse_sections(text):
+    # "financials,ratios" -> ["financials", "ratios"]; None or '' -> None (all)
+    if not text:
+        return None
+    return [name.strip() for name in text.split(',') if name.strip()]
+
+
+def _skipped(context):
+    return iter(())
+
+
+def _render_block(render, context):
+    return ''.join(render(context))
+
+
+def _rendered(future):
+    def render(context):
+        yield future.result()
+    return render
+
+
+def generate(template, variables, sections=None, executor=None, fragment_cache=None):
+    """
+    providers.generate(template, variables), section by section. Only the
+    sections named in sections (see select_sections) are rendered; the others
+    are left out of the document and the variables only they read are never
+    built. With a concurrent.futures executor the sections are rendered
+    concurrently and spliced back in report order; with a
+    fragments.FragmentCache unchanged sections come from the cache.
+    Sections are rendered one after another while a trace is active, since
+    spans are timed per process (see tracing.py).
+    """
+    selected = select_sections(template, sections)
+    context = new_template_context(template, variables)
+    blocks = context.blocks
+    for name in section_names(template):
+        if name not in selected:
+            blocks[name][0] = _skipped
+    if fragment_cache is not None:
+        fragment_cache.prepare(template, variables, context, selected)
+    if executor is not None and not tracing.active():
+        for name in section_names(template):
+            if name in selected:
+                blocks[name][0] = _rendered(executor.submit(_render_block, blocks[name][0], context))
+    try:
+        yield from template.root_render_func(context)
+    except Exception:
+        yield template.environment.handle_exception()
@@ -0,0 +1,395 @@
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import json
+import os
+import re
+import time
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import batch
+import combined
+import compile_pdf
+import preview
+import sections
+from validation import SchemaError
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# Requests allowed to wait for a render slot; beyond this new ones get a 503
+DEFAULT_QUEUE_SIZE = 32
+
+# Largest request body (company document) accepted
+MAX_BODY_BYTES = 64 * 1024 * 1024
+
+# Reports compiled to PDF are written here, with their build directories
+# under it, so repeat requests for a company reuse its .aux files
+DEFAULT_WORK_DIR = 'server_reports'
+
+# Seconds a refused client is asked to wait before retrying
+RETRY_AFTER = 1
+
+TEX_CONTENT_TYPE = 'application/x-tex; charset=utf-8'
+
+_REASONS = {
+    100: 'Continue',
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    411: 'Length Required',
+    413: 'Payload Too Large',
+    422: 'Unprocessable Entity',
+    500: 'Internal Server Error',
+    501: 'Not Implemented',
+    503: 'Service Unavailable',
+}
+
+# Company ids are file stems (see peers.company_id) and name the PDF build directory
+_COMPANY_ID = re.compile(r'[A-Za-z0-9_.-]+')
+
+
+class HTTPError(Exception):
+    """
+    A request that ends in an error response. close drops the connection
+    afterwards, for errors that leave unread data on it.
+    """
+
+    def __init__(self, status, message, headers=None, close=False):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+        self.close = close
+
+
+# Rounds of warm-up tasks submitted before giving up on reaching every worker
+WARM_UP_ROUNDS = 3
+
+_warmed = False
+
+
+def _warm():
+    """
+    Submitted to every worker at start-up, before the server takes requests:
+    warms the LaTeX renderer (see batch.warm_worker) and the preview
+    templates. Returns the worker's pid; a worker warms once.
+    """
+    global _warmed
+    if not _warmed:
+        batch.warm_worker()
+        for path in batch.warm_up_paths():
+            with open(path, 'rb') as f:
+                raw = f.read()
+            for output in preview.PREVIEW_TEMPLATES:
+                preview.render_document(raw, output)
+        _warmed = True
+    return os.getpid()
+
+
+async def read_request(reader):
+    """
+    Reads one HTTP/1.1 request. Returns (method, target, headers, body), or
+    None when the client closed the connection between requests.
+    """
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, version = line.decode('latin-1').split()
+    except ValueError:
+        raise HTTPError(400, "malformed request line", close=True) from None
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, sep, value = line.decode('latin-1').partition(':')
+        if not sep:
+            raise HTTPError(400, "malformed header", close=True)
+        headers[name.strip().lower()] = value.strip()
+    if version == 'HTTP/1.0' and headers.get('connection', '').lower() != 'keep-alive':
+        headers['connection'] = 'close'
+
+    body = b''
+    if method == 'POST':
+        if 'content-length' not in headers:
+            raise HTTPError(411, "Content-Length required", close=True)
+        try:
+            length = int(headers['content-length'])
+        except ValueError:
+            raise HTTPError(400, "invalid Content-Length", close=True) from None
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, "body larger than %d bytes" % MAX_BODY_BYTES, close=True)
+        if headers.get('expect', '').lower() == '100-continue':
+            return method, target, headers, length
+        body = await reader.readexactly(length)
+    return method, target, headers, body
+
+
+def write_response(writer, status, body, content_type='text/plain; charset=utf-8', headers=None, close=False):
+    lines = ["HTTP/1.1 %d %s" % (status, _REASONS.get(status, '')),
+             "Content-Type: %s" % content_type,
+             "Content-Length: %d" % len(body)]
+    lines.extend("%s: %s" % item for item in (headers or {}).items())
+    if close:
+        lines.append("Connection: close")
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+
+
+class RenderServer:
+    """
+    Serves reports over HTTP from a pool of warm worker processes: each worker
+    loads the compiled template and opens the caches once, so a request pays
+    only for its own render. At most `workers` requests are rendered at once,
+    up to queue_size more wait for a slot, and anything beyond that is refused
+    with 503 and Retry-After rather than queued without bound.
+
+    POST /render?company=<id>&format=tex|pdf with the company JSON as the body
+    returns the .tex (or the PDF, when a TeX engine is installed);
+    format=html|md returns a quick preview instead (see preview.py). company
+    picks the report's entry in the peers file and names its PDF build
+    directory. &sections=financials,ratios renders only those sections (see
+    sections.py). GET /health returns the server's counters as JSON.
+    """
+
+    def __init__(self, workers=None, queue_size=DEFAULT_QUEUE_SIZE, template_path='combined.tex',
+                 search_path='.', peers_path=None, work_dir=DEFAULT_WORK_DIR, engine=None, timeout=None,
+                 records=False):
+        self.workers = workers or os.cpu_count()
+        self.queue_size = queue_size
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=batch.init_worker,
+                                        initargs=(template_path, search_path, peers_path, False, records))
+        self.slots = asyncio.Semaphore(self.workers)
+        self.work_dir = work_dir
+        self.engine = engine
+        self.timeout = timeout
+        self.pdf_available = compile_pdf.engine_available(engine)
+        # One compile at a time per company, since it owns a build directory.
+        # A lock lives only while some request holds or waits for it.
+        self._pdf_locks = weakref.WeakValueDictionary()
+        self.waiting = 0
+        self.in_flight = 0
+        self.rendered = 0
+        self.failed = 0
+        self.rejected = 0
+        self.started = time.time()
+
+    async def warm_up(self):
+        # A worker that finishes early can take a second task, so warm-up runs
+        # in rounds until every worker has reported in
+        loop = asyncio.get_running_loop()
+        warmed = set()
+        for _ in range(WARM_UP_ROUNDS):
+            warmed.update(await asyncio.gather(*(loop.run_in_executor(self.pool, _warm)
+                                                 for _ in range(self.workers))))
+            if len(warmed) >= self.workers:
+                break
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        # Backpressure: refuse outright once the wait queue is full
+        if self.slots.locked() and self.waiting >= self.queue_size:
+            self.rejected += 1
+            raise HTTPError(503, "server busy: %d requests waiting" % self.waiting,
+                            {"Retry-After": str(RETRY_AFTER)})
+        self.waiting += 1
+        try:
+            await self.slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.slots.release()
+
+    async def render(self, body, company=None, section_names=None, output="tex"):
+        loop = asyncio.get_running_loop()
+        try:
+            if output in preview.PREVIEW_TEMPLATES:
+                return await loop.run_in_executor(self.pool, preview.render_document, body, output, section_names)
+            return await loop.run_in_executor(self.pool, batch.render_document, body, company, None,
+                                              section_names)
+        except SchemaError as exc:
+            # Every problem, one per line, so the client can fix them all at once
+            raise HTTPError(422, '\n'.join(["invalid company document:"] + exc.problems)) from None
+        except (ValueError, LookupError) as exc:
+            raise HTTPError(422, str(exc)) from None
+
+    async def compile(self, tex, name):
+        lock = self._pdf_locks.get(name)
+        if lock is None:
+            lock = self._pdf_locks[name] = asyncio.Lock()
+        async with lock:
+            os.makedirs(self.work_dir, exist_ok=True)
+            tex_path = os.path.join(self.work_dir, name + '.tex')
+            with open(tex_path, 'w') as f:
+                f.write(tex)
+            build_root = os.path.join(self.work_dir, compile_pdf.DEFAULT_BUILD_DIR)
+            result = await asyncio.to_thread(compile_pdf.compile_tex, tex_path, build_root,
+                                             self.engine, self.timeout)
+            if not result["ok"]:
+                raise HTTPError(500, "PDF compile failed: %s" % result["error"])
+            with open(result["output"], 'rb') as f:
+                return f.read()
+
+    def health(self):
+        return {
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "queue_size": self.queue_size,
+            "rendered": self.rendered,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "pdf": self.pdf_available,
+            "uptime": round(time.time() - self.started, 3),
+        }
+
+    async def respond(self, method, target, body, reader, writer):
+        """
+        Handles one request and returns (status, body, content type, headers).
+        body is the body's length instead when the client sent Expect:
+        100-continue: it is only read once a render slot is free, so a refused
+        request never uploads its document.
+        """
+        unread = isinstance(body, int)
+        try:
+            url = urlsplit(target)
+            if url.path == '/health':
+                if method != 'GET':
+                    raise HTTPError(405, "use GET", {"Allow": "GET"})
+                return 200, json.dumps(self.health()).encode('utf-8'), 'application/json', {}
+            if url.path != '/render':
+                raise HTTPError(404, "no such endpoint: %s" % url.path)
+            if method != 'POST':
+                raise HTTPError(405, "use POST", {"Allow": "POST"})
+
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            company = query.get("company")
+            if company is not None and not _COMPANY_ID.fullmatch(company):
+                raise HTTPError(400, "invalid company id")
+            section_names = sections.parse_sections(query.get("sections"))
+            output = query.get("format", "tex")
+            if output not in ("tex", "pdf") and output not in preview.PREVIEW_TEMPLATES:
+                raise HTTPError(400, "format must be tex, pdf, html or md")
+            if output == "pdf" and not self.pdf_available:
+                raise HTTPError(501, "no TeX engine available for PDF output")
+
+            async with self.slot():
+                if unread:
+                    writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+                    await writer.drain()
+                    body = await reader.readexactly(body)
+                    unread = False
+                start = time.perf_counter()
+                try:
+                    tex = await self.render(body, company, section_names, output)
+                    if output in preview.CONTENT_TYPES:
+                        payload, content_type = tex.encode('utf-8'), preview.CONTENT_TYPES[output]
+                    elif output == "pdf":
+                        name = company or 'report-' + hashlib.sha1(body).hexdigest()[:12]
+                        payload, content_type = await self.compile(tex, name), 'application/pdf'
+                    else:
+                        payload, content_type = tex.encode('utf-8'), TEX_CONTENT_TYPE
+                except Exception:
+                    self.failed += 1
+                    raise
+                self.rendered += 1
+        except HTTPError as exc:
+            # A body left unsent would be read as the next request
+            exc.close = exc.close or unread
+            raise
+        return 200, payload, content_type, {"X-Render-Seconds": "%.3f" % (time.perf_counter() - start)}
+
+    async def handle(self, reader, writer):
+        # One connection; requests on it are served in turn until it closes
+        try:
+            while True:
+                close = False
+                try:
+                    request = await read_request(reader)
+                    if request is None:
+                        break
+                    method, target, headers, body = request
+                    close = headers.get('connection', '').lower() == 'close'
+                    status, payload, content_type, extra = await self.respond(method, target, body, reader, writer)
+                except HTTPError as exc:
+                    close = close or exc.close
+                    write_response(writer, exc.status, (str(exc) + '\n').encode('utf-8'),
+                                   headers=exc.headers, close=close)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    break
+                except Exception as exc:
+                    close = True
+                    message = "%s: %s\n" % (type(exc).__name__, exc)
+                    write_response(writer, 500, message.encode('utf-8'), close=close)
+                else:
+                    write_response(writer, status, payload, content_type, extra, close)
+                await writer.drain()
+                if close:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+
+async def serve(server, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None):
+    await server.warm_up()
+    if unix_path:
+        listener = await asyncio.start_unix_server(server.handle, path=unix_path)
+        where = unix_path
+    else:
+        listener = await asyncio.start_server(server.handle, host, port)
+        where = "http://%s:%d" % (host, port)
+    print("Serving reports on %s with %d workers (PDF %s)" % (
+        where, server.workers, "on" if server.pdf_available else "off"))
+    async with listener:
+        await listener.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve credit reports over HTTP from warm render workers.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="address to listen on (default: localhost only)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="TCP port to listen on")
+    parser.add_argument("--unix", default=None, help="listen on this Unix socket instead of TCP")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="reports rendered at once (default: CPU count)")
+    parser.add_argument("--queue", type=int, default=DEFAULT_QUEUE_SIZE,
+                        help="requests allowed to wait for a worker before 503s")
+    parser.add_argument("--template", default="combined.tex", help="LaTeX template to render")
+    parser.add_argument("--peers", default=None, help="portfolio benchmark file written by peers.py")
+    parser.add_argument("--work-dir", default=DEFAULT_WORK_DIR, help="where PDFs are compiled")
+    parser.add_argument("--engine", default=None, help="TeX engine for PDF output (default: pdflatex)")
+    parser.add_argument("--timeout", type=float, default=None, help="seconds allowed per engine pass")
+    combined.add_records_arg(parser)
+    args = parser.parse_args(argv)
+
+    # The pool is created here, outside the event loop, and shut down on exit
+    server = RenderServer(args.workers, args.queue, args.template, peers_path=args.peers,
+                          work_dir=args.work_dir, engine=args.engine, timeout=args.timeout,
+                          records=args.records)
+    try:
+        asyncio.run(serve(server, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        if args.unix and os.path.exists(args.unix):
+            os.remove(args.unix)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,297 @@
+import argparse
+import json
+import os
+import random
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Sample document each dialect's layout is taken from. Only the shape is
+# used: every name, number and piece of text is generated.
+DIALECT_SAMPLES = {
+    "orig": "orig.json",
+    "ultimate": "ultimate.json",
+}
+
+# Sector names written to the documents' 'sector' key (see peers.py)
+SECTORS = ("Chemicals", "Auto", "Metals", "Pharma", "Textiles", "Power", "Cement", "FMCG",
+           "Infrastructure", "Logistics", "Paper", "Electricals")
+
+# Generated when no size is given
+DEFAULTS = {
+    "periods": 5,       # annual periods per yearly series
+    "quarters": 4,      # quarters per quarterly series
+    "items": 6,         # records per list (promoters, issues, ratings, subsidiaries, ...)
+    "bullets": 5,       # entries per commentary list and company profile field
+    "words": 40,        # words per text field
+    "na_rate": 0.1,     # share of figures written as NA
+    "sectors": 8,       # sectors to spread companies over; 0 leaves 'sector' out
+    "last_year": 24,    # fiscal year the series end in
+}
+
+_VOCABULARY = (
+    "revenue growth margin capacity expansion demand export domestic segment volume pricing "
+    "working capital debt equity liquidity cash flow operations utilisation plant facility "
+    "order book customer supplier raw material cost inflation guidance outlook quarter "
+    "year improvement decline stable moderate strong weak rating outlook lender covenant "
+    "subsidiary investment capex R&D 10% y-o-y EBITDA PAT net_debt Rs. crore INR market "
+    "share regulatory approval product portfolio innovation management board strategy "
+    "integration acquisition divestment dividend payout leverage coverage interest "
+    "receivables inventory payables cycle days efficiency automation digital channel"
+).split()
+
+_GIVEN_NAMES = ("Arun", "Meera", "Rahul", "Sunita", "Vikram", "Priya", "Anil", "Kavita",
+                "Rohan", "Neha", "Suresh", "Deepa", "Kiran", "Amit", "Lata", "Manoj")
+_SURNAMES = ("Shah", "Iyer", "Patel", "Rao", "Mehta", "Nair", "Gupta", "Desai", "Kulkarni",
+             "Reddy", "Bose", "Menon", "Joshi", "Kapoor", "Sethi", "Verma")
+_COMPANY_WORDS = ("Apex", "Vertex", "Sunrise", "Orbit", "Delta", "Meridian", "Trident", "Crest",
+                  "Summit", "Pioneer", "Horizon", "Zenith", "Lotus", "Cobalt", "Indus", "Sterling")
+_COMPANY_SUFFIXES = ("Industries Ltd", "Chemicals Ltd", "Motors Ltd", "Steel Ltd",
+                     "Pharma Ltd", "Textiles Ltd", "Power Ltd", "Infra Ltd")
+_LOCATIONS = ("India", "Mumbai", "Pune", "Vadodara", "Chennai", "Singapore", "United Kingdom",
+              "Netherlands", "UAE", "USA")
+_RATINGS = ("CRISIL AA+/Stable", "CRISIL AA/Positive", "CARE AA-; Stable", "ICRA A+ (Stable)",
+            "IND A/Negative", "CRISIL A1+", "CARE A1+", "ICRA A1", "N/A")
+
+# Series whose figures are percentages or per-share amounts rather than Rs. crore
+_SMALL_FIGURE = re.compile(r'opm|percent|%|tax|ratio|margin|return|eps|yield|payout', re.I)
+
+_PERIOD_KEYS = ('year', 'quarter')
+_LAST_NUMBER = re.compile(r'\d+(?=\D*$)')
+
+_samples = {}
+
+
+def load_sample(dialect):
+    if dialect not in _samples:
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), DIALECT_SAMPLES[dialect])
+        with open(path, 'r') as f:
+            _samples[dialect] = json.load(f)
+    return _samples[dialect]
+
+
+def _series_keys(entries):
+    # (period key, value key) of a list of period entries, or None
+    if not entries or not isinstance(entries[0], dict):
+        return None
+    period = next((k for k in entries[0] if k.lower() in _PERIOD_KEYS), None)
+    value = next((k for k in entries[0] if k.lower() == 'value'), None)
+    if period is None or value is None:
+        return None
+    return period, value
+
+
+class Generator:
+    """
+    Builds one synthetic company document by walking a dialect sample and
+    regenerating every leaf: series get the configured number of periods
+    (labelled in the sample's own format) with NA at na_rate, lists of
+    records and commentary are resized, and text is made up of words from a
+    fixed vocabulary. Everything comes from one Random, so a document is
+    fully determined by its seed.
+    """
+
+    def __init__(self, rng, sizes):
+        self.rng = rng
+        self.sizes = sizes
+        # Order of magnitude of this company's figures, in Rs. crore
+        self.scale = 10 ** rng.uniform(2, 5)
+
+    def words(self, count):
+        return ' '.join(self.rng.choices(_VOCABULARY, k=max(count, 1)))
+
+    def sentence(self, count=None):
+        if count is None:
+            count = max(1, int(self.rng.gauss(self.sizes["words"], self.sizes["words"] / 4)))
+        text = self.words(count)
+        return text[0].upper() + text[1:] + '.'
+
+    def title(self):
+        return self.words(self.rng.randint(2, 5)).title()
+
+    def person(self):
+        return "%s %s. %s" % (self.rng.choice(("Mr.", "Ms.", "Dr.")), self.rng.choice(_GIVEN_NAMES),
+                              self.rng.choice(_SURNAMES))
+
+    def company(self):
+        return "%s %s" % (self.rng.choice(_COMPANY_WORDS), self.rng.choice(_COMPANY_SUFFIXES))
+
+    def figure(self, metric, sample_value, index):
+        if self.rng.random() < self.sizes["na_rate"]:
+            return 'NA'
+        if _SMALL_FIGURE.search(metric):
+            value = round(self.rng.uniform(-5, 45), 2)
+        else:
+            growth = 1.08 ** index
+            value = round(self.scale * self.rng.uniform(0.05, 1.0) * growth, 2)
+        if isinstance(sample_value, int) and not isinstance(sample_value, bool):
+            return int(value)
+        if isinstance(sample_value, str):
+            return str(value)
+        return value
+
+    def labels(self, sample_label, count, quarterly):
+        # The sample's label format with the year (and quarter) replaced
+        label = str(sample_label)
+        digits = _LAST_NUMBER.search(label)
+        width = len(digits.group()) if digits else 2
+        labels = []
+        for i in range(count):
+            back = count - 1 - i
+            if quarterly:
+                year, quarter = self.sizes["last_year"] - back // 4, 4 - back % 4
+            else:
+                year, quarter = self.sizes["last_year"] - back, None
+            year_text = '%02d' % (year % 100) if width < 4 else '%d' % (2000 + year % 100)
+            text = _LAST_NUMBER.sub(year_text, label) if digits else label
+            if quarter is not None:
+                text = re.sub(r'Q\d', 'Q%d' % quarter, text, count=1)
+            labels.append(text)
+        return labels
+
+    def series(self, metric, entries, keys, sample_label=None, sample_value=0):
+        period_key, value_key = keys
+        if entries:
+            sample_label, sample_value = entries[0][period_key], entries[0][value_key]
+        quarterly = period_key.lower() == 'quarter'
+        count = self.sizes["quarters"] if quarterly else self.sizes["periods"]
+        return [{period_key: label, value_key: self.figure(metric, sample_value, i)}
+                for i, label in enumerate(self.labels(sample_label, count, quarterly))]
+
+    def url(self):
+        return "https://example.com/%s/%d" % (self.rng.choice(_VOCABULARY).lower(), self.rng.randint(1, 9999))
+
+    def text(self, key, sample):
+        name = key.lower()
+        if name == 'path':
+            return sample
+        if name in ('url', 'sources'):
+            return self.url()
+        if name in ('name',):
+            return self.person()
+        if name in ('company_name', 'subsidiary_name'):
+            return self.company()
+        if name.endswith('_rating'):
+            return self.rng.choice(_RATINGS)
+        if 'date' in name:
+            return 'NA' if self.rng.random() < self.sizes["na_rate"] else '%02d-%02d-%d' % (
+                self.rng.randint(1, 28), self.rng.randint(1, 12), self.rng.randint(1990, 2023))
+        if name == 'interest':
+            return '%.2f%%' % self.rng.uniform(26, 100)
+        if name == 'location':
+            return self.rng.choice(_LOCATIONS)
+        if name in ('point_header', 'headline', 'news_title'):
+            return self.title()
+        if name == 'risk':
+            return "**%s**: %s" % (self.title(), self.sentence())
+        if name == 'experience':
+            return "%d yrs of experience in %s" % (self.rng.randint(5, 45), self.words(6))
+        return self.sentence()
+
+    def profile_field(self):
+        return '\n- '.join("**%s**: %s" % (self.title(), self.sentence())
+                           for _ in range(self.sizes["bullets"]))
+
+    def build(self, key, sample, path=()):
+        if isinstance(sample, dict):
+            if path == ('company_profile',):
+                return {k: '- ' + self.profile_field() for k in sample}
+            # Empty series take their layout from a sibling series
+            sibling = next((v for v in sample.values() if isinstance(v, list) and _series_keys(v)), None)
+            result = {}
+            for k, v in sample.items():
+                if isinstance(v, list) and not v and sibling is not None:
+                    keys = _series_keys(sibling)
+                    result[k] = self.series(k, [], keys, sibling[0][keys[0]], sibling[0][keys[1]])
+                else:
+                    result[k] = self.build(k, v, path + (k,))
+            return result
+        if isinstance(sample, list):
+            keys = _series_keys(sample)
+            if keys:
+                return self.series(key, sample, keys)
+            if not sample:
+                return []
+            if key.lower() == 'sources':
+                return [self.url()]
+            if all(isinstance(item, str) for item in sample):
+                return [self.sentence() for _ in range(self.sizes["bullets"])]
+            return [self.build(key, sample[0], path) for _ in range(self.sizes["items"])]
+        if isinstance(sample, str):
+            return self.text(key, sample)
+        if isinstance(sample, bool) or sample is None:
+            return sample
+        if isinstance(sample, (int, float)):
+            return self.figure(key, sample, 0)
+        return sample
+
+
+def generate_document(index, dialect="orig", seed=0, **sizes):
+    """
+    The index'th synthetic company document of the seed, in the dialect's
+    layout. sizes override DEFAULTS. The same arguments always give the
+    same document.
+    """
+    sizes = dict(DEFAULTS, **sizes)
+    rng = random.Random("%s:%s:%d" % (seed, dialect, index))
+    document = Generator(rng, sizes).build('', load_sample(dialect))
+    if sizes["sectors"]:
+        document["sector"] = SECTORS[rng.randrange(min(sizes["sectors"], len(SECTORS)))]
+    return document
+
+
+def dialect_for(index, dialect):
+    if dialect == "mixed":
+        return ("orig", "ultimate")[index % 2]
+    return dialect
+
+
+def _write_range(out_dir, indices, dialect, seed, prefix, sizes):
+    written = 0
+    for index in indices:
+        document = generate_document(index, dialect_for(index, dialect), seed, **sizes)
+        with open(os.path.join(out_dir, "%s%05d.json" % (prefix, index)), 'w') as f:
+            json.dump(document, f)
+        written += 1
+    return written
+
+
+def write_corpus(out_dir, count, dialect="mixed", seed=0, prefix="synth_", workers=1, **sizes):
+    """
+    Writes count documents to out_dir as <prefix><index>.json. dialect is
+    "orig", "ultimate" or "mixed" (alternating). Returns the number written.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    if workers == 1 or count < 2:
+        return _write_range(out_dir, range(count), dialect, seed, prefix, sizes)
+    workers = workers or os.cpu_count()
+    chunks = [range(start, count, workers) for start in range(workers)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_write_range, out_dir, chunk, dialect, seed, prefix, sizes) for chunk in chunks]
+        return sum(future.result() for future in futures)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic company documents for load testing.")
+    parser.add_argument("count", type=int, help="number of documents")
+    parser.add_argument("-o", "--out-dir", default="synthetic", help="directory to write the documents to")
+    parser.add_argument("--dialect", choices=("orig", "ultimate", "mixed"), default="mixed",
+                        help="producer layout (default: alternate between the two)")
+    parser.add_argument("--seed", default="0", help="seed; the same seed gives the same documents")
+    parser.add_argument("--prefix", default="synth_", help="file name prefix")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="worker processes (0: CPU count)")
+    for name, default in DEFAULTS.items():
+        parser.add_argument("--" + name.replace('_', '-'), type=type(default), default=default,
+                            help="default: %s" % default)
+    args = parser.parse_args(argv)
+
+    sizes = {name: getattr(args, name) for name in DEFAULTS}
+    start = time.perf_counter()
+    written = write_corpus(args.out_dir, args.count, args.dialect, args.seed, args.prefix,
+                           args.workers or None, **sizes)
+    print("Wrote %d documents to %s in %.3fs" % (written, args.out_dir, time.perf_counter() - start))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
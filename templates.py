@@ -0,0 +1,87 @@
+import contextlib
+import fnmatch
+import hashlib
+import os
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
+from jinja2.bccache import Bucket
+
+# Where compiled templates are kept between runs. Set the environment variable
+# to an empty string to turn the on-disk cache off.
+CACHE_DIR_ENV = 'CREDIT_REPORT_TEMPLATE_CACHE'
+DEFAULT_CACHE_DIR = '.template_cache'
+
+
+def environment_signature(environment):
+    """
+    Summarises the environment settings that change the generated template code,
+    so two differently configured environments never share a cache entry.
+    """
+    finalize = environment.finalize
+    return repr((
+        environment.block_start_string, environment.block_end_string,
+        environment.variable_start_string, environment.variable_end_string,
+        environment.comment_start_string, environment.comment_end_string,
+        environment.line_statement_prefix, environment.line_comment_prefix,
+        environment.trim_blocks, environment.lstrip_blocks,
+        environment.newline_sequence, environment.keep_trailing_newline,
+        environment.is_async, bool(environment.autoescape),
+        getattr(finalize, '__qualname__', repr(finalize)),
+    ))
+
+
+class ContentHashBytecodeCache(FileSystemBytecodeCache):
+    """
+    Bytecode cache keyed by the hash of the template source rather than its name.
+    Editing combined.tex produces a new key, so stale bytecode is never loaded
+    and no manual invalidation is needed. Keys start with a hash of the
+    template's name and environment, and storing a template's new bytecode
+    removes the entries its earlier sources left behind.
+    """
+
+    def get_bucket(self, environment, name, filename, source):
+        signature = environment_signature(environment)
+        prefix = hashlib.sha1(((name or '') + signature).encode('utf-8')).hexdigest()[:16]
+        digest = hashlib.sha1(source.encode('utf-8'))
+        digest.update(signature.encode('utf-8'))
+        key = prefix + '-' + digest.hexdigest()
+        bucket = Bucket(environment, key, key)
+        self.load_bytecode(bucket)
+        return bucket
+
+    def dump_bytecode(self, bucket):
+        super().dump_bytecode(bucket)
+        prefix = bucket.key.partition('-')[0]
+        current = self.pattern % (bucket.key,)
+        for filename in fnmatch.filter(os.listdir(self.directory), self.pattern % (prefix + '-*',)):
+            if filename != current:
+                with contextlib.suppress(OSError):
+                    os.remove(os.path.join(self.directory, filename))
+
+
+def resolve_cache_dir(search_path='.'):
+    cache_dir = os.environ.get(CACHE_DIR_ENV)
+    if cache_dir is None:
+        cache_dir = os.path.join(search_path, DEFAULT_CACHE_DIR)
+    return cache_dir or None
+
+
+def make_environment(search_path='.', cache_dir=None, filters=None, finalize=None, autoescape=False):
+    """
+    Builds the Jinja2 environment used for the LaTeX templates, with the
+    on-disk bytecode cache enabled unless it has been turned off. finalize is
+    applied to every {{ ... }} output (see latex_escape.finalize_latex);
+    autoescape turns on Jinja's HTML escaping instead (see preview.py).
+    """
+    if cache_dir is None:
+        cache_dir = resolve_cache_dir(search_path)
+    bytecode_cache = None
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        bytecode_cache = ContentHashBytecodeCache(cache_dir, '%s.jinja.cache')
+    # Trailing newlines are kept so a section template (see sections.py) renders
+    # exactly the text it holds
+    env = Environment(loader=FileSystemLoader(search_path), bytecode_cache=bytecode_cache,
+                      finalize=finalize, keep_trailing_newline=True, autoescape=autoescape)
+    for name, func in (filters or {}).items():
+        env.filters[name] = func
+    return env
@@ -0,0 +1,21 @@
+import json
+import os
+
+import charts
+import combined
+from conftest import ROOT
+
+
+class _AllCharts:
+    # A chart cache that has every chart the report asks for
+    def render(self, specs, executor=None):
+        return {(spec["section"], spec["name"]): spec["name"] + ".png" for spec in specs}
+
+
+def test_ownership_structure_keeps_the_producer_graphs():
+    with open(os.path.join(ROOT, "ultimate.json"), encoding="utf-8") as f:
+        data = json.load(f)
+    context = combined.build_context(data, chart_cache=_AllCharts())
+    assert [graph["url"] for graph in context["ownership_structure_graphs"]] == [
+        "shareholding_2024.png", "shareholding_2022.png"]
+    assert all(section != "ownership_structure" for section, *_ in charts.CHARTS.values())
@@ -0,0 +1,19 @@
+import pytest
+
+import ingest
+
+
+@pytest.mark.parametrize("streaming", [False, pytest.param(True, marks=pytest.mark.skipif(
+    not ingest.streaming_available(), reason="needs ijson"))])
+@pytest.mark.parametrize("raw", [b"[1]", b"1", b'"acme"', b"null"])
+def test_document_must_be_an_object(raw, streaming):
+    with pytest.raises(ValueError, match=ingest.TOP_LEVEL_ERROR):
+        ingest.parse_document(raw, streaming)
+
+
+def test_load_document_checks_the_top_level_too(tmp_path):
+    path = tmp_path / "list.json"
+    path.write_text("[1]")
+    for streaming in (False, ingest.streaming_available()):
+        with pytest.raises(ValueError, match=ingest.TOP_LEVEL_ERROR):
+            ingest.load_document(str(path), streaming)
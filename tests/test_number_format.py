@@ -0,0 +1,11 @@
+from number_format import number_format
+
+
+def test_percent_cells_carry_the_unit():
+    assert number_format(percent=True).format([12.5, -3.0, None]) == ["12.50%", "(3.00%)", "NA"]
+
+
+def test_figures_beyond_int64_are_formatted_exactly():
+    cells = number_format().format([1e20, -9.3e18, 12.5])
+    assert cells == ["10,00,00,00,00,00,00,00,00,000.00", "(93,00,00,00,00,00,00,00,000.00)", "12.50"]
+    assert number_format(grouping="western", decimals=0).format([[2e19, 1.0]]) == [["20,000,000,000,000,000,000", "1"]]
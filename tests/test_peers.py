@@ -0,0 +1,17 @@
+import os
+import shutil
+
+import peers
+from conftest import ROOT
+
+
+def test_unreadable_document_is_reported_and_the_rest_benchmarked(tmp_path):
+    good = [shutil.copy(os.path.join(ROOT, name), tmp_path) for name in ("ultimate.json", "orig.json")]
+    broken = tmp_path / "broken.json"
+    broken.write_text('{"sector": ')
+
+    portfolio, failures = peers.load_portfolio(good + [str(broken)], workers=1)
+
+    assert [path for path, _ in failures] == [str(broken)]
+    assert portfolio[0] == ["ultimate", "orig"]
+    assert set(peers.benchmark(*portfolio)) == {"ultimate", "orig"}
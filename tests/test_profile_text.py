@@ -0,0 +1,19 @@
+from profile_text import parse_profile_text
+
+
+def test_bold_lead_in_with_colon_is_a_header():
+    for text in ("- **Revenue:** up 12%", "- **Revenue**: up 12%"):
+        [item] = parse_profile_text(text)
+        assert (item.header, item.text) == ("Revenue", "up 12%")
+
+
+def test_bold_without_colon_is_emphasis():
+    [item] = parse_profile_text("**Tata Motors** is a leading maker.")
+    assert item.header is None
+    assert item.text == "Tata Motors is a leading maker."
+
+
+def test_bold_without_colon_in_a_bullet_is_emphasis():
+    [item] = parse_profile_text("- **Revenue** up 12%")
+    assert item.header is None
+    assert item.text == "Revenue up 12%"
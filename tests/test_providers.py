@@ -0,0 +1,15 @@
+import pytest
+from jinja2 import DictLoader, Environment
+
+from providers import ProviderRegistry, generate
+
+
+def test_template_error_comes_through_a_lazy_context():
+    registry = ProviderRegistry()
+    registry.provides("name")(lambda ctx: "Acme")
+    registry.provides("unused")(lambda ctx: pytest.fail("built unused variable"))
+    env = Environment(loader=DictLoader({"report": "{{ name }} {{ 1 // 0 }}"}))
+    context = registry.context()
+    with pytest.raises(ZeroDivisionError):
+        ''.join(generate(env.get_template("report"), context))
+    assert context.copy() == {"name": "Acme"}
@@ -0,0 +1,28 @@
+import asyncio
+import gc
+import weakref
+
+import server
+
+
+class _Server(server.RenderServer):
+    # RenderServer without its worker pool, compiling by writing the .tex back
+    def __init__(self, work_dir):
+        self._pdf_locks = weakref.WeakValueDictionary()
+        self.work_dir = work_dir
+        self.engine = None
+        self.timeout = None
+
+
+def test_pdf_locks_are_dropped_after_each_compile(tmp_path, monkeypatch):
+    def compile_tex(tex_path, build_root, engine, timeout):
+        return {"ok": True, "output": tex_path}
+    monkeypatch.setattr(server.compile_pdf, "compile_tex", compile_tex)
+    render_server = _Server(str(tmp_path))
+
+    async def compile_all():
+        return await asyncio.gather(*(render_server.compile("report", "company%d" % (i % 3)) for i in range(6)))
+
+    assert asyncio.run(compile_all()) == [b"report"] * 6
+    gc.collect()
+    assert len(render_server._pdf_locks) == 0
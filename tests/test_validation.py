@@ -0,0 +1,31 @@
+import json
+import os
+
+import pytest
+
+from validation import check_document
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLES = ('orig.json', 'ultimate.json')
+
+
+def load_sample(name):
+    with open(os.path.join(ROOT, name)) as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("sample", SAMPLES)
+def test_samples_are_valid(sample):
+    assert check_document(load_sample(sample)) == []
+
+
+@pytest.mark.parametrize("sample", SAMPLES)
+@pytest.mark.parametrize("section", ('concalls', 'recent_news'))
+def test_empty_grouped_section_is_a_problem(sample, section):
+    data = load_sample(sample)
+    key = next(key for key in data if key.lower() == section)
+    data[key] = {}
+    problems = check_document(data)
+    assert problems
+    assert all(problem.startswith(key + ': missing ') for problem in problems)
@@ -0,0 +1,215 @@
+import functools
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+# Metric name of the per-stage summary in the Prometheus textfile
+METRIC_NAME = 'credit_report_stage_seconds'
+
+# Quantiles reported for every stage
+QUANTILES = (0.5, 0.9, 0.99)
+
+# The trace spans are recorded into, if any. Rendering is single-threaded in
+# each process (batch and server workers are processes), so one is enough.
+_active = None
+
+
+class Trace:
+    """
+    Time spent in each stage while rendering one report. Stage times are
+    exclusive: a span's time does not include the spans nested inside it
+    (a section built while the template renders counts towards the section,
+    not the render), so the stages of a report add up to its total.
+    """
+
+    def __init__(self, report):
+        self.report = report
+        self.stages = {}
+        self.calls = {}
+        # Time spent in nested spans, one entry per open span
+        self._nested = [0.0]
+
+    def add(self, stage, seconds, calls=1):
+        # For stages timed outside this process, e.g. by pipeline.py
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+        self.calls[stage] = self.calls.get(stage, 0) + calls
+
+    def as_dict(self):
+        return {"report": self.report, "stages": dict(self.stages), "calls": dict(self.calls)}
+
+
+class _Span:
+    __slots__ = ('trace', 'stage', 'start')
+
+    def __init__(self, trace, stage):
+        self.trace = trace
+        self.stage = stage
+
+    def __enter__(self):
+        self.trace._nested.append(0.0)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        trace = self.trace
+        nested = trace._nested.pop()
+        trace._nested[-1] += elapsed
+        trace.add(self.stage, elapsed - nested)
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def active():
+    return _active is not None
+
+
+def span(stage):
+    """
+    Context manager timing stage in the active trace; does nothing (and costs
+    next to nothing) when no trace is active.
+    """
+    trace = _active
+    if trace is None:
+        return _NO_SPAN
+    return _Span(trace, stage)
+
+
+def timed(stage, func):
+    """
+    Wraps func so each call is a span. Keeps func's name, which the template
+    cache keys include (see templates.environment_signature).
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        trace = _active
+        if trace is None:
+            return func(*args, **kwargs)
+        with _Span(trace, stage):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+@contextmanager
+def trace(report):
+    """
+    Records the spans of everything run inside the block into a new Trace
+    for report, which the block gets. Traces do not nest.
+    """
+    global _active
+    previous = _active
+    _active = Trace(report)
+    try:
+        yield _active
+    finally:
+        _active = previous
+
+
+def call_traced(report, func, *args):
+    """
+    Runs func(*args) under a trace and returns (result, trace dict); for
+    running traced work in a worker process.
+    """
+    with trace(report) as current:
+        result = func(*args)
+    return result, current.as_dict()
+
+
+def stage_summary(traces):
+    """
+    Aggregates trace dicts into {stage: {"reports", "total", "mean", "max",
+    "quantiles": {q: seconds}}}, ordered by total time. A stage's statistics
+    cover the reports that ran it.
+    """
+    samples = {}
+    for entry in traces:
+        for stage, seconds in entry["stages"].items():
+            samples.setdefault(stage, []).append(seconds)
+    summary = {}
+    for stage, values in samples.items():
+        values = np.array(values)
+        summary[stage] = {
+            "reports": len(values),
+            "total": float(values.sum()),
+            "mean": float(values.mean()),
+            "max": float(values.max()),
+            "quantiles": {q: float(np.quantile(values, q)) for q in QUANTILES},
+        }
+    return dict(sorted(summary.items(), key=lambda item: -item[1]["total"]))
+
+
+def print_breakdown(traces):
+    summary = stage_summary(traces)
+    grand_total = sum(stats["total"] for stats in summary.values()) or 1.0
+    width = max([len("Stage")] + [len(stage) for stage in summary])
+    quantile_headers = ''.join('%10s' % ('p%g' % (q * 100)) for q in QUANTILES)
+    print()
+    print("%-*s %7s %10s %10s%s %7s" % (width, "Stage", "reports", "total", "mean", quantile_headers, "share"))
+    for stage, stats in summary.items():
+        quantiles = ''.join('%8.2fms' % (stats["quantiles"][q] * 1000) for q in QUANTILES)
+        print("%-*s %7d %9.3fs %8.2fms%s %6.1f%%" % (
+            width, stage, stats["reports"], stats["total"], stats["mean"] * 1000, quantiles,
+            stats["total"] / grand_total * 100))
+
+
+def _write_atomic(path, text):
+    # Write-then-rename, so a collector scraping the file never sees it half written
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        f.write(text)
+    os.replace(temp_path, path)
+
+
+def write_json(traces, path):
+    """
+    Writes every report's stage times and the per-stage summary as JSON.
+    """
+    summary = stage_summary(traces)
+    for stats in summary.values():
+        stats["quantiles"] = {str(q): seconds for q, seconds in stats["quantiles"].items()}
+    _write_atomic(path, json.dumps({
+        "generated": time.time(),
+        "reports": list(traces),
+        "summary": summary,
+    }, indent=1))
+
+
+def write_prometheus(traces, path):
+    """
+    Writes the per-stage summary in the Prometheus text format, for the
+    node_exporter textfile collector.
+    """
+    lines = [
+        "# HELP %s Seconds spent in each stage per credit report." % METRIC_NAME,
+        "# TYPE %s summary" % METRIC_NAME,
+    ]
+    for stage, stats in stage_summary(traces).items():
+        for q, seconds in stats["quantiles"].items():
+            lines.append('%s{stage="%s",quantile="%g"} %.6f' % (METRIC_NAME, stage, q, seconds))
+        lines.append('%s_sum{stage="%s"} %.6f' % (METRIC_NAME, stage, stats["total"]))
+        lines.append('%s_count{stage="%s"} %d' % (METRIC_NAME, stage, stats["reports"]))
+    _write_atomic(path, '\n'.join(lines) + '\n')
+
+
+def export(traces, json_path=None, prometheus_path=None):
+    if json_path:
+        write_json(traces, json_path)
+    if prometheus_path:
+        write_prometheus(traces, prometheus_path)
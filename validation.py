@@ -0,0 +1,364 @@
+from numbers import Number
+
+from financials import MISSING_TOKENS, parse_value
+from schema import DIALECT_SECTIONS, SECTION_ALIASES, canonical_key, detect_dialect
+
+# Canonical sections both producers always write. A document without one of
+# them is reported rather than rendered with the section left empty.
+REQUIRED_SECTIONS = (
+    'company_profile', 'promoters', 'key_issues', 'key_strengths', 'industry_risks',
+    'brief_financials', 'financial_data', 'peer_ratings', 'balance_sheet_analysis',
+    'company_financials', 'cash_flow_analysis', 'debt_schedule', 'fixed_assets', 'leverage_ratio',
+    'performance_ratios', 'activity_ratio', 'ownership_structure', 'working_capital_movement',
+    'justification_of_proposal', 'subsidiary_jv_info', 'concalls', 'recent_news',
+)
+
+# Problems listed in a SchemaError's message; all of them are kept in .problems
+MESSAGE_PROBLEMS = 5
+
+_PERIOD_KEYS = ('year', 'quarter')
+
+# The groups of fields sections/concalls.tex and sections/recent_news.tex
+# read, by canonical key (see schema.normalize_keys). Every group must be an
+# object, since the templates read fields out of it; a missing field is
+# shown empty.
+CONCALL_GROUPS = {
+    'introduction': ('moderator_introduction', 'company_introduction'),
+    'executive_summary': ('chairman_remarks', 'cfo_remarks', 'key_achievements'),
+    'financial_performance': ('revenue_and_profit', 'segment_wise_performance', 'cost_analysis',
+                              'financial_guidance'),
+    'market_and_economic_overview': ('macro_economic_environment', 'industry_trends'),
+    'strategic_initiatives_and_projects': ('major_projects', 'new_products_and_innovations'),
+    'operational_highlights': ('capacity_utilization', 'efficiency_improvements'),
+    'corporate_governance': ('board_activities', 'debt_management'),
+    'financial_guidance_and_outlook': ('future_projections', 'market_outlook', 'strategic_goals'),
+    'questions_and_answers': ('investor_queries', 'management_responses'),
+    'closing_remarks': ('summary_by_executives', 'next_steps'),
+}
+
+RECENT_NEWS_GROUPS = {
+    'headline_and_source': ('news_title', 'source', 'date'),
+    'executive_summary': ('summary_of_the_news', 'impact_on_company'),
+    'company_specific_news': ('financial_results', 'new_projects_and_ventures',
+                              'product_launches_and_innovations', 'strategic_initiatives'),
+    'market_and_economic_impact': ('industry_impact', 'economic_conditions'),
+    'stock_market_and_investor_reactions': ('stock_performance', 'investor_sentiment', 'market_comparisons'),
+    'management_and_leadership': ('executive_statements', 'leadership_changes', 'board_decisions'),
+    'regulatory_and_compliance': ('legal_matters', 'government_policies'),
+    'operational_developments': ('operational_updates', 'supply_chain_issues', 'infrastructure_developments'),
+    'market_and_consumer_trends': ('consumer_behavior', 'market_demand'),
+    'future_outlook_and_projections': ('analyst_projections', 'company_guidance', 'strategic_goals'),
+}
+
+_compiled = {}
+
+
+class SchemaError(ValueError):
+    """
+    A company document that does not match its dialect's schema. problems
+    lists every missing or mistyped field as "path: what is wrong".
+    """
+
+    def __init__(self, problems):
+        self.problems = list(problems)
+        shown = '; '.join(self.problems[:MESSAGE_PROBLEMS])
+        if len(self.problems) > MESSAGE_PROBLEMS:
+            shown += '; and %d more' % (len(self.problems) - MESSAGE_PROBLEMS)
+        super().__init__("%d schema problem%s: %s" % (
+            len(self.problems), '' if len(self.problems) == 1 else 's', shown))
+
+    def __reduce__(self):
+        # Rebuilt from the problems when sent back from a worker process
+        return type(self), (self.problems,)
+
+
+def format_path(path):
+    text = ''
+    for part in path:
+        text += '[%d]' % part if isinstance(part, int) else ('.' if text else '') + str(part)
+    return text or '<document>'
+
+
+def _describe(value):
+    if value is None:
+        return 'null'
+    if isinstance(value, dict):
+        return 'an object'
+    if isinstance(value, list):
+        return 'a list'
+    if isinstance(value, str):
+        return 'a string'
+    return 'a %s' % type(value).__name__
+
+
+# Checkers: each spec below is compiled into a function check(value, path,
+# problems) that appends a problem for everything wrong with value and its
+# contents, so a document is checked in one walk.
+
+def text(value, path, problems):
+    if not isinstance(value, str):
+        problems.append("%s: expected a string, got %s" % (format_path(path), _describe(value)))
+
+
+def anything(value, path, problems):
+    pass
+
+
+def optional(check):
+    def check_optional(value, path, problems):
+        if value is not None:
+            check(value, path, problems)
+    return check_optional
+
+
+def list_of(check):
+    def check_list(value, path, problems):
+        if not isinstance(value, list):
+            problems.append("%s: expected a list, got %s" % (format_path(path), _describe(value)))
+            return
+        for index, item in enumerate(value):
+            check(item, path + (index,), problems)
+    return check_list
+
+
+def mapping(check):
+    # An object of free-form keys whose values all follow check
+    def check_mapping(value, path, problems):
+        if not isinstance(value, dict):
+            problems.append("%s: expected an object, got %s" % (format_path(path), _describe(value)))
+            return
+        for key, item in value.items():
+            check(item, path + (key,), problems)
+    return check_mapping
+
+
+def record(fields, required=()):
+    """
+    An object with known fields, matched by canonical key (see
+    schema.canonical_key) so 'Date of Creation' and 'date_of_creation' are
+    the same field. Fields not listed are ignored.
+    """
+    required = tuple(required)
+
+    def check_record(value, path, problems):
+        if not isinstance(value, dict):
+            problems.append("%s: expected an object, got %s" % (format_path(path), _describe(value)))
+            return
+        seen = set()
+        for key, item in value.items():
+            name = canonical_key(key)
+            check = fields.get(name)
+            if check is not None:
+                seen.add(name)
+                check(item, path + (key,), problems)
+        for name in required:
+            if name not in seen:
+                problems.append("%s: missing %r" % (format_path(path), name))
+    return check_record
+
+
+def one_of(*checks):
+    # The first check that finds nothing wrong wins; otherwise the first one's problems
+    def check_one_of(value, path, problems):
+        first = None
+        for check in checks:
+            found = []
+            check(value, path, found)
+            if not found:
+                return
+            if first is None:
+                first = found
+        problems.extend(first)
+    return check_one_of
+
+
+def figure(value, path, problems):
+    # A table cell: a number, a numeric string (with ',' or '%') or a missing token
+    if value is None or isinstance(value, Number) and not isinstance(value, bool):
+        return
+    if isinstance(value, str):
+        number, _ = parse_value(value)
+        if number is None and value.strip().upper() not in MISSING_TOKENS:
+            problems.append("%s: not a number: %r" % (format_path(path), value[:40]))
+        return
+    problems.append("%s: expected a number, got %s" % (format_path(path), _describe(value)))
+
+
+def series(value, path, problems):
+    """
+    One metric of a financial table: a list (or null) of {year|quarter: p,
+    value: v} entries, the structure financials.SeriesTable reads.
+    """
+    if value is None:
+        return
+    if not isinstance(value, list):
+        problems.append("%s: expected a list of entries, got %s" % (format_path(path), _describe(value)))
+        return
+    for index, entry in enumerate(value):
+        if not isinstance(entry, dict):
+            problems.append("%s: expected an entry object, got %s" % (
+                format_path(path + (index,)), _describe(entry)))
+            continue
+        period = False
+        cell = False
+        for key, item in entry.items():
+            name = canonical_key(key)
+            if name == 'value':
+                cell = True
+                figure(item, path + (index, key), problems)
+            elif name in _PERIOD_KEYS:
+                period = True
+                if not isinstance(item, (str, int)) or isinstance(item, bool):
+                    problems.append("%s: expected a period label, got %s" % (
+                        format_path(path + (index, key)), _describe(item)))
+        if not period:
+            problems.append("%s: missing 'year' or 'quarter'" % format_path(path + (index,)))
+        if not cell:
+            problems.append("%s: missing 'value'" % format_path(path + (index,)))
+
+
+table = optional(mapping(series))
+commentary = optional(list_of(text))
+graph_target = one_of(text, record({'url': optional(text), 'path': optional(text)}))
+points = one_of(list_of(text), record({'points': optional(list_of(text))}))
+
+
+def table_section(nested=False):
+    return optional(record({
+        'table': optional(mapping(table)) if nested else table,
+        'commentary': commentary,
+    }))
+
+
+def graph_section():
+    return optional(record({
+        'graphs': optional(mapping(optional(graph_target))),
+        'commentary': commentary,
+    }))
+
+
+def grouped_section(groups):
+    # Sections of named groups of text fields, e.g. concalls (CONCALL_GROUPS)
+    return record({group: record({field: optional(text) for field in fields})
+                   for group, fields in groups.items()}, required=tuple(groups))
+
+
+def item_section(key, item):
+    # Sections holding a single list, e.g. {"issues": [...]}
+    return optional(record({key: optional(list_of(item))}))
+
+
+def compile_schema(dialect):
+    """
+    Builds the checker for one producer's documents, check(data, problems).
+    The layouts differ mostly in section names; field names are compared in
+    canonical form, so Year/Value and year/value both pass.
+    """
+    point = record({'point_header': text, 'point_content': text}, required=('point_header', 'point_content'))
+    sections = {
+        'company_profile': optional(mapping(text)),
+        'promoters': item_section('promoters', record(
+            {'name': text, 'experience': text}, required=('name', 'experience'))),
+        'key_issues': item_section('issues', point),
+        'key_strengths': item_section('strengths', point),
+        'industry_risks': item_section('risks', record({
+            'risk': text,
+            'sources': one_of(text, list_of(text)),
+        }, required=('risk', 'sources'))),
+        'brief_financials': table,
+        'financial_data': table_section(),
+        'company_financials': table_section(),
+        'balance_sheet_analysis': table_section(),
+        'debt_schedule': table_section(nested=True),
+        'fixed_assets': table_section(),
+        'cash_flow_analysis': optional(record({
+            'table': table,
+            'commentary': commentary,
+            'graph': optional(graph_target),
+            'graph_commentary': commentary,
+        })),
+        'peer_ratings': optional(record({
+            'ratings': optional(list_of(record({
+                'company_name': text,
+                'long_term_rating': text,
+                'short_term_rating': text,
+            }, required=('company_name', 'long_term_rating', 'short_term_rating')))),
+            'commentary': commentary,
+        })),
+        'leverage_ratio': graph_section(),
+        'performance_ratios': graph_section(),
+        'activity_ratio': graph_section(),
+        'working_capital_movement': graph_section(),
+        'ownership_structure': graph_section(),
+        'financial_analysis': optional(record({'commentary': commentary})),
+        'justification_of_proposal': optional(one_of(points, record({
+            'justification_of_proposal': optional(points),
+            'recommendation': optional(points),
+        }))),
+        'recommendation': optional(points),
+        'subsidiary_jv_info': optional(record({
+            'subsidiaries': optional(list_of(record({
+                'subsidiary_name': optional(text),
+                'date_of_creation': optional(text),
+                'interest': optional(text),
+                'location': optional(text),
+            }))),
+            'jv_information': optional(list_of(anything)),
+        })),
+        'concalls': grouped_section(CONCALL_GROUPS),
+        'recent_news': grouped_section(RECENT_NEWS_GROUPS),
+        'sector': optional(text),
+    }
+    # Sections are found under either producer's name, as normalize_document
+    # does, and reported missing under this producer's
+    checks = dict(sections)
+    names = {name: (name,) for name in REQUIRED_SECTIONS}
+    for alias, name in SECTION_ALIASES.items():
+        checks[alias] = sections[name]
+        if name in names:
+            names[name] += (alias,)
+    required = []
+    for name, found_as in names.items():
+        own = [key for key in found_as if key in DIALECT_SECTIONS[dialect]]
+        required.append((own[0] if own else name, found_as))
+
+    def check_sections(data, problems):
+        for key, value in data.items():
+            check = checks.get(key)
+            if check is not None:
+                check(value, (key,), problems)
+        for name, found_as in required:
+            if not any(key in data for key in found_as):
+                problems.append("missing section %r" % name)
+    return check_sections
+
+
+def check_document(data):
+    """
+    Every problem with a parsed company document, as a list of "path: what
+    is wrong" strings; empty when the document is valid. The checker for
+    each dialect is compiled once per process and reused.
+    """
+    if not isinstance(data, dict):
+        return ["<document>: expected an object, got %s" % _describe(data)]
+    try:
+        dialect = detect_dialect(data)
+    except ValueError as exc:
+        return [str(exc)]
+    check = _compiled.get(dialect)
+    if check is None:
+        check = _compiled[dialect] = compile_schema(dialect)
+    problems = []
+    check(data, problems)
+    return problems
+
+
+def validate_document(data):
+    """
+    Raises SchemaError listing every problem with the document, if it has
+    any; returns the document otherwise.
+    """
+    problems = check_document(data)
+    if problems:
+        raise SchemaError(problems)
+    return data